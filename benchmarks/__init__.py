@@ -0,0 +1,11 @@
+"""
+Benchmarks for the hotel data extraction tool.
+
+Run with ``python -m benchmarks --help`` from the repository root.
+"""
+
+import os
+import sys
+
+# Add src to path, like the tests do
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '../src')))
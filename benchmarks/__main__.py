@@ -0,0 +1,135 @@
+"""
+Command-line entry point for the benchmark suite.
+
+Examples:
+  python -m benchmarks --sizes 1000 10000
+  python -m benchmarks --save-baseline benchmarks/baseline.json
+  python -m benchmarks --baseline benchmarks/baseline.json
+  python -m benchmarks --skip-stages --skip-end-to-end --import-budget-ms 150
+"""
+
+import argparse
+import json
+import os
+import platform
+import sys
+from typing import Any, Dict, List
+
+from . import end_to_end, stages, startup
+
+
+def parse_arguments():
+    """Parse command line arguments."""
+    parser = argparse.ArgumentParser(description="Hotel Data Extraction benchmarks")
+    parser.add_argument('--sizes', type=int, nargs='+', default=[1000, 10000, 100000],
+                        help='Corpus sizes for end-to-end runs (default: 1000 10000 100000)')
+    parser.add_argument('--stage-files', type=int, default=1000,
+                        help='Number of files for per-stage benchmarks (default: 1000)')
+    parser.add_argument('--repeat', type=int, default=3,
+                        help='Repetitions per stage benchmark (default: 3)')
+    parser.add_argument('--seed', type=int, default=42, help='Corpus random seed')
+    parser.add_argument('--corpus-root', default='./data/bench',
+                        help='Where generated corpora are kept between runs')
+    parser.add_argument('--skip-stages', action='store_true', help='Skip per-stage benchmarks')
+    parser.add_argument('--skip-end-to-end', action='store_true', help='Skip end-to-end runs')
+    parser.add_argument('--skip-startup', action='store_true', help='Skip startup benchmarks')
+    parser.add_argument('--import-budget-ms', type=float, default=150.0,
+                        help='Allowed import time of the CLI entry point (default: 150)')
+    parser.add_argument('--output', help='Write results JSON to this path')
+    parser.add_argument('--baseline', help='Compare results against this baseline JSON')
+    parser.add_argument('--save-baseline', help='Write results as a new baseline JSON')
+    parser.add_argument('--tolerance', type=float, default=0.10,
+                        help='Allowed throughput drop vs baseline before failing (default: 0.10)')
+    return parser.parse_args()
+
+
+def compare(results: Dict[str, Any], baseline: Dict[str, Any], tolerance: float) -> List[str]:
+    """
+    Compare throughput against a baseline.
+    
+    Args:
+        results: Current results
+        baseline: Baseline results
+        tolerance: Allowed relative drop in files/sec
+        
+    Returns:
+        Descriptions of regressions beyond the tolerance
+    """
+    regressions = []
+    for section in ('stages', 'end_to_end'):
+        for name, current in results.get(section, {}).items():
+            previous = baseline.get(section, {}).get(name)
+            if not previous or not previous.get('files_per_sec'):
+                continue
+            ratio = current['files_per_sec'] / previous['files_per_sec']
+            marker = ''
+            if ratio < 1 - tolerance:
+                marker = '  <-- regression'
+                regressions.append(f"{section}/{name}: {ratio:.2f}x of baseline")
+            print(f"  {section}/{name}: {current['files_per_sec']:.1f} files/s "
+                  f"({ratio:.2f}x baseline){marker}")
+    return regressions
+
+
+def main() -> int:
+    """Run the benchmark suite."""
+    args = parse_arguments()
+    results: Dict[str, Any] = {
+        'python': platform.python_version(),
+        'machine': platform.machine(),
+        'stages': {},
+        'end_to_end': {}
+    }
+    violations = []
+    
+    if not args.skip_startup:
+        results['startup'] = startup.run_startup_benchmarks(repeat=args.repeat)
+        print(f"startup import main {results['startup']['import_ms']:>8.1f} ms "
+              f"(process {results['startup']['import_main_ms']:.1f} ms, "
+              f"--dry-run {results['startup']['dry_run_ms']:.1f} ms)")
+        violations = startup.check_budget(results['startup'], args.import_budget_ms)
+    
+    if not args.skip_stages:
+        stage_dir = os.path.join(args.corpus_root, f"stages_{args.stage_files}")
+        end_to_end.ensure_corpus(stage_dir, args.stage_files, seed=args.seed)
+        file_paths = sorted(
+            os.path.join(stage_dir, name) for name in os.listdir(stage_dir) if name.endswith('.json')
+        )
+        results['stages'] = stages.run_stage_benchmarks(file_paths, repeat=args.repeat)
+        for name, stage in results['stages'].items():
+            print(f"stage {name:<20} {stage['files_per_sec']:>10.1f} files/s "
+                  f"{stage['mb_per_sec']:>8.2f} MB/s")
+    
+    if not args.skip_end_to_end:
+        for size in args.sizes:
+            corpus_dir = os.path.join(args.corpus_root, f"corpus_{size}")
+            end_to_end.ensure_corpus(corpus_dir, size, seed=args.seed)
+            run = end_to_end.run_end_to_end(corpus_dir)
+            results['end_to_end'][str(size)] = run
+            print(f"end-to-end {size:>7} files {run['seconds']:>9.2f} s "
+                  f"{run['files_per_sec']:>10.1f} files/s {run['mb_per_sec']:>8.2f} MB/s")
+    
+    for path in (args.output, args.save_baseline):
+        if path:
+            os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+            with open(path, 'w', encoding='utf-8') as file:
+                json.dump(results, file, indent=2)
+    
+    if args.baseline:
+        with open(args.baseline, 'r', encoding='utf-8') as file:
+            baseline = json.load(file)
+        print(f"Comparison against {args.baseline}:")
+        regressions = compare(results, baseline, args.tolerance)
+        if regressions:
+            print("Regressions: " + "; ".join(regressions))
+            return 1
+    
+    if violations:
+        print("Startup budget exceeded: " + "; ".join(violations))
+        return 1
+    
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
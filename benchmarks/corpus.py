@@ -0,0 +1,188 @@
+"""
+Deterministic generator for synthetic GIATA-style hotel JSON files.
+
+Generated hotels have the same shape as the ``sample_json`` test fixture, with
+configurable list lengths and a log-normal distribution of text lengths so
+that file sizes resemble a real supplier drop.
+"""
+
+import json
+import os
+import random
+from typing import Any, Dict, List, Optional
+
+# Default shape of a generated hotel
+DEFAULT_PROFILE = {
+    'names': 3,
+    'room_types': 8,
+    'images': 20,
+    'facts': 15,
+    'attributes_per_fact': 3,
+    'text_locales': ['en', 'en-US', 'de'],
+    'text_categories': ['Facilities', 'Location', 'Meals', 'Payment', 'Rooms', 'Sports/Entertainment'],
+    # Log-normal text length per category: median ~ exp(mu) characters
+    'text_length_mu': 6.0,
+    'text_length_sigma': 0.8,
+    'max_text_length': 20000
+}
+
+_LOCALES = ['en', 'de', 'fr', 'es', 'it', 'en-US']
+_COUNTRIES = ['IN', 'DE', 'FR', 'ES', 'IT', 'US', 'GB', 'TH', 'AE', 'GR']
+_MOTIFS = ['exterior', 'lobby', 'room', 'pool', 'restaurant', 'beach', 'spa']
+_WORDS = (
+    "hotel room pool beach breakfast view sea city centre spacious modern quiet "
+    "restaurant bar terrace garden fitness spa wifi parking airport shuttle "
+    "family friendly suite balcony minibar air conditioning shower bathtub "
+    "walking distance old town museum shopping nightlife buffet dinner lunch"
+).split()
+_TEXT_POOL = ' '.join(random.Random(0).choice(_WORDS) for _ in range(20000))
+
+
+def _text(rng: random.Random, profile: Dict[str, Any]) -> str:
+    """Slice a text of log-normally distributed length from the word pool."""
+    length = int(rng.lognormvariate(profile['text_length_mu'], profile['text_length_sigma']))
+    length = max(20, min(length, profile['max_text_length'], len(_TEXT_POOL)))
+    start = rng.randrange(0, len(_TEXT_POOL) - length + 1)
+    return _TEXT_POOL[start:start + length]
+
+
+def _names(rng: random.Random, prefix: str, count: int) -> List[Dict[str, Any]]:
+    """Build localized names with exactly one default entry."""
+    default = rng.randrange(count) if count else -1
+    return [
+        {
+            'value': f"{prefix} {rng.randrange(100000)}",
+            'locale': _LOCALES[i % len(_LOCALES)],
+            'isDefault': i == default
+        }
+        for i in range(count)
+    ]
+
+
+def generate_hotel(giata_id: int, rng: random.Random, profile: Optional[Dict[str, Any]] = None) -> Dict[str, Any]:
+    """
+    Generate one hotel document.
+    
+    Args:
+        giata_id: Giata ID of the hotel
+        rng: Random generator (seeded by the caller for determinism)
+        profile: Overrides for DEFAULT_PROFILE
+        
+    Returns:
+        Hotel data in GIATA JSON shape
+    """
+    profile = dict(DEFAULT_PROFILE, **(profile or {}))
+    city_id = rng.randrange(1, 5000)
+    country = rng.choice(_COUNTRIES)
+    
+    return {
+        'giataId': giata_id,
+        'names': _names(rng, 'Hotel', profile['names']),
+        'city': {'giataId': city_id, 'names': _names(rng, 'City', 2)},
+        'destination': {'giataId': city_id // 10, 'names': _names(rng, 'Destination', 2)},
+        'country': {'code': country, 'names': _names(rng, 'Country', 2)},
+        'source': rng.choice(['giata', 'supplier_a', 'supplier_b']),
+        'ratings': [{'value': rng.choice([2, 3, 3.5, 4, 4.5, 5]), 'isDefault': True}],
+        'addresses': [{
+            'addressLines': [f"{rng.randrange(1, 300)} Main Street", f"District {rng.randrange(1, 20)}"],
+            'street': 'Main Street',
+            'streetNum': str(rng.randrange(1, 300)),
+            'zip': f"{rng.randrange(10000, 99999)}",
+            'cityName': f"City {city_id}",
+            'poBox': None,
+            'federalState': {'name': 'State', 'code': 'ST'}
+        }],
+        'phones': [
+            {'tech': 'phone', 'phone': f"+{rng.randrange(10**9, 10**10)}"},
+            {'tech': 'fax', 'phone': f"+{rng.randrange(10**9, 10**10)}"}
+        ],
+        'emails': [{'email': f"info{giata_id}@example.com"}],
+        'urls': [{'url': f"https://hotel{giata_id}.example.com"}],
+        'geoCodes': [{
+            'latitude': round(rng.uniform(-60, 70), 6),
+            'longitude': round(rng.uniform(-180, 180), 6),
+            'accuracy': rng.choice(['address', 'street', 'city'])
+        }],
+        'chains': [
+            {'giataId': rng.randrange(1, 500), 'names': _names(rng, 'Chain', 1)}
+            for _ in range(rng.randrange(0, 3))
+        ],
+        'roomTypes': [
+            {
+                'category': rng.choice(['Standard', 'Superior', 'Deluxe', 'Suite']),
+                'code': f"RT{i}",
+                'name': f"Room type {i}",
+                'type': rng.choice(['Single', 'Double', 'Twin']),
+                'variantId': f"V{i}",
+                'view': rng.choice(['Sea', 'City', 'Garden', None]),
+                'imageRelations': [rng.randrange(1, 10**6) for _ in range(rng.randrange(0, 4))],
+                'categoryInformation': {'attributeDefId': rng.randrange(1, 100), 'name': 'Category'},
+                'typeInformation': {'attributeDefId': rng.randrange(1, 100), 'name': 'Type'},
+                'viewInformation': {'attributeDefId': rng.randrange(1, 100), 'name': 'View'}
+            }
+            for i in range(profile['room_types'])
+        ],
+        'images': [
+            {
+                'baseName': f"{giata_id}_{i}",
+                'herf': f"https://images.example.com/{giata_id}/{i}.jpg",
+                'heroImage': i == 0,
+                'id': giata_id * 1000 + i,
+                'lastUpdate': f"20{rng.randrange(15, 26)}-{rng.randrange(1, 13):02d}-{rng.randrange(1, 29):02d}",
+                'motifType': rng.choice(_MOTIFS),
+                'sizes': [800, 320, 150]
+            }
+            for i in range(profile['images'])
+        ],
+        'facts': [
+            {
+                'factDefId': rng.randrange(1, 1000),
+                'attributes': [
+                    {
+                        'attributeDefId': rng.randrange(1, 1000),
+                        'unitDefId': rng.randrange(1, 20),
+                        'value': rng.choice(['yes', 'no', str(rng.randrange(1, 500))])
+                    }
+                    for _ in range(profile['attributes_per_fact'])
+                ]
+            }
+            for _ in range(profile['facts'])
+        ],
+        'texts': {
+            locale: {category: _text(rng, profile) for category in profile['text_categories']}
+            for locale in profile['text_locales']
+        },
+        'variantGroups': [f"group{rng.randrange(1, 50)}" for _ in range(rng.randrange(0, 3))]
+    }
+
+
+def write_corpus(
+    directory: str,
+    count: int,
+    seed: int = 42,
+    profile: Optional[Dict[str, Any]] = None
+) -> List[str]:
+    """
+    Write a corpus of hotel JSON files.
+    
+    The same (count, seed, profile) always produces byte-identical files.
+    
+    Args:
+        directory: Output directory (created if missing)
+        count: Number of hotels
+        seed: Random seed
+        profile: Overrides for DEFAULT_PROFILE
+        
+    Returns:
+        Paths of the written files
+    """
+    os.makedirs(directory, exist_ok=True)
+    rng = random.Random(seed)
+    paths = []
+    for i in range(count):
+        hotel = generate_hotel(100000 + i, rng, profile)
+        path = os.path.join(directory, f"hotel_{i:07d}.json")
+        with open(path, 'w', encoding='utf-8') as file:
+            json.dump(hotel, file, ensure_ascii=False)
+        paths.append(path)
+    return paths
@@ -0,0 +1,76 @@
+"""
+End-to-end benchmarks of ``main.process_batch`` over generated corpora.
+"""
+
+import os
+import tempfile
+import time
+from typing import Any, Dict, Optional
+
+from config.settings import config
+from extractors.hotel_extractor import HotelDataExtractor
+import main
+
+from .corpus import write_corpus
+
+
+def ensure_corpus(directory: str, count: int, seed: int = 42, profile: Optional[Dict[str, Any]] = None) -> str:
+    """
+    Generate a corpus unless ``directory`` already holds one of this size.
+    
+    Args:
+        directory: Corpus directory
+        count: Number of hotels
+        seed: Random seed
+        profile: Overrides for the corpus profile
+        
+    Returns:
+        The corpus directory
+    """
+    if os.path.isdir(directory):
+        existing = sum(1 for name in os.listdir(directory) if name.endswith('.json'))
+        if existing == count:
+            return directory
+    write_corpus(directory, count, seed=seed, profile=profile)
+    return directory
+
+
+def run_end_to_end(input_dir: str) -> Dict[str, float]:
+    """
+    Run ``main.process_batch`` once over a corpus.
+    
+    Caching is disabled and output goes to a temporary directory, so every run
+    does the full amount of work.
+    
+    Args:
+        input_dir: Directory of hotel JSON files
+        
+    Returns:
+        Files, bytes, seconds, files/sec and MB/sec of the run
+    """
+    names = [name for name in os.listdir(input_dir) if name.endswith('.json')]
+    total_bytes = sum(os.path.getsize(os.path.join(input_dir, name)) for name in names)
+    
+    saved_output = config.get('data.output_dir')
+    saved_cache = config.get('performance.cache_results')
+    with tempfile.TemporaryDirectory() as output_dir:
+        config.config['data']['output_dir'] = output_dir
+        config.config.setdefault('performance', {})['cache_results'] = False
+        try:
+            start = time.perf_counter()
+            success = main.process_batch(input_dir, HotelDataExtractor())
+            seconds = time.perf_counter() - start
+        finally:
+            config.config['data']['output_dir'] = saved_output
+            config.config['performance']['cache_results'] = saved_cache
+    
+    if not success:
+        raise RuntimeError(f"Batch processing failed for {input_dir}")
+    
+    return {
+        'files': len(names),
+        'bytes': total_bytes,
+        'seconds': round(seconds, 3),
+        'files_per_sec': round(len(names) / seconds, 2),
+        'mb_per_sec': round(total_bytes / seconds / 1024 / 1024, 2)
+    }
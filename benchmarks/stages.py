@@ -0,0 +1,75 @@
+"""
+Per-stage benchmarks: JSON loading, extraction, DataFrame construction and
+CSV writing (through pandas and row by row), each timed in isolation over the
+same set of files.
+"""
+
+import os
+import tempfile
+import time
+from typing import Any, Callable, Dict, List
+
+import pandas as pd
+
+from extractors.hotel_extractor import HotelDataExtractor
+from extractors.schema import apply_schema
+from utils.file_utils import load_json_file, save_csv_file
+
+
+def _best_of(repeat: int, func: Callable[[], Any]) -> float:
+    """Run func ``repeat`` times and return the fastest wall-clock time."""
+    best = float('inf')
+    for _ in range(repeat):
+        start = time.perf_counter()
+        func()
+        best = min(best, time.perf_counter() - start)
+    return best
+
+
+def _result(seconds: float, items: int, total_bytes: int) -> Dict[str, float]:
+    return {
+        'seconds': round(seconds, 6),
+        'files_per_sec': round(items / seconds, 2) if seconds else 0.0,
+        'mb_per_sec': round(total_bytes / seconds / 1024 / 1024, 2) if seconds else 0.0
+    }
+
+
+def run_stage_benchmarks(file_paths: List[str], repeat: int = 3) -> Dict[str, Dict[str, float]]:
+    """
+    Time each pipeline stage over the given files.
+    
+    Args:
+        file_paths: Input JSON files
+        repeat: Number of repetitions per stage (best time is reported)
+        
+    Returns:
+        Timing results keyed by stage name
+    """
+    total_bytes = sum(os.path.getsize(path) for path in file_paths)
+    count = len(file_paths)
+    extractor = HotelDataExtractor()
+    results = {}
+    
+    documents = [load_json_file(path) for path in file_paths]
+    seconds = _best_of(repeat, lambda: [load_json_file(path) for path in file_paths])
+    results['load_json_file'] = _result(seconds, count, total_bytes)
+    
+    file_ids = [os.path.basename(path) for path in file_paths]
+    records = [extractor.extract_hotel_data(doc, file_id) for doc, file_id in zip(documents, file_ids)]
+    seconds = _best_of(repeat, lambda: [
+        extractor.extract_hotel_data(doc, file_id) for doc, file_id in zip(documents, file_ids)
+    ])
+    results['extract_hotel_data'] = _result(seconds, count, total_bytes)
+    
+    df = apply_schema(pd.DataFrame(records))
+    seconds = _best_of(repeat, lambda: apply_schema(pd.DataFrame(records)))
+    results['dataframe'] = _result(seconds, count, total_bytes)
+    
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        output_path = os.path.join(tmp_dir, 'bench.csv')
+        seconds = _best_of(repeat, lambda: save_csv_file(df, output_path))
+        results['save_csv_file'] = _result(seconds, count, total_bytes)
+        seconds = _best_of(repeat, lambda: extractor.save_records(records, output_path))
+        results['save_records'] = _result(seconds, count, total_bytes)
+    
+    return results
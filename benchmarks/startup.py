@@ -0,0 +1,115 @@
+"""
+Startup benchmarks: cold time to import the CLI and to run ``--dry-run``.
+
+Every measurement runs in a fresh interpreter, so nothing the benchmark
+process has already imported (pandas, for the other stages) is shared.
+"""
+
+import os
+import subprocess
+import sys
+import time
+from typing import Any, Dict, List
+
+REPO_ROOT = os.path.abspath(os.path.join(os.path.dirname(__file__), '..'))
+SRC_DIR = os.path.join(REPO_ROOT, 'src')
+
+# Modules that importing the entry point must not load
+HEAVY_MODULES = ('pandas', 'numpy', 'pyarrow', 'yaml')
+
+COMMANDS = {
+    'import_main': [sys.executable, '-c', 'import main'],
+    'dry_run': [sys.executable, os.path.join(SRC_DIR, 'main.py'), '--dry-run']
+}
+
+
+def _environment() -> Dict[str, str]:
+    """Environment with ``src`` on the module search path."""
+    env = dict(os.environ)
+    env['PYTHONPATH'] = os.pathsep.join(filter(None, [SRC_DIR, env.get('PYTHONPATH')]))
+    return env
+
+
+def time_command(argv: List[str], repeat: int = 5) -> float:
+    """
+    Time a command in fresh subprocesses.
+    
+    Args:
+        argv: Command to run from the repository root
+        repeat: Number of runs
+        
+    Returns:
+        Best wall time in milliseconds
+    """
+    best = float('inf')
+    for _ in range(repeat):
+        start = time.perf_counter()
+        subprocess.run(argv, cwd=REPO_ROOT, env=_environment(), capture_output=True, check=True)
+        best = min(best, time.perf_counter() - start)
+    return best * 1000
+
+
+def import_profile(module: str = 'main', repeat: int = 5) -> Dict[str, Any]:
+    """
+    Measure a module's import time with ``python -X importtime``.
+    
+    Args:
+        module: Module to import
+        repeat: Number of runs
+        
+    Returns:
+        Best cumulative import time in milliseconds and the heavy modules it loaded
+    """
+    probe = (
+        f"import sys, {module}; "
+        f"print(' '.join(name for name in {HEAVY_MODULES!r} if name in sys.modules))"
+    )
+    best = float('inf')
+    loaded: List[str] = []
+    for _ in range(repeat):
+        run = subprocess.run(
+            [sys.executable, '-X', 'importtime', '-c', probe],
+            cwd=REPO_ROOT, env=_environment(), capture_output=True, text=True, check=True
+        )
+        # Lines look like "import time:   self [us] | cumulative | module"
+        for line in run.stderr.splitlines():
+            fields = line.split('|')
+            if len(fields) == 3 and fields[2].strip() == module:
+                best = min(best, int(fields[1]) / 1000)
+        loaded = run.stdout.split()
+    return {'import_ms': round(best, 2), 'heavy_modules': loaded}
+
+
+def run_startup_benchmarks(repeat: int = 5) -> Dict[str, Any]:
+    """
+    Run the startup benchmarks.
+    
+    Args:
+        repeat: Runs per measurement (the best is kept)
+        
+    Returns:
+        Import profile of ``main`` and wall times of each command
+    """
+    results = import_profile('main', repeat=repeat)
+    for name, argv in COMMANDS.items():
+        results[f"{name}_ms"] = round(time_command(argv, repeat=repeat), 2)
+    return results
+
+
+def check_budget(results: Dict[str, Any], budget_ms: float) -> List[str]:
+    """
+    Check startup results against an import-time budget.
+    
+    Args:
+        results: Output of run_startup_benchmarks
+        budget_ms: Allowed cumulative import time of ``main``
+        
+    Returns:
+        Descriptions of budget violations
+    """
+    violations = []
+    if results['import_ms'] > budget_ms:
+        violations.append(f"import main took {results['import_ms']:.1f} ms (budget {budget_ms:.0f} ms)")
+    if results['heavy_modules']:
+        violations.append(f"import main loaded {', '.join(results['heavy_modules'])}")
+    return violations
@@ -1,24 +1,53 @@
 """
 Configuration settings for the hotel data extraction tool.
+
+The YAML file is read on first use rather than at import, so importing any
+module stays cheap and the entry point can still switch to another file.
 """
 
 import os
-import yaml
 from pathlib import Path
-from typing import Dict, Any, List
+from typing import Dict, Any, List, Optional, Tuple
 
 
 class Config:
     """Configuration manager for the application."""
     
     def __init__(self, config_path: str = "config.yaml"):
-        """Initialize configuration from YAML file."""
+        """Initialize configuration; the YAML file is loaded on first use."""
         self.config_path = config_path
-        self.config = self._load_config()
-        self._validate_config()
+        self._config: Optional[Dict[str, Any]] = None
+    
+    @property
+    def config(self) -> Dict[str, Any]:
+        """Configuration values, loaded from the YAML file on first access."""
+        if self._config is None:
+            self._config = self._load_config()
+            try:
+                self._validate_config()
+            except ValueError:
+                self._config = None
+                raise
+        return self._config
+    
+    @config.setter
+    def config(self, value: Dict[str, Any]) -> None:
+        self._config = value
+    
+    def use_file(self, config_path: str) -> None:
+        """
+        Switch to another configuration file, read on next use.
+        
+        Args:
+            config_path: Path to the YAML file
+        """
+        if config_path != self.config_path:
+            self.config_path = config_path
+            self._config = None
     
     def _load_config(self) -> Dict[str, Any]:
         """Load configuration from YAML file."""
+        import yaml
         try:
             with open(self.config_path, 'r', encoding='utf-8') as file:
                 config = yaml.safe_load(file)
@@ -71,6 +100,47 @@ class Config:
         """Get cache directory path."""
         return self.get('performance.cache_dir', './data/cache')
     
+    def should_read_archives(self) -> bool:
+        """Check if .json.gz files and zip/tar bundles are read as input."""
+        return self.get('data.read_archives', False)
+    
+    def should_read_ndjson(self) -> bool:
+        """Check if .jsonl/.ndjson files are read as input."""
+        return self.get('data.read_ndjson', False)
+    
+    def get_max_depth(self) -> Optional[int]:
+        """Get how many subdirectory levels of the input directory are scanned (None for all)."""
+        return self.get('data.max_depth')
+    
+    def get_include_patterns(self) -> List[str]:
+        """Get glob patterns an input file must match."""
+        return self.get('data.include') or []
+    
+    def get_exclude_patterns(self) -> List[str]:
+        """Get glob patterns of input files and directories to skip."""
+        return self.get('data.exclude') or []
+    
+    def get_shard(self) -> Optional[Tuple[int, int]]:
+        """
+        Get the shard of the input this run processes.
+        
+        Returns:
+            (index, count) with index from 1 to count, or None to process everything
+            
+        Raises:
+            ValueError: If ``data.shard`` is not of the form "i/N"
+        """
+        shard = self.get('data.shard')
+        if not shard:
+            return None
+        try:
+            index, count = (int(part) for part in str(shard).split('/'))
+        except ValueError:
+            raise ValueError(f"Invalid shard {shard!r}: expected i/N, e.g. 1/4")
+        if not 1 <= index <= count:
+            raise ValueError(f"Invalid shard {shard!r}: i must be between 1 and N")
+        return index, count
+    
     def get_log_file(self) -> str:
         """Get log file path."""
         return self.get('logging.file', './logs/extraction.log')
@@ -79,6 +149,10 @@ class Config:
         """Get list of fields to extract."""
         return self.get('extraction.fields', [])
     
+    def should_extract_relational(self) -> bool:
+        """Check if names, room types, images and facts are also written as child tables."""
+        return self.get('extraction.relational', False)
+    
     def get_default_locale(self) -> str:
         """Get default locale for text extraction."""
         return self.get('extraction.default_locale', 'en')
@@ -91,6 +165,58 @@ class Config:
         """Get maximum number of workers."""
         return self.get('processing.max_workers', 4)
     
+    def should_process_in_parallel(self) -> bool:
+        """Check if batches should be spread across a process pool."""
+        return self.get('processing.parallel', False)
+    
+    def should_use_async_io(self) -> bool:
+        """Check if file reads should be overlapped with extraction."""
+        return self.get('processing.async_io', False)
+    
+    def get_read_concurrency(self) -> int:
+        """Get maximum number of concurrent file reads in async mode."""
+        return self.get('processing.read_concurrency', 16)
+    
+    def get_queue_size(self) -> int:
+        """Get number of files read ahead of extraction in async mode."""
+        return self.get('processing.queue_size', 64)
+    
+    def get_chunk_bytes(self) -> int:
+        """Get the size in bytes at which a worker's chunk of files is closed early."""
+        return int(self.get('processing.chunk_mb', 64) * 1024 * 1024)
+    
+    def get_watch_interval(self) -> float:
+        """Get the seconds between scans of the input directory in watch mode."""
+        return self.get('watch.poll_interval', 1.0)
+    
+    def get_watch_batch_files(self) -> int:
+        """Get the number of waiting files that closes a watch mode micro-batch."""
+        return self.get('watch.batch_files', 500)
+    
+    def get_watch_batch_window(self) -> float:
+        """Get the seconds a file may wait before its watch mode micro-batch is closed."""
+        return self.get('watch.batch_window', 5.0)
+    
+    def get_watch_settle_seconds(self) -> float:
+        """Get the minimum age of a file's mtime before watch mode picks it up."""
+        return self.get('watch.settle_seconds', 2.0)
+    
+    def should_watch_process_existing(self) -> bool:
+        """Check if watch mode also extracts the files present at startup."""
+        return self.get('watch.process_existing', False)
+    
+    def should_watch_use_notifications(self) -> bool:
+        """Check if watch mode uses filesystem change notifications (when watchdog is installed)."""
+        return self.get('watch.notify', True)
+    
+    def get_watch_full_rescan_interval(self) -> float:
+        """Get the seconds between full rescans of the input tree in watch mode (0 for never)."""
+        return self.get('watch.full_rescan_interval') or 0
+    
+    def get_ndjson_range_size(self) -> int:
+        """Get the size in bytes of the line ranges JSON Lines files are split into."""
+        return int(self.get('processing.ndjson_range_mb', 32) * 1024 * 1024)
+    
     def get_timeout(self) -> int:
         """Get processing timeout."""
         return self.get('processing.timeout', 30)
@@ -127,6 +253,26 @@ class Config:
         """Get compression format."""
         return self.get('output.compression')
     
+    def get_dedup_precedence(self) -> Optional[str]:
+        """Get how the row kept for a duplicated giataId is chosen (None to keep every row)."""
+        return self.get('output.dedup') or None
+    
+    def get_sqlite_commit_rows(self) -> int:
+        """Get how many rows SQLite output inserts per transaction."""
+        return self.get('output.sqlite.commit_rows', 100000)
+    
+    def get_sqlite_indexes(self) -> List[str]:
+        """Get the columns SQLite output indexes once the load is complete."""
+        return self.get('output.sqlite.indexes') or []
+    
+    def should_build_lookup_index(self) -> bool:
+        """Check if batch runs write a giataId lookup index next to their output."""
+        return self.get('output.lookup_index', False)
+    
+    def should_write_delta(self) -> bool:
+        """Check if batch runs also write the rows changed since the previous output."""
+        return self.get('output.delta', False)
+    
     def get_log_level(self) -> str:
         """Get logging level."""
         return self.get('logging.level', 'INFO')
@@ -143,6 +289,18 @@ class Config:
         """Get log backup count."""
         return self.get('logging.backup_count', 5)
     
+    def should_log_via_queue(self) -> bool:
+        """Check if log handlers run on a background thread."""
+        return self.get('logging.queue', False)
+    
+    def should_log_json(self) -> bool:
+        """Check if log records are written as JSON lines."""
+        return self.get('logging.json', False)
+    
+    def get_log_progress_every(self) -> int:
+        """Get how many files are processed between progress log lines."""
+        return self.get('logging.progress_every', 1000)
+    
     def get_memory_limit(self) -> str:
         """Get memory limit."""
         return self.get('performance.memory_limit', '2GB')
@@ -151,6 +309,27 @@ class Config:
         """Get chunk size for processing."""
         return self.get('performance.chunk_size', 1000)
     
+    def should_stream_output(self) -> bool:
+        """Check if batch output should be streamed to disk in chunks."""
+        return self.get('performance.streaming', False)
+    
+    def should_stream_json_arrays(self) -> bool:
+        """Check if JSON files holding a top-level array are scanned one item at a time."""
+        return self.get('performance.stream_json_arrays', False)
+    
+    def get_json_backend(self) -> str:
+        """Get JSON decoding backend."""
+        return self.get('performance.json_backend', 'auto')
+    
+    def get_mmap_threshold(self) -> Optional[int]:
+        """Get the size in bytes from which input files are memory-mapped (None to always read them)."""
+        mmap_mb = self.get('performance.mmap_min_mb', 4)
+        return None if mmap_mb is None else int(mmap_mb * 1024 * 1024)
+    
+    def should_collect_metrics(self) -> bool:
+        """Check if per-stage run metrics should be collected."""
+        return self.get('performance.metrics', False)
+    
     def should_cache_results(self) -> bool:
         """Check if results should be cached."""
         return self.get('performance.cache_results', True)
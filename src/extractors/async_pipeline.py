@@ -0,0 +1,142 @@
+"""
+Asyncio ingestion pipeline for hotel JSON files.
+
+File reads run concurrently in a thread pool and feed a bounded queue that the
+extraction stage drains in input order. While one file is being parsed and
+extracted, the next reads are already in flight, so storage latency (e.g. on a
+network-mounted input volume) is hidden behind CPU work. When the queue is
+full the reader stops scheduling new reads until extraction catches up.
+"""
+
+import asyncio
+from concurrent.futures import ThreadPoolExecutor
+from itertools import count
+from typing import Any, AsyncIterator, Dict, Iterable, Iterator, Optional, Tuple
+
+from config.settings import config
+from utils.logger import get_logger
+
+logger = get_logger(__name__)
+
+
+class AsyncFilePipeline:
+    """
+    Overlap file reads with extraction using asyncio.
+    """
+    
+    def __init__(
+        self,
+        extractor,
+        read_concurrency: Optional[int] = None,
+        queue_size: Optional[int] = None
+    ):
+        """
+        Initialize the pipeline.
+        
+        Args:
+            extractor: HotelDataExtractor used for the extraction stage
+            read_concurrency: Maximum concurrent file reads (defaults to config)
+            queue_size: Maximum files read ahead of extraction (defaults to config)
+        """
+        self.extractor = extractor
+        self.read_concurrency = max(1, read_concurrency or config.get_read_concurrency())
+        self.queue_size = max(self.read_concurrency, queue_size or config.get_queue_size())
+    
+    def iter_files(self, file_paths: Iterable[str]) -> Iterator[Tuple[str, Optional[Dict[str, Any]]]]:
+        """
+        Extract files, yielding results in input order.
+        
+        Drives a private event loop one result at a time, so it can be consumed
+        like HotelDataExtractor.iter_batch from synchronous code.
+        
+        Args:
+            file_paths: JSON file paths, consumed lazily (e.g. while a directory is scanned)
+            
+        Yields:
+            Tuples of (file path, extracted data or None if failed)
+        """
+        loop = asyncio.new_event_loop()
+        executor = ThreadPoolExecutor(max_workers=self.read_concurrency, thread_name_prefix='reader')
+        loop.set_default_executor(executor)
+        results = self.aiter_files(file_paths)
+        try:
+            while True:
+                try:
+                    yield loop.run_until_complete(results.__anext__())
+                except StopAsyncIteration:
+                    break
+        finally:
+            loop.run_until_complete(results.aclose())
+            loop.run_until_complete(loop.shutdown_default_executor())
+            loop.close()
+    
+    async def aiter_files(self, file_paths: Iterable[str]) -> AsyncIterator[Tuple[str, Optional[Dict[str, Any]]]]:
+        """
+        Asynchronously extract files, yielding results in input order.
+        
+        Args:
+            file_paths: JSON file paths, consumed lazily
+            
+        Yields:
+            Tuples of (file path, extracted data or None if failed)
+        """
+        queue: asyncio.Queue = asyncio.Queue(maxsize=self.queue_size)
+        semaphore = asyncio.Semaphore(self.read_concurrency)
+        producer = asyncio.ensure_future(self._produce(file_paths, queue, semaphore))
+        
+        logger.info(
+            f"Processing files with {self.read_concurrency} concurrent reads "
+            f"and {self.queue_size} files of read-ahead"
+        )
+        
+        try:
+            for i in count(1):
+                item = await queue.get()
+                if item is None:
+                    # Queued by the producer after the last file
+                    break
+                file_path, read_task = item
+                logger.debug("Processing file %d: %s", i, file_path)
+                
+                try:
+                    data, stamp = await read_task
+                except Exception as e:
+                    self.extractor.handle_failed_file(file_path, e)
+                    yield file_path, None
+                    continue
+                
+                yield file_path, self.extractor.process_single_file(file_path, data=data, stamp=stamp)
+            
+            await producer
+        finally:
+            # Stop reading ahead if the consumer went away early
+            producer.cancel()
+            pending = [producer]
+            while not queue.empty():
+                item = queue.get_nowait()
+                if item is not None:
+                    item[1].cancel()
+                    pending.append(item[1])
+            await asyncio.gather(*pending, return_exceptions=True)
+    
+    async def _produce(
+        self,
+        file_paths: Iterable[str],
+        queue: asyncio.Queue,
+        semaphore: asyncio.Semaphore
+    ) -> None:
+        """Schedule reads in input order, blocking while the queue is full."""
+        try:
+            for file_path in file_paths:
+                read_task = asyncio.ensure_future(self._read(file_path, semaphore))
+                await queue.put((file_path, read_task))
+        finally:
+            # Also ends the consumer's loop if listing the files failed; awaiting
+            # the producer then raises the error
+            await queue.put(None)
+    
+    async def _read(self, file_path: str, semaphore: asyncio.Semaphore) -> Tuple[bytes, Any]:
+        """Read one file in the thread pool, with its cache stamp (see HotelDataExtractor.read_input)."""
+        async with semaphore:
+            loop = asyncio.get_running_loop()
+            return await loop.run_in_executor(None, self.extractor.read_input, file_path)
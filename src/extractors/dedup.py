@@ -0,0 +1,281 @@
+"""
+Cross-file deduplication of extracted hotels by giataId.
+
+Supplier drops often carry the same hotel in several files (re-exports,
+corrections). The index below records, for every extracted record, only its
+giataId and a precedence score in two flat int64 arrays (16 bytes a record),
+never the row itself. Once all records have been seen, one sort picks the
+winning record of every giataId, and the caller keeps the records at the
+winning positions, whether they are held in a list or spilled to disk.
+
+Outputs deduplicated by ``mtime`` or ``images_lastUpdate`` also get
+``<output>.scores``, the precedence score of each row (its source file
+modification time, or the latest lastUpdate of all its images), so the
+outputs of shards can be deduplicated against each other when they are
+merged (see utils.shards).
+"""
+
+import hashlib
+import os
+import struct
+from array import array
+from datetime import datetime, timezone
+from typing import Any, Dict, Optional
+
+from utils.logger import get_logger
+
+logger = get_logger(__name__)
+
+# Which record of a giataId is kept
+PRECEDENCES = ('mtime', 'images_lastUpdate', 'first', 'last')
+
+# Score of a record whose precedence value is missing; loses to any real value
+_MISSING = -(2 ** 63)
+
+# Precedences decided by values the output columns do not hold, so their scores are kept next to it
+SCORED_PRECEDENCES = ('mtime', 'images_lastUpdate')
+
+# Key records carry their source file's modification time under while an output is deduplicated by mtime
+MTIME_KEY = '_mtime'
+
+# Key records carry the lastUpdate of each of their images under while deduplicated by images_lastUpdate
+IMAGE_DATES_KEY = '_imageDates'
+
+_SCORES_MAGIC = b'HTLSCR01'
+# magic, output size, precedence
+_SCORES_HEADER = struct.Struct('<8sQ24s')
+
+
+class GiataIdIndex:
+    """
+    Compact index choosing one record per giataId.
+    
+    Records are added in output order. The record with the highest score
+    wins; ties go to the record added last. Scores by precedence:
+    
+    - ``mtime``: modification time of the source file (newest wins)
+    - ``images_lastUpdate``: the latest lastUpdate of all the record's images
+    - ``first`` / ``last``: position in the output
+    
+    Records without a giataId are always kept.
+    """
+    
+    def __init__(self, precedence: str = 'mtime'):
+        """
+        Initialize the index.
+        
+        Args:
+            precedence: One of PRECEDENCES
+            
+        Raises:
+            ValueError: If the precedence is unknown
+        """
+        if precedence not in PRECEDENCES:
+            raise ValueError(
+                f"Unknown dedup precedence: {precedence} (expected one of {', '.join(PRECEDENCES)})"
+            )
+        self.precedence = precedence
+        self._ids = array('q')
+        self._scores = array('q')
+        # 1 for records with a giataId; the others are kept whatever their id slot holds
+        self._keyed = bytearray()
+    
+    def __len__(self) -> int:
+        return len(self._ids)
+    
+    def add(self, record: Dict[str, Any], score: Optional[int] = None) -> None:
+        """
+        Add the next record.
+        
+        Args:
+            record: Extracted flat record, carrying what its precedence is
+                scored by (see record_score)
+            score: Precedence score to use instead, e.g. one read back by
+                read_dedup_scores
+                
+        Raises:
+            ValueError: If the record does not carry what its precedence is scored by
+        """
+        position = len(self._ids)
+        giata_id = giata_id_key(record.get('giataId'))
+        self._keyed.append(giata_id is not None)
+        self._ids.append(giata_id if giata_id is not None else 0)
+        
+        if score is None:
+            if self.precedence == 'first':
+                score = -position
+            elif self.precedence == 'last':
+                score = 0
+            else:
+                score = record_score(self.precedence, record)
+        self._scores.append(score)
+    
+    def keep_mask(self):
+        """
+        Find the records to keep.
+        
+        Returns:
+            Boolean numpy array, True at the position of each giataId's winner
+        """
+        import numpy as np
+        ids = np.frombuffer(self._ids, dtype=np.int64) if self._ids else np.empty(0, dtype=np.int64)
+        scores = np.frombuffer(self._scores, dtype=np.int64) if self._scores else np.empty(0, dtype=np.int64)
+        keyed = np.frombuffer(bytes(self._keyed), dtype=bool)
+        keep = ~keyed
+        positions = np.flatnonzero(keyed)
+        if not len(positions):
+            return keep
+        
+        # Sort by giataId, then score, then position; each id's last entry wins
+        order = np.lexsort((positions, scores[positions], ids[positions]))
+        sorted_ids = ids[positions][order]
+        is_last = np.ones(len(positions), dtype=bool)
+        is_last[:-1] = sorted_ids[1:] != sorted_ids[:-1]
+        keep[positions[order[is_last]]] = True
+        
+        dropped = len(positions) - int(is_last.sum())
+        if dropped:
+            logger.info(f"Dropping {dropped} duplicate rows (keeping one per giataId by {self.precedence})")
+        return keep
+
+
+class DedupScoresBuilder:
+    """
+    Collect the precedence score of every row written to an output.
+    
+    Rows are added in output order, 8 bytes each. Call write once the output
+    file is complete.
+    """
+    
+    def __init__(self, precedence: str):
+        """
+        Initialize the builder.
+        
+        Args:
+            precedence: One of SCORED_PRECEDENCES
+        """
+        self.precedence = precedence
+        self._scores = array('q')
+    
+    def add(self, record: Dict[str, Any]) -> None:
+        """
+        Add the next row of the output.
+        
+        Args:
+            record: Extracted record, carrying what its precedence is scored by
+        """
+        self._scores.append(record_score(self.precedence, record))
+    
+    def write(self, output_path: str) -> str:
+        """
+        Write the scores of a complete output file.
+        
+        Args:
+            output_path: Output file the rows were written to
+            
+        Returns:
+            Path of the written file
+        """
+        path = dedup_scores_path(output_path)
+        header = _SCORES_HEADER.pack(_SCORES_MAGIC, os.path.getsize(output_path), self.precedence.encode('ascii'))
+        with open(path, 'wb') as file:
+            file.write(header)
+            file.write(self._scores.tobytes())
+        return path
+
+
+def dedup_scores_path(output_path: str) -> str:
+    """
+    Build the path of the precedence scores of an output file.
+    
+    Args:
+        output_path: Path of the main output file
+        
+    Returns:
+        Path such as 'extracted_hotels.csv.scores'
+    """
+    return f"{output_path}.scores"
+
+
+def read_dedup_scores(output_path: str, precedence: str) -> Optional[array]:
+    """
+    Read the precedence scores of the rows of an output file.
+    
+    Args:
+        output_path: Output file
+        precedence: Precedence the scores must have been written for
+        
+    Returns:
+        One score a row (missing values as the lowest int64), or None if
+        there are none for this precedence or the output changed since they
+        were written
+    """
+    path = dedup_scores_path(output_path)
+    if not os.path.exists(path):
+        return None
+    with open(path, 'rb') as file:
+        data = file.read()
+    if len(data) < _SCORES_HEADER.size:
+        return None
+    magic, output_size, written_for = _SCORES_HEADER.unpack_from(data)
+    if (magic != _SCORES_MAGIC or output_size != os.path.getsize(output_path)
+            or written_for.rstrip(b'\0') != precedence.encode('ascii')):
+        return None
+    scores = array('q')
+    scores.frombytes(data[_SCORES_HEADER.size:])
+    return scores
+
+
+def record_score(precedence: str, record: Dict[str, Any]) -> int:
+    """
+    Score a record by the mtime or images_lastUpdate precedence.
+    
+    Args:
+        precedence: One of SCORED_PRECEDENCES
+        record: Extracted record, with its source mtime under MTIME_KEY or
+            its image dates under IMAGE_DATES_KEY
+            
+    Returns:
+        Modification time in nanoseconds, or the latest image date in
+        microseconds since the epoch (the lowest int64 if missing)
+        
+    Raises:
+        ValueError: If the record does not carry the value
+    """
+    if precedence == 'mtime':
+        if MTIME_KEY not in record:
+            raise ValueError("Cannot deduplicate by mtime: records do not carry their source modification time")
+        mtime_ns = record[MTIME_KEY]
+        return mtime_ns if mtime_ns is not None else _MISSING
+    if IMAGE_DATES_KEY not in record:
+        raise ValueError("Cannot deduplicate by images_lastUpdate: the images field is not extracted")
+    return _date_score(record[IMAGE_DATES_KEY])
+
+
+def giata_id_key(value: Any) -> Optional[int]:
+    """Map a giataId to an int64 key, hashing ids that are not integers."""
+    if value is None or value == '' or (isinstance(value, float) and value != value):
+        return None
+    try:
+        key = int(value)
+        if -(2 ** 63) < key < 2 ** 63:
+            return key
+    except (TypeError, ValueError):
+        pass
+    digest = hashlib.blake2b(str(value).encode('utf-8'), digest_size=8).digest()
+    return int.from_bytes(digest, 'big', signed=True)
+
+
+def _date_score(value: Any) -> int:
+    """Turn an ISO date or timestamp into sortable microseconds since the epoch."""
+    if isinstance(value, (list, tuple)):
+        return max((_date_score(item) for item in value), default=_MISSING)
+    if not isinstance(value, str) or not value:
+        return _MISSING
+    try:
+        parsed = datetime.fromisoformat(value.replace('Z', '+00:00'))
+    except ValueError:
+        return _MISSING
+    if parsed.tzinfo is None:
+        parsed = parsed.replace(tzinfo=timezone.utc)
+    return int(parsed.timestamp() * 1_000_000)
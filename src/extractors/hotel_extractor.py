@@ -7,56 +7,272 @@ and converting them to structured CSV format.
 
 import os
 import json
-import pandas as pd
-from typing import Dict, Any, List, Optional
+import tempfile
+import time
+from array import array
+from collections import deque
+from contextlib import ExitStack
+from functools import cached_property
+from itertools import chain, groupby, islice, repeat
+from typing import TYPE_CHECKING, Any, Callable, Dict, Iterable, Iterator, List, Optional, Sized, Tuple
 from pathlib import Path
 
-from ..config.settings import config
-from ..utils.logger import get_logger
-from ..utils.file_utils import load_json_file, save_csv_file, move_failed_file
+from config.settings import config
+from utils.logger import configure_worker_logging, get_logger, get_worker_log_queue
+from utils.file_utils import (
+    ensure_directory, load_json_file, parse_json_bytes, read_file_bytes, save_csv_file, move_failed_file,
+    save_failed_member
+)
+from utils.sources import (
+    array_item_name, decompress_member, is_archive, is_json_array, is_multi_document, is_ndjson,
+    iter_archive_members, iter_json_array, iter_line_ranges, iter_ndjson_lines, ndjson_record_name,
+    source_file_id
+)
+from utils.writers import (
+    CSVChunkWriter, OutputWriter, child_table_path, get_writer_class, open_writer, output_filename
+)
+from utils.cache import STAMP_KEY, ResultManifest, content_digest
+from utils.discovery import InputFile, chunk_by_size
+from utils.json_backend import get_decoder
+from utils.lookup import SOURCE_KEY, LookupIndexBuilder
+from utils.metrics import enable_run_metrics, disable_run_metrics, get_run_metrics
+from .dedup import IMAGE_DATES_KEY, MTIME_KEY, SCORED_PRECEDENCES, DedupScoresBuilder, GiataIdIndex
+
+if TYPE_CHECKING:
+    import pandas as pd
 
 logger = get_logger(__name__)
 
 
+# Columns produced by the extractor, in output order
+DF_KEYS = [
+    'fileId', 'giataId', 'names_locale', 'names_value', 'country_code', 
+    'source', 'country_locale', 'country_value', 'destination_giataId', 
+    'destination_locale', 'destination_value', 'addresses_cityName', 
+    'addresses_federalState', 'addresses_federalStateCode', 
+    'addresses_federalStateName', 'addresses_poBox', 'addresses_street', 
+    'addresses_streetNum', 'addresses_value_addressLines', 'addresses_zip', 
+    'chains_giataId', 'chains_names', 'city_giataId', 'city_locale', 
+    'city_value', 'emails', 'urls', 'facts_attributes_attributeDefId', 
+    'facts_attributes_unitDefId', 'facts_attributes_value', 
+    'facts_factDefId', 'geoCodes_accuracy', 'geoCodes_latitude', 
+    'geoCodes_longitude', 'images_baseName', 'images_herf', 
+    'images_heroImage', 'images_id', 'images_lastUpdate', 
+    'images_motifType', 'images_sizes', 'phones_fax', 'phones_phone', 
+    'ratings_value', 'roomTypes_category', 
+    'roomTypes_categoryInformation_attributeDefId', 
+    'roomTypes_categoryInformation_name', 'roomTypes_code', 
+    'roomTypes_imageRelations', 'roomTypes_name', 'roomTypes_type', 
+    'roomTypes_typeInformation_attributeDefId', 
+    'roomTypes_typeInformation_name', 'roomTypes_variantId', 
+    'roomTypes_view', 'roomTypes_viewInformation_attributeDefId', 
+    'roomTypes_viewInformation_name', 'texts_en_Facilities', 
+    'texts_en_Location', 'texts_en_Meals', 'texts_en_Payment', 
+    'texts_en_Rooms', 'texts_en_Sports/Entertainment', 
+    'texts_en-US_Facilities', 'texts_en-US_Location', 'texts_en-US_Meals', 
+    'texts_en-US_Payment', 'texts_en-US_Rooms', 
+    'texts_en-US_Sports/Entertainment', 'variantGroups'
+]
+
+# Version of the row layout, part of the cache fingerprint; bump it whenever
+# extraction starts producing different values for the same input
+ROW_FORMAT_VERSION = 2
+
+# Extractable fields (extraction.fields) and the accessor filling each one,
+# in the order their columns are added to a record
+FIELD_ACCESSORS = [
+    ('giataId', '_fill_giata_id'),
+    ('names', '_fill_names'),
+    ('source', '_fill_source'),
+    ('ratings', '_fill_ratings'),
+    ('city', '_fill_city'),
+    ('destination', '_fill_destination'),
+    ('country', '_fill_country'),
+    ('addresses', '_fill_addresses'),
+    ('phones', '_fill_phones'),
+    ('emails', '_fill_emails'),
+    ('urls', '_fill_urls'),
+    ('geoCodes', '_fill_geo_codes'),
+    ('chains', '_fill_chains'),
+    ('roomTypes', '_fill_room_types'),
+    ('images', '_fill_images'),
+    ('facts', '_fill_facts'),
+    ('texts', '_fill_texts'),
+    ('variantGroups', '_fill_variant_groups')
+]
+
+# Text locales and categories flattened into texts_<locale>_<category> columns
+TEXT_LOCALES = ['en', 'en-US']
+TEXT_CATEGORIES = ['Facilities', 'Location', 'Meals', 'Payment', 'Rooms', 'Sports/Entertainment']
+TEXT_COLUMNS = [
+    (locale, [(category, f'texts_{locale}_{category}') for category in TEXT_CATEGORIES])
+    for locale in TEXT_LOCALES
+]
+
+
+def field_columns(field: str, columns: List[str] = DF_KEYS) -> List[str]:
+    """
+    Get the output columns produced by an extractable field.
+    
+    Args:
+        field: Field name from extraction.fields (e.g. 'city')
+        columns: Candidate columns
+        
+    Returns:
+        Matching columns, in the given order
+    """
+    return [column for column in columns if column == field or column.startswith(f"{field}_")]
+
+
+# Record key holding the child table rows of relational extraction
+CHILD_ROWS_KEY = '_tables'
+
+# Keys of side data records carry through the pipeline, never written as columns
+_PRIVATE_KEYS = (CHILD_ROWS_KEY, SOURCE_KEY, MTIME_KEY, IMAGE_DATES_KEY)
+
+# Child tables of relational extraction: (table, field it is extracted for,
+# row builder, columns); every row is keyed by the hotel's giataId
+CHILD_TABLES = [
+    ('names', 'names', '_rows_names', ['giataId', 'names_locale', 'names_value', 'names_isDefault']),
+    ('rooms', 'roomTypes', '_rows_room_types', ['giataId'] + field_columns('roomTypes')),
+    ('images', 'images', '_rows_images', ['giataId'] + field_columns('images')),
+    ('facts', 'facts', '_rows_facts', ['giataId', 'facts_factDefId']),
+    ('fact_attributes', 'facts', '_rows_fact_attributes',
+     ['giataId', 'facts_factDefId'] + field_columns('facts_attributes'))
+]
+
+
+def _put_room_type(room: Dict[str, Any], row: Dict[str, Any]) -> None:
+    """Fill the roomTypes_* columns of one room type."""
+    row['roomTypes_category'] = room.get('category')
+    row['roomTypes_code'] = room.get('code')
+    row['roomTypes_name'] = room.get('name')
+    row['roomTypes_type'] = room.get('type')
+    row['roomTypes_variantId'] = room.get('variantId')
+    row['roomTypes_view'] = room.get('view')
+    row['roomTypes_imageRelations'] = room.get('imageRelations')
+    
+    # Category information
+    cat_info = room.get('categoryInformation', {})
+    row['roomTypes_categoryInformation_attributeDefId'] = cat_info.get('attributeDefId')
+    row['roomTypes_categoryInformation_name'] = cat_info.get('name')
+    
+    # Type information
+    type_info = room.get('typeInformation', {})
+    row['roomTypes_typeInformation_attributeDefId'] = type_info.get('attributeDefId')
+    row['roomTypes_typeInformation_name'] = type_info.get('name')
+    
+    # View information
+    view_info = room.get('viewInformation', {})
+    row['roomTypes_viewInformation_attributeDefId'] = view_info.get('attributeDefId')
+    row['roomTypes_viewInformation_name'] = view_info.get('name')
+
+
+def _put_image(img: Dict[str, Any], row: Dict[str, Any]) -> None:
+    """Fill the images_* columns of one image."""
+    row['images_baseName'] = img.get('baseName')
+    row['images_herf'] = img.get('herf')
+    row['images_heroImage'] = img.get('heroImage')
+    row['images_id'] = img.get('id')
+    row['images_lastUpdate'] = img.get('lastUpdate')
+    row['images_motifType'] = img.get('motifType')
+    row['images_sizes'] = img.get('sizes')
+
+
+def _put_fact_attribute(attr: Dict[str, Any], row: Dict[str, Any]) -> None:
+    """Fill the facts_attributes_* columns of one fact attribute."""
+    row['facts_attributes_attributeDefId'] = attr.get('attributeDefId')
+    row['facts_attributes_unitDefId'] = attr.get('unitDefId')
+    row['facts_attributes_value'] = attr.get('value')
+
+
 class HotelDataExtractor:
     """
     Main class for extracting hotel data from JSON files.
     """
     
-    def __init__(self):
-        """Initialize the hotel data extractor."""
-        self.df_keys = [
-            'fileId', 'giataId', 'names_locale', 'names_value', 'country_code', 
-            'source', 'country_locale', 'country_value', 'destination_giataId', 
-            'destination_locale', 'destination_value', 'addresses_cityName', 
-            'addresses_federalState', 'addresses_federalStateCode', 
-            'addresses_federalStateName', 'addresses_poBox', 'addresses_street', 
-            'addresses_streetNum', 'addresses_value_addressLines', 'addresses_zip', 
-            'chains_giataId', 'chains_names', 'city_giataId', 'city_locale', 
-            'city_value', 'emails', 'urls', 'facts_attributes_attributeDefId', 
-            'facts_attributes_unitDefId', 'facts_attributes_value', 
-            'facts_factDefId', 'geoCodes_accuracy', 'geoCodes_latitude', 
-            'geoCodes_longitude', 'images_baseName', 'images_herf', 
-            'images_heroImage', 'images_id', 'images_lastUpdate', 
-            'images_motifType', 'images_sizes', 'phones_fax', 'phones_phone', 
-            'ratings_value', 'roomTypes_category', 
-            'roomTypes_categoryInformation_attributeDefId', 
-            'roomTypes_categoryInformation_name', 'roomTypes_code', 
-            'roomTypes_imageRelations', 'roomTypes_name', 'roomTypes_type', 
-            'roomTypes_typeInformation_attributeDefId', 
-            'roomTypes_typeInformation_name', 'roomTypes_variantId', 
-            'roomTypes_view', 'roomTypes_viewInformation_attributeDefId', 
-            'roomTypes_viewInformation_name', 'texts_en_Facilities', 
-            'texts_en_Location', 'texts_en_Meals', 'texts_en_Payment', 
-            'texts_en_Rooms', 'texts_en_Sports/Entertainment', 
-            'texts_en-US_Facilities', 'texts_en-US_Location', 'texts_en-US_Meals', 
-            'texts_en-US_Payment', 'texts_en-US_Rooms', 
-            'texts_en-US_Sports/Entertainment', 'variantGroups'
-        ]
+    def __init__(
+        self,
+        fields: Optional[List[str]] = None,
+        relational: Optional[bool] = None,
+        dedup_by: Optional[str] = None,
+        lookup_index: Optional[bool] = None
+    ):
+        """
+        Initialize the hotel data extractor.
         
-        self.output_df = pd.DataFrame(columns=self.df_keys)
+        Args:
+            fields: Fields to extract (defaults to extraction.fields, all if empty)
+            relational: Also emit every name, room type, image and fact as rows
+                of child tables (defaults to extraction.relational)
+            dedup_by: Keep one row per giataId in batch output, chosen by this
+                precedence (see extractors.dedup; defaults to output.dedup,
+                '' to keep every row)
+            lookup_index: Write a giataId lookup index next to batch output
+                (see utils.lookup; defaults to output.lookup_index)
+        """
         self.default_locale = config.get_default_locale()
         self.default_only = config.get('extraction.default_only', True)
+        
+        self.fields = self._resolve_fields(fields)
+        selected = {column for field in self.fields for column in field_columns(field)}
+        self.df_keys = ['fileId'] + [column for column in DF_KEYS[1:] if column in selected]
+        self._plan = self._compile_plan(self.fields)
+        
+        if relational is None:
+            relational = config.should_extract_relational()
+        tables = [entry for entry in CHILD_TABLES if relational and entry[1] in self.fields]
+        self.child_tables: Dict[str, List[str]] = {table: columns for table, _, _, columns in tables}
+        self._child_plan = [(table, getattr(self, builder)) for table, _, builder, _ in tables]
+        
+        self.dedup_by = config.get_dedup_precedence() if dedup_by is None else dedup_by or None
+        if self.dedup_by:
+            # Fail on an unknown precedence before any file is processed
+            GiataIdIndex(self.dedup_by)
+            if self.dedup_by == 'images_lastUpdate' and 'images' not in self.fields:
+                raise ValueError("Deduplicating by images_lastUpdate needs the images field extracted")
+        # Whether records keep the lastUpdate of every image, not only the first one's
+        self._keep_image_dates = self.dedup_by == 'images_lastUpdate'
+        # Likewise for the JSON backend, so a bad name is not taken for malformed input
+        get_decoder()
+        self.lookup_index = config.should_build_lookup_index() if lookup_index is None else lookup_index
+        # When a list, failures are collected here instead of being reported,
+        # for workers that do not know a record's final name yet
+        self._deferred_failures: Optional[List[Tuple[Exception, Optional[bytes]]]] = None
+        # Whether plain files are stamped for the result manifest as they are read
+        self._stamp_sources = False
+    
+    @cached_property
+    def output_df(self) -> 'pd.DataFrame':
+        """Empty DataFrame with the output columns, built on first use."""
+        import pandas as pd
+        return pd.DataFrame(columns=self.df_keys)
+    
+    def _resolve_fields(self, fields: Optional[List[str]]) -> List[str]:
+        """Validate the requested fields, keeping the canonical order."""
+        known = [field for field, _ in FIELD_ACCESSORS]
+        requested = fields if fields is not None else config.get_extraction_fields()
+        if not requested:
+            return known
+        
+        unknown = [field for field in requested if field not in known]
+        if unknown:
+            logger.warning(f"Ignoring unknown extraction fields: {', '.join(unknown)}")
+        
+        return [field for field in known if field in requested]
+    
+    def _compile_plan(self, fields: List[str]) -> List[Callable[[Dict[str, Any], Dict[str, Any]], None]]:
+        """
+        Build the extraction plan for the selected fields.
+        
+        Args:
+            fields: Selected fields, in canonical order
+            
+        Returns:
+            Bound accessors, each filling its columns of a record in place
+        """
+        accessors = dict(FIELD_ACCESSORS)
+        return [getattr(self, accessors[field]) for field in fields]
     
     def extract_hotel_data(self, json_data: Dict[str, Any], file_id: str) -> Dict[str, Any]:
         """
@@ -71,180 +287,136 @@ class HotelDataExtractor:
         """
         try:
             plain_dict = {'fileId': file_id}
-            
-            # Extract basic information
-            plain_dict.update(self._extract_basic_info(json_data))
-            
-            # Extract location information
-            plain_dict.update(self._extract_location_info(json_data))
-            
-            # Extract contact information
-            plain_dict.update(self._extract_contact_info(json_data))
-            
-            # Extract geographic information
-            plain_dict.update(self._extract_geo_info(json_data))
-            
-            # Extract chain information
-            plain_dict.update(self._extract_chain_info(json_data))
-            
-            # Extract room types
-            plain_dict.update(self._extract_room_types(json_data))
-            
-            # Extract images
-            plain_dict.update(self._extract_images(json_data))
-            
-            # Extract facts
-            plain_dict.update(self._extract_facts(json_data))
-            
-            # Extract texts
-            plain_dict.update(self._extract_texts(json_data))
-            
-            # Extract variant groups
-            plain_dict.update(self._extract_variant_groups(json_data))
-            
+            for fill in self._plan:
+                fill(json_data, plain_dict)
+            if self._child_plan:
+                giata_id = json_data.get('giataId')
+                plain_dict[CHILD_ROWS_KEY] = {
+                    table: build(json_data, giata_id) for table, build in self._child_plan
+                }
             return plain_dict
-            
+        
         except Exception as e:
-            logger.error(f"Error extracting data from file {file_id}: {e}")
+            logger.error("Error extracting data from file %s: %s", file_id, e)
             raise
     
-    def _extract_basic_info(self, json_data: Dict[str, Any]) -> Dict[str, Any]:
-        """Extract basic hotel information."""
-        plain_dict = {}
-        
-        # Giata ID
-        plain_dict['giataId'] = json_data.get('giataId')
-        
-        # Names
-        plain_dict['names_value'] = str
-        plain_dict['names_locale'] = str
-        
-        for name_dict in json_data.get('names', []):
-            if not self.default_only or name_dict.get('isDefault', False):
-                plain_dict['names_value'] = name_dict.get('value')
-                plain_dict['names_locale'] = name_dict.get('locale')
-                if self.default_only:
-                    break
-        
-        # Source
-        plain_dict['source'] = json_data.get('source')
-        
-        # Ratings
-        for rating_dict in json_data.get('ratings', []):
-            if not self.default_only or rating_dict.get('isDefault', False):
-                plain_dict['ratings_value'] = rating_dict.get('value')
-                if self.default_only:
-                    break
-        
-        return plain_dict
+    def _pick(self, items: List[Dict[str, Any]]) -> Optional[Dict[str, Any]]:
+        """Pick the default entry (or the last one when default_only is off)."""
+        if self.default_only:
+            for item in items:
+                if item.get('isDefault', False):
+                    return item
+            return None
+        return items[-1] if items else None
     
-    def _extract_location_info(self, json_data: Dict[str, Any]) -> Dict[str, Any]:
-        """Extract location information."""
-        plain_dict = {}
-        
-        # City information
+    def _fill_giata_id(self, json_data: Dict[str, Any], row: Dict[str, Any]) -> None:
+        """Fill the Giata ID."""
+        row['giataId'] = json_data.get('giataId')
+    
+    def _fill_names(self, json_data: Dict[str, Any], row: Dict[str, Any]) -> None:
+        """Fill the hotel name."""
+        name_dict = self._pick(json_data.get('names', []))
+        if name_dict is not None:
+            row['names_value'] = name_dict.get('value')
+            row['names_locale'] = name_dict.get('locale')
+        else:
+            row['names_value'] = None
+            row['names_locale'] = None
+    
+    def _fill_source(self, json_data: Dict[str, Any], row: Dict[str, Any]) -> None:
+        """Fill the data source."""
+        row['source'] = json_data.get('source')
+    
+    def _fill_ratings(self, json_data: Dict[str, Any], row: Dict[str, Any]) -> None:
+        """Fill the rating."""
+        rating_dict = self._pick(json_data.get('ratings', []))
+        if rating_dict is not None:
+            row['ratings_value'] = rating_dict.get('value')
+    
+    def _fill_city(self, json_data: Dict[str, Any], row: Dict[str, Any]) -> None:
+        """Fill city information."""
         city_data = json_data.get('city', {})
-        plain_dict['city_giataId'] = city_data.get('giataId')
-        
-        for name_dict in city_data.get('names', []):
-            if not self.default_only or name_dict.get('isDefault', False):
-                plain_dict['city_value'] = name_dict.get('value')
-                plain_dict['city_locale'] = name_dict.get('locale')
-                if self.default_only:
-                    break
+        row['city_giataId'] = city_data.get('giataId')
         
-        # Destination information
+        name_dict = self._pick(city_data.get('names', []))
+        if name_dict is not None:
+            row['city_value'] = name_dict.get('value')
+            row['city_locale'] = name_dict.get('locale')
+    
+    def _fill_destination(self, json_data: Dict[str, Any], row: Dict[str, Any]) -> None:
+        """Fill destination information."""
         dest_data = json_data.get('destination', {})
-        plain_dict['destination_giataId'] = dest_data.get('giataId')
+        row['destination_giataId'] = dest_data.get('giataId')
         
-        for name_dict in dest_data.get('names', []):
-            if not self.default_only or name_dict.get('isDefault', False):
-                plain_dict['destination_value'] = name_dict.get('value')
-                plain_dict['destination_locale'] = name_dict.get('locale')
-                if self.default_only:
-                    break
-        
-        # Country information
+        name_dict = self._pick(dest_data.get('names', []))
+        if name_dict is not None:
+            row['destination_value'] = name_dict.get('value')
+            row['destination_locale'] = name_dict.get('locale')
+    
+    def _fill_country(self, json_data: Dict[str, Any], row: Dict[str, Any]) -> None:
+        """Fill country information."""
         country_data = json_data.get('country', {})
-        plain_dict['country_code'] = country_data.get('code')
-        
-        for name_dict in country_data.get('names', []):
-            if not self.default_only or name_dict.get('isDefault', False):
-                plain_dict['country_value'] = name_dict.get('value')
-                plain_dict['country_locale'] = name_dict.get('locale')
-                if self.default_only:
-                    break
+        row['country_code'] = country_data.get('code')
         
-        # Addresses
+        name_dict = self._pick(country_data.get('names', []))
+        if name_dict is not None:
+            row['country_value'] = name_dict.get('value')
+            row['country_locale'] = name_dict.get('locale')
+    
+    def _fill_addresses(self, json_data: Dict[str, Any], row: Dict[str, Any]) -> None:
+        """Fill the first address."""
         addresses = json_data.get('addresses', [])
         if addresses:
             addr = addresses[0]  # Take first address
-            plain_dict['addresses_value_addressLines'] = ', '.join(addr.get('addressLines', []))
-            plain_dict['addresses_street'] = addr.get('street')
-            plain_dict['addresses_streetNum'] = addr.get('streetNum')
-            plain_dict['addresses_zip'] = addr.get('zip')
-            plain_dict['addresses_cityName'] = addr.get('cityName')
-            plain_dict['addresses_poBox'] = addr.get('poBox')
+            row['addresses_value_addressLines'] = ', '.join(addr.get('addressLines', []))
+            row['addresses_street'] = addr.get('street')
+            row['addresses_streetNum'] = addr.get('streetNum')
+            row['addresses_zip'] = addr.get('zip')
+            row['addresses_cityName'] = addr.get('cityName')
+            row['addresses_poBox'] = addr.get('poBox')
             
             federal_state = addr.get('federalState', {})
             if federal_state:
-                plain_dict['addresses_federalStateName'] = federal_state.get('name')
-                plain_dict['addresses_federalStateCode'] = federal_state.get('code')
-        
-        return plain_dict
+                row['addresses_federalStateName'] = federal_state.get('name')
+                row['addresses_federalStateCode'] = federal_state.get('code')
     
-    def _extract_contact_info(self, json_data: Dict[str, Any]) -> Dict[str, Any]:
-        """Extract contact information."""
-        plain_dict = {}
-        
-        # Phones
-        phones = json_data.get('phones', [])
+    def _fill_phones(self, json_data: Dict[str, Any], row: Dict[str, Any]) -> None:
+        """Fill phone and fax numbers."""
         phone_list = []
         fax_list = []
         
-        for phone_dict in phones:
+        for phone_dict in json_data.get('phones', []):
             if phone_dict.get('tech') == 'phone':
                 phone_list.append(str(phone_dict.get('phone')))
             else:
                 fax_list.append(phone_dict.get('phone'))
         
-        plain_dict['phones_phone'] = phone_list
-        plain_dict['phones_fax'] = fax_list
-        
-        # Emails
-        emails = json_data.get('emails', [])
-        email_list = [str(email_dict.get('email')) for email_dict in emails]
-        plain_dict['emails'] = email_list
-        
-        # URLs
-        urls = json_data.get('urls', [])
-        url_list = [str(url_dict.get('url')) for url_dict in urls]
-        plain_dict['urls'] = url_list
-        
-        return plain_dict
+        row['phones_phone'] = phone_list
+        row['phones_fax'] = fax_list
     
-    def _extract_geo_info(self, json_data: Dict[str, Any]) -> Dict[str, Any]:
-        """Extract geographic information."""
-        plain_dict = {}
-        
+    def _fill_emails(self, json_data: Dict[str, Any], row: Dict[str, Any]) -> None:
+        """Fill email addresses."""
+        row['emails'] = [str(email_dict.get('email')) for email_dict in json_data.get('emails', [])]
+    
+    def _fill_urls(self, json_data: Dict[str, Any], row: Dict[str, Any]) -> None:
+        """Fill URLs."""
+        row['urls'] = [str(url_dict.get('url')) for url_dict in json_data.get('urls', [])]
+    
+    def _fill_geo_codes(self, json_data: Dict[str, Any], row: Dict[str, Any]) -> None:
+        """Fill the first geocode."""
         geocodes = json_data.get('geoCodes', [])
         if geocodes:
             geo = geocodes[0]  # Take first geocode
-            plain_dict['geoCodes_latitude'] = geo.get('latitude')
-            plain_dict['geoCodes_longitude'] = geo.get('longitude')
-            plain_dict['geoCodes_accuracy'] = geo.get('accuracy')
-        
-        return plain_dict
+            row['geoCodes_latitude'] = geo.get('latitude')
+            row['geoCodes_longitude'] = geo.get('longitude')
+            row['geoCodes_accuracy'] = geo.get('accuracy')
     
-    def _extract_chain_info(self, json_data: Dict[str, Any]) -> Dict[str, Any]:
-        """Extract chain information."""
-        plain_dict = {}
-        
-        chains = json_data.get('chains', [])
+    def _fill_chains(self, json_data: Dict[str, Any], row: Dict[str, Any]) -> None:
+        """Fill chain IDs and names."""
         giata_ids = []
         names = []
         
-        for chain_dict in chains:
+        for chain_dict in json_data.get('chains', []):
             giata_ids.append(chain_dict.get('giataId'))
             
             for name_dict in chain_dict.get('names', []):
@@ -254,189 +426,1082 @@ class HotelDataExtractor:
                     if self.default_only:
                         break
         
-        plain_dict['chains_giataId'] = giata_ids
-        plain_dict['chains_names'] = names
-        
-        return plain_dict
+        row['chains_giataId'] = giata_ids
+        row['chains_names'] = names
     
-    def _extract_room_types(self, json_data: Dict[str, Any]) -> Dict[str, Any]:
-        """Extract room type information."""
-        plain_dict = {}
-        
+    def _fill_room_types(self, json_data: Dict[str, Any], row: Dict[str, Any]) -> None:
+        """Fill the first room type."""
         room_types = json_data.get('roomTypes', [])
         if room_types:
-            room = room_types[0]  # Take first room type
-            plain_dict['roomTypes_category'] = room.get('category')
-            plain_dict['roomTypes_code'] = room.get('code')
-            plain_dict['roomTypes_name'] = room.get('name')
-            plain_dict['roomTypes_type'] = room.get('type')
-            plain_dict['roomTypes_variantId'] = room.get('variantId')
-            plain_dict['roomTypes_view'] = room.get('view')
-            plain_dict['roomTypes_imageRelations'] = room.get('imageRelations')
-            
-            # Category information
-            cat_info = room.get('categoryInformation', {})
-            plain_dict['roomTypes_categoryInformation_attributeDefId'] = cat_info.get('attributeDefId')
-            plain_dict['roomTypes_categoryInformation_name'] = cat_info.get('name')
-            
-            # Type information
-            type_info = room.get('typeInformation', {})
-            plain_dict['roomTypes_typeInformation_attributeDefId'] = type_info.get('attributeDefId')
-            plain_dict['roomTypes_typeInformation_name'] = type_info.get('name')
-            
-            # View information
-            view_info = room.get('viewInformation', {})
-            plain_dict['roomTypes_viewInformation_attributeDefId'] = view_info.get('attributeDefId')
-            plain_dict['roomTypes_viewInformation_name'] = view_info.get('name')
-        
-        return plain_dict
+            _put_room_type(room_types[0], row)  # Take first room type
     
-    def _extract_images(self, json_data: Dict[str, Any]) -> Dict[str, Any]:
-        """Extract image information."""
-        plain_dict = {}
-        
+    def _fill_images(self, json_data: Dict[str, Any], row: Dict[str, Any]) -> None:
+        """Fill the first image."""
         images = json_data.get('images', [])
         if images:
-            img = images[0]  # Take first image
-            plain_dict['images_baseName'] = img.get('baseName')
-            plain_dict['images_herf'] = img.get('herf')
-            plain_dict['images_heroImage'] = img.get('heroImage')
-            plain_dict['images_id'] = img.get('id')
-            plain_dict['images_lastUpdate'] = img.get('lastUpdate')
-            plain_dict['images_motifType'] = img.get('motifType')
-            plain_dict['images_sizes'] = img.get('sizes')
-        
-        return plain_dict
+            _put_image(images[0], row)  # Take first image
+        if self._keep_image_dates:
+            row[IMAGE_DATES_KEY] = [img.get('lastUpdate') for img in images]
     
-    def _extract_facts(self, json_data: Dict[str, Any]) -> Dict[str, Any]:
-        """Extract facts information."""
-        plain_dict = {}
-        
+    def _fill_facts(self, json_data: Dict[str, Any], row: Dict[str, Any]) -> None:
+        """Fill the first fact and its first attribute."""
         facts = json_data.get('facts', [])
         if facts:
             fact = facts[0]  # Take first fact
-            plain_dict['facts_factDefId'] = fact.get('factDefId')
+            row['facts_factDefId'] = fact.get('factDefId')
             
             attributes = fact.get('attributes', [])
             if attributes:
-                attr = attributes[0]  # Take first attribute
-                plain_dict['facts_attributes_attributeDefId'] = attr.get('attributeDefId')
-                plain_dict['facts_attributes_unitDefId'] = attr.get('unitDefId')
-                plain_dict['facts_attributes_value'] = attr.get('value')
-        
-        return plain_dict
+                _put_fact_attribute(attributes[0], row)  # Take first attribute
     
-    def _extract_texts(self, json_data: Dict[str, Any]) -> Dict[str, Any]:
-        """Extract text information."""
-        plain_dict = {}
-        
+    def _fill_texts(self, json_data: Dict[str, Any], row: Dict[str, Any]) -> None:
+        """Fill English and US English texts."""
         texts = json_data.get('texts', {})
-        
-        # English texts
-        en_texts = texts.get('en', {})
-        plain_dict['texts_en_Facilities'] = en_texts.get('Facilities')
-        plain_dict['texts_en_Location'] = en_texts.get('Location')
-        plain_dict['texts_en_Meals'] = en_texts.get('Meals')
-        plain_dict['texts_en_Payment'] = en_texts.get('Payment')
-        plain_dict['texts_en_Rooms'] = en_texts.get('Rooms')
-        plain_dict['texts_en_Sports/Entertainment'] = en_texts.get('Sports/Entertainment')
-        
-        # US English texts
-        en_us_texts = texts.get('en-US', {})
-        plain_dict['texts_en-US_Facilities'] = en_us_texts.get('Facilities')
-        plain_dict['texts_en-US_Location'] = en_us_texts.get('Location')
-        plain_dict['texts_en-US_Meals'] = en_us_texts.get('Meals')
-        plain_dict['texts_en-US_Payment'] = en_us_texts.get('Payment')
-        plain_dict['texts_en-US_Rooms'] = en_us_texts.get('Rooms')
-        plain_dict['texts_en-US_Sports/Entertainment'] = en_us_texts.get('Sports/Entertainment')
-        
-        return plain_dict
+        for locale, columns in TEXT_COLUMNS:
+            locale_texts = texts.get(locale, {})
+            for category, column in columns:
+                row[column] = locale_texts.get(category)
     
-    def _extract_variant_groups(self, json_data: Dict[str, Any]) -> Dict[str, Any]:
-        """Extract variant groups information."""
-        plain_dict = {}
-        
-        variant_groups = json_data.get('variantGroups', [])
-        plain_dict['variantGroups'] = variant_groups
-        
-        return plain_dict
+    def _fill_variant_groups(self, json_data: Dict[str, Any], row: Dict[str, Any]) -> None:
+        """Fill variant groups."""
+        row['variantGroups'] = json_data.get('variantGroups', [])
+    
+    def _rows_names(self, json_data: Dict[str, Any], giata_id: Any) -> List[Dict[str, Any]]:
+        """Build a names row for every name of the hotel, in every locale."""
+        return [
+            {
+                'giataId': giata_id,
+                'names_locale': name_dict.get('locale'),
+                'names_value': name_dict.get('value'),
+                'names_isDefault': name_dict.get('isDefault', False)
+            }
+            for name_dict in json_data.get('names', [])
+        ]
+    
+    def _rows_room_types(self, json_data: Dict[str, Any], giata_id: Any) -> List[Dict[str, Any]]:
+        """Build a rooms row for every room type."""
+        rows = []
+        for room in json_data.get('roomTypes', []):
+            row = {'giataId': giata_id}
+            _put_room_type(room, row)
+            rows.append(row)
+        return rows
     
-    def process_single_file(self, file_path: str) -> Optional[Dict[str, Any]]:
+    def _rows_images(self, json_data: Dict[str, Any], giata_id: Any) -> List[Dict[str, Any]]:
+        """Build an images row for every image."""
+        rows = []
+        for img in json_data.get('images', []):
+            row = {'giataId': giata_id}
+            _put_image(img, row)
+            rows.append(row)
+        return rows
+    
+    def _rows_facts(self, json_data: Dict[str, Any], giata_id: Any) -> List[Dict[str, Any]]:
+        """Build a facts row for every fact."""
+        return [
+            {'giataId': giata_id, 'facts_factDefId': fact.get('factDefId')}
+            for fact in json_data.get('facts', [])
+        ]
+    
+    def _rows_fact_attributes(self, json_data: Dict[str, Any], giata_id: Any) -> List[Dict[str, Any]]:
+        """Build a fact_attributes row for every attribute of every fact."""
+        rows = []
+        for fact in json_data.get('facts', []):
+            for attr in fact.get('attributes', []):
+                row = {'giataId': giata_id, 'facts_factDefId': fact.get('factDefId')}
+                _put_fact_attribute(attr, row)
+                rows.append(row)
+        return rows
+    
+    def process_single_file(
+        self,
+        file_path: str,
+        data: Optional[bytes] = None,
+        member_name: Optional[str] = None,
+        stamp: Optional[Tuple[int, int, str]] = None
+    ) -> Optional[Dict[str, Any]]:
         """
         Process a single JSON file.
         
+        While results are being cached, the record of a plain file carries
+        the stamp of the bytes it was extracted from under STAMP_KEY, for
+        ResultManifest.record.
+        
         Args:
-            file_path: Path to the JSON file
+            file_path: Path to the JSON file (or to the archive holding it)
+            data: Contents of the file if already read (otherwise it is loaded)
+            member_name: Name of the document inside the archive (or the
+                ``<file>:<line>`` of the JSON Lines record, or the
+                ``<file>[<index>]`` of the JSON array item) at file_path;
+                used as its fileId
+            stamp: Stamp of data, as returned with it by read_input
             
         Returns:
             Extracted data dictionary or None if failed
         """
+        metrics = get_run_metrics()
+        start = time.perf_counter()
         try:
-            file_id = os.path.basename(file_path)
-            logger.info(f"Processing file: {file_id}")
+            file_id = source_file_id(member_name or os.path.basename(file_path))
+            logger.debug("Processing file: %s", file_id)
             
-            json_data = load_json_file(file_path)
-            extracted_data = self.extract_hotel_data(json_data, file_id)
+            if data is None and self._stamp_sources and member_name is None:
+                data, stamp = self.read_input(file_path)
+            if data is None:
+                json_data = load_json_file(file_path)
+            elif member_name is not None:
+                data = decompress_member(member_name, data)
+                json_data = parse_json_bytes(data, f"{member_name} in {file_path}")
+            else:
+                json_data = parse_json_bytes(data, file_path)
+            if metrics is None:
+                extracted_data = self.extract_hotel_data(json_data, file_id)
+            else:
+                extract_start = time.perf_counter()
+                extracted_data = self.extract_hotel_data(json_data, file_id)
+                finished = time.perf_counter()
+                metrics.add_time('extract', finished - extract_start)
+                metrics.record_file(finished - start)
+                metrics.count('records')
+            if stamp is not None:
+                extracted_data[STAMP_KEY] = stamp
             
-            logger.info(f"Successfully processed file: {file_id}")
+            logger.debug("Successfully processed file: %s", file_id)
             return extracted_data
-            
+        
         except Exception as e:
-            logger.error(f"Failed to process file {file_path}: {e}")
+            if metrics is not None:
+                metrics.record_file(time.perf_counter() - start)
+            self.handle_failed_file(file_path, e, member_name=member_name, data=data)
+            return None
+    
+    def read_input(self, file_path: str) -> Tuple[bytes, Optional[Tuple[int, int, str]]]:
+        """
+        Read a plain input file, stamping it while results are being cached.
+        
+        The file is stat'ed before it is read and hashed as it is read, so
+        the stamp never describes newer contents than the bytes returned.
+        
+        Args:
+            file_path: Path to the JSON file
             
-            if config.should_save_failed_files():
-                try:
-                    move_failed_file(file_path)
-                except Exception as move_error:
-                    logger.error(f"Failed to move failed file {file_path}: {move_error}")
+        Returns:
+            The file's contents, and its (size, mtime_ns, content hash) stamp
+            or None when results are not being cached
+        """
+        if not self._stamp_sources:
+            return read_file_bytes(file_path), None
+        stat = os.stat(file_path)
+        digest = content_digest()
+        data = read_file_bytes(file_path, digest)
+        return data, (stat.st_size, stat.st_mtime_ns, digest.hexdigest())
+    
+    def is_multi_document(self, file_path: str) -> bool:
+        """
+        Check if a file yields more than one record.
+        
+        Args:
+            file_path: Path to the input file
             
-            return None
+        Returns:
+            True for archives, JSON Lines files and, when
+            ``performance.stream_json_arrays`` is enabled, JSON array files
+        """
+        if is_multi_document(file_path):
+            return True
+        if not config.should_stream_json_arrays():
+            return False
+        # Discovered files keep the answer, so each is peeked at once a run
+        return file_path.json_array if isinstance(file_path, InputFile) else is_json_array(file_path)
     
-    def process_batch(self, file_paths: List[str]) -> pd.DataFrame:
+    def handle_failed_file(
+        self,
+        file_path: str,
+        error: Exception,
+        member_name: Optional[str] = None,
+        data: Optional[bytes] = None
+    ) -> None:
+        """
+        Log a file that could not be processed and quarantine it.
+        
+        Archive members and JSON Lines records are copied out to the failed
+        directory; the file holding them stays where it is.
+        
+        Args:
+            file_path: Path to the failed file (or to the archive holding it)
+            error: Exception raised while reading, parsing or extracting it
+            member_name: Name of the failed archive member or JSON Lines record
+            data: Contents of the failed member
+        """
+        if self._deferred_failures is not None:
+            self._deferred_failures.append((error, data))
+            return
+        if member_name is not None:
+            logger.error("Failed to process member %s of %s: %s", member_name, file_path, error)
+        else:
+            logger.error("Failed to process file %s: %s", file_path, error)
+        metrics = get_run_metrics()
+        if metrics is not None:
+            metrics.count('failures')
+        
+        if config.should_save_failed_files():
+            try:
+                if member_name is not None:
+                    save_failed_member(file_path, member_name, data or b'')
+                else:
+                    move_failed_file(file_path)
+            except Exception as move_error:
+                logger.error("Failed to move failed file %s: %s", file_path, move_error)
+    
+    def process_batch(
+        self,
+        file_paths: Iterable[str],
+        parallel: Optional[bool] = None,
+        max_workers: Optional[int] = None,
+        use_cache: Optional[bool] = None
+    ) -> 'pd.DataFrame':
         """
         Process multiple JSON files in batch.
         
         Args:
-            file_paths: List of JSON file paths
+            file_paths: JSON file paths (a list, or an iterator such as iter_input_files)
+            parallel: Spread files across a process pool (defaults to config)
+            max_workers: Number of worker processes (defaults to config)
+            use_cache: Reuse rows of unchanged files from the manifest (defaults to config)
             
         Returns:
-            DataFrame with extracted data
+            DataFrame with extracted data (the hotel table only; child tables
+            of relational extraction are written by save_records)
         """
-        results = []
-        total_files = len(file_paths)
+        results = self.collect_batch(file_paths, parallel, max_workers, use_cache)
         
-        logger.info(f"Starting batch processing of {total_files} files")
+        # Create DataFrame
+        import pandas as pd
+        from extractors.schema import apply_schema
+        if results:
+            start = time.perf_counter()
+            df = apply_schema(pd.DataFrame(results).drop(columns=list(_PRIVATE_KEYS), errors='ignore'))
+            metrics = get_run_metrics()
+            if metrics is not None:
+                metrics.add_time('dataframe', time.perf_counter() - start)
+            return df
+        else:
+            return apply_schema(pd.DataFrame(columns=self.df_keys))
+    
+    def collect_batch(
+        self,
+        file_paths: Iterable[str],
+        parallel: Optional[bool] = None,
+        max_workers: Optional[int] = None,
+        use_cache: Optional[bool] = None
+    ) -> List[Dict[str, Any]]:
+        """
+        Process multiple JSON files in batch, keeping the records as dictionaries.
         
-        for i, file_path in enumerate(file_paths, 1):
-            logger.info(f"Processing file {i}/{total_files}: {os.path.basename(file_path)}")
+        With ``dedup_by`` set, only the winning record of each giataId is
+        returned, in output order.
+        
+        Args:
+            file_paths: JSON file paths (a list, or an iterator such as iter_input_files)
+            parallel: Spread files across a process pool (defaults to config)
+            max_workers: Number of worker processes (defaults to config)
+            use_cache: Reuse rows of unchanged files from the manifest (defaults to config)
             
-            result = self.process_single_file(file_path)
+        Returns:
+            Extracted records of the files that were processed successfully
+        """
+        results = []
+        index = GiataIdIndex(self.dedup_by) if self.dedup_by else None
+        total_files = len(file_paths) if isinstance(file_paths, Sized) else None
+        progress = _Progress(total_files)
+        
+        logger.info(f"Starting batch processing of {_describe_files(total_files)}")
+        
+        for file_path, result in self.iter_batch(file_paths, parallel, max_workers, use_cache):
             if result:
+                if self.lookup_index:
+                    result[SOURCE_KEY] = file_path
                 results.append(result)
-            
-            # Log progress
-            if i % 10 == 0 or i == total_files:
-                logger.info(f"Processed {i}/{total_files} files successfully")
+                if index is not None:
+                    self._add_to_index(index, result, file_path)
+            progress.step()
+        progress.done()
         
-        # Create DataFrame
         if results:
-            df = pd.DataFrame(results)
-            logger.info(f"Successfully processed {len(results)} out of {total_files} files")
-            return df
+            logger.info(f"Successfully processed {len(results)} out of {total_files or progress.count} files")
         else:
             logger.warning("No files were processed successfully")
-            return pd.DataFrame(columns=self.df_keys)
+        
+        if index is not None and results:
+            results = [result for result, keep in zip(results, index.keep_mask()) if keep]
+        return results
+    
+    def process_batch_to_file(
+        self,
+        file_paths: Iterable[str],
+        output_path: str = None,
+        parallel: Optional[bool] = None,
+        max_workers: Optional[int] = None,
+        chunk_size: Optional[int] = None,
+        use_cache: Optional[bool] = None,
+        append: bool = False
+    ) -> int:
+        """
+        Process multiple JSON files, streaming records straight to the output file.
+        
+        Unlike process_batch, no DataFrame of the whole batch is built: records
+        are flushed every ``chunk_size`` rows in ``df_keys`` column order, in
+        the format selected by ``output.format``. Child tables of relational
+        extraction are streamed the same way to files next to output_path.
+        With ``dedup_by`` set, records are first spilled to a temporary file
+        and only each giataId's winner is written, see _iter_deduplicated.
+        
+        Args:
+            file_paths: JSON file paths (a list, or an iterator such as iter_input_files)
+            output_path: Output file path
+            parallel: Spread files across a process pool (defaults to config)
+            max_workers: Number of worker processes (defaults to config)
+            chunk_size: Records per flush (defaults to performance.chunk_size)
+            use_cache: Reuse rows of unchanged files from the manifest (defaults to config)
+            append: Add to existing output files instead of replacing them (CSV only)
+            
+        Returns:
+            Number of records written
+        """
+        if output_path is None:
+            output_path = os.path.join(config.get_output_dir(), output_filename('extracted_hotels'))
+        
+        total_files = len(file_paths) if isinstance(file_paths, Sized) else None
+        progress = _Progress(total_files)
+        logger.info(f"Starting streaming batch processing of {_describe_files(total_files)}")
+        
+        results = _counted(self.iter_batch(file_paths, parallel, max_workers, use_cache), progress)
+        # An appended-to output holds rows of earlier runs the index would not cover
+        lookup = LookupIndexBuilder() if self.lookup_index and not append else None
+        if lookup is not None:
+            results = _with_sources(results)
+        if self.dedup_by:
+            records = self._iter_deduplicated(results)
+        else:
+            records = (result for _, result in results if result)
+        
+        # Shards keep the scores the columns do not hold, so merge_shard_outputs can compare them
+        scores = DedupScoresBuilder(self.dedup_by) if self.dedup_by in SCORED_PRECEDENCES and not append else None
+        with ExitStack() as stack:
+            writer = stack.enter_context(
+                open_writer(
+                    output_path, self.df_keys, chunk_size=chunk_size, append=append, key='giataId',
+                    track_offsets=lookup is not None
+                )
+            )
+            child_writers = self._open_child_writers(stack, output_path, chunk_size, append)
+            for record in records:
+                writer.write(record)
+                if child_writers:
+                    _write_child_rows(child_writers, record)
+                if lookup is not None:
+                    lookup.add(record)
+                if scores is not None:
+                    scores.add(record)
+        progress.done()
+        if lookup is not None:
+            lookup.write(output_path, writer.row_offsets, writer.rows_written)
+        if scores is not None:
+            scores.write(output_path)
+        
+        rows_written = writer.rows_written
+        logger.info(f"Successfully processed {rows_written} out of {total_files or progress.count} files")
+        logger.info(f"Results saved to: {output_path}")
+        return rows_written
+    
+    def _iter_deduplicated(
+        self,
+        results: Iterator[Tuple[str, Optional[Dict[str, Any]]]]
+    ) -> Iterator[Dict[str, Any]]:
+        """
+        Yield the winning record of each giataId, in output order.
+        
+        Records are spilled as JSON lines to a temporary file in the temp
+        directory while the index is built, then read back, so memory holds
+        the 16-byte-a-record index rather than the rows.
+        """
+        index = GiataIdIndex(self.dedup_by)
+        temp_dir = config.get_temp_dir()
+        ensure_directory(temp_dir)
+        with tempfile.TemporaryFile('w+', encoding='utf-8', dir=temp_dir) as spill:
+            for file_path, result in results:
+                if result:
+                    self._add_to_index(index, result, file_path)
+                    spill.write(json.dumps(result, ensure_ascii=False, default=str))
+                    spill.write('\n')
+            
+            keep = index.keep_mask()
+            spill.seek(0)
+            for keep_record, line in zip(keep, spill):
+                if keep_record:
+                    yield json.loads(line)
+    
+    def _add_to_index(self, index: GiataIdIndex, result: Dict[str, Any], file_path: str) -> None:
+        """Add a record to the dedup index, keeping its source mtime on it when that decides."""
+        if self.dedup_by == 'mtime':
+            result[MTIME_KEY] = _source_mtime(file_path)
+        index.add(result)
+    
+    def iter_batch(
+        self,
+        file_paths: Iterable[str],
+        parallel: Optional[bool] = None,
+        max_workers: Optional[int] = None,
+        use_cache: Optional[bool] = None
+    ) -> Iterator[Tuple[str, Optional[Dict[str, Any]]]]:
+        """
+        Extract files one by one, yielding results in input order.
+        
+        Archives and JSON Lines files yield one result per JSON member or
+        line, each paired with the path of the file holding it. file_paths
+        is consumed lazily, so extraction starts while a directory is still
+        being scanned.
+        
+        Args:
+            file_paths: JSON file paths (a list, or an iterator such as iter_input_files)
+            parallel: Spread files across a process pool (defaults to config)
+            max_workers: Number of worker processes (defaults to config)
+            use_cache: Reuse rows of unchanged files from the manifest (defaults to config)
+            
+        Yields:
+            Tuples of (file path, extracted data or None if failed)
+        """
+        if use_cache is None:
+            use_cache = config.should_cache_results()
+        
+        if use_cache:
+            self._stamp_sources = True
+            try:
+                with ResultManifest(self.settings_fingerprint()) as manifest:
+                    yield from self._iter_cached(file_paths, manifest, parallel, max_workers)
+            finally:
+                self._stamp_sources = False
+            return
+        
+        yield from self._iter_extracted(file_paths, parallel, max_workers)
+    
+    def settings_fingerprint(self) -> str:
+        """Identify the extraction settings that shape an output row."""
+        settings = [ROW_FORMAT_VERSION, self.df_keys, self.default_locale, self.default_only]
+        if self.child_tables:
+            settings.append(list(self.child_tables))
+        if self._keep_image_dates:
+            settings.append(IMAGE_DATES_KEY)
+        return json.dumps(settings, sort_keys=True)
+    
+    def _iter_cached(
+        self,
+        file_paths: Iterable[str],
+        manifest: ResultManifest,
+        parallel: Optional[bool],
+        max_workers: Optional[int]
+    ) -> Iterator[Tuple[str, Optional[Dict[str, Any]]]]:
+        """
+        Extract only new or changed files, merging in cached rows.
+        
+        file_paths is checked against the manifest in a single pass, as
+        extraction (or this merge) asks for more paths, and cached rows are
+        read back one at a time as the merged sequence is consumed, so memory
+        does not grow with the number of cached files. The manifest holds one
+        row per file, so archives, JSON Lines files and streamed JSON arrays
+        are always extracted.
+        """
+        file_paths = iter(file_paths)
+        # Checked paths not merged yet, as (path, stale), and stale paths not
+        # yet handed to extraction
+        checked = deque()
+        stale_paths = deque()
+        cache_hits = 0
+        
+        def check_next() -> bool:
+            nonlocal cache_hits
+            file_path = next(file_paths, None)
+            if file_path is None:
+                return False
+            stale = self.is_multi_document(file_path) or not manifest.is_current(file_path)
+            cache_hits += not stale
+            checked.append((file_path, stale))
+            if stale:
+                stale_paths.append(file_path)
+            return True
+        
+        def iter_stale() -> Iterator[str]:
+            while stale_paths or check_next():
+                if stale_paths:
+                    yield stale_paths.popleft()
+        
+        extracted = self._iter_extracted(iter_stale(), parallel, max_workers)
+        pending = None
+        
+        while checked or check_next():
+            file_path, stale = checked.popleft()
+            if not stale:
+                yield file_path, manifest.load_row(file_path)
+                continue
+            
+            if pending is None:
+                pending = next(extracted, None)
+            # One result per file, or one per member/line for multi-document files
+            while pending is not None and pending[0] == file_path:
+                result = pending[1]
+                if result and not self.is_multi_document(file_path):
+                    manifest.record(file_path, result)
+                yield pending
+                pending = next(extracted, None)
+        
+        metrics = get_run_metrics()
+        if metrics is not None:
+            metrics.count('cache_hits', cache_hits)
+    
+    def _iter_extracted(
+        self,
+        file_paths: Iterable[str],
+        parallel: Optional[bool],
+        max_workers: Optional[int]
+    ) -> Iterator[Tuple[str, Optional[Dict[str, Any]]]]:
+        """
+        Extract every file, serially, in a process pool or through the async pipeline.
+        
+        Runs of plain files and each multi-document file are handed to their
+        own stage in input order.
+        """
+        if parallel is None:
+            parallel = config.should_process_in_parallel()
+        max_workers = max_workers or config.get_max_workers()
+        parallel = parallel and max_workers > 1
+        
+        for multi_document, group in groupby(file_paths, key=self.is_multi_document):
+            if multi_document:
+                for file_path in group:
+                    if is_ndjson(file_path):
+                        yield from self._iter_ndjson(file_path, parallel, max_workers)
+                    elif is_archive(file_path):
+                        logger.info(f"Reading archive: {os.path.basename(file_path)}")
+                        members = iter_archive_members(file_path)
+                        yield from self._iter_members(file_path, members, parallel, max_workers)
+                    else:
+                        logger.info(f"Reading JSON array file: {os.path.basename(file_path)}")
+                        items = (
+                            (array_item_name(file_path, index), data)
+                            for index, data in iter_json_array(file_path)
+                        )
+                        yield from self._iter_members(file_path, items, parallel, max_workers)
+            else:
+                yield from self._iter_files(group, parallel, max_workers)
+    
+    def _iter_files(
+        self,
+        file_paths: Iterable[str],
+        parallel: bool,
+        max_workers: int
+    ) -> Iterator[Tuple[str, Optional[Dict[str, Any]]]]:
+        """Extract plain JSON files, consuming file_paths lazily."""
+        file_paths = iter(file_paths)
+        head = list(islice(file_paths, 2))
+        if not head:
+            return
+        file_paths = chain(head, file_paths)
+        
+        if parallel and len(head) > 1:
+            yield from self._iter_parallel(file_paths, max_workers)
+            return
+        
+        if config.should_use_async_io():
+            from .async_pipeline import AsyncFilePipeline
+            yield from AsyncFilePipeline(self).iter_files(file_paths)
+            return
+        
+        for i, file_path in enumerate(file_paths, 1):
+            logger.debug("Processing file %d: %s", i, file_path)
+            yield file_path, self.process_single_file(file_path)
+    
+    def _iter_members(
+        self,
+        file_path: str,
+        members: Iterator[Tuple[str, bytes]],
+        parallel: bool,
+        max_workers: int
+    ) -> Iterator[Tuple[str, Optional[Dict[str, Any]]]]:
+        """
+        Extract the documents of an archive or JSON array file.
+        
+        Members are read sequentially in this process, without unpacking
+        anything to disk; in parallel mode their bytes are sent to the pool
+        in ``batch_size`` chunks for parsing and extraction. A file that
+        cannot be opened or read is quarantined like a broken file.
+        """
+        try:
+            if parallel:
+                batch_size = max(1, config.get_batch_size())
+                tasks = (
+                    (repeat(file_path), _process_member_chunk, (file_path, chunk))
+                    for chunk in iter(lambda: list(islice(members, batch_size)), [])
+                )
+                yield from self._run_pool(tasks, max_workers)
+                return
+            
+            for member_name, data in members:
+                yield file_path, self.process_single_file(file_path, data=data, member_name=member_name)
+        except Exception as e:
+            self.handle_failed_file(file_path, e)
+            yield file_path, None
+    
+    def _iter_ndjson(
+        self,
+        file_path: str,
+        parallel: bool,
+        max_workers: int
+    ) -> Iterator[Tuple[str, Optional[Dict[str, Any]]]]:
+        """
+        Extract the records of a JSON Lines file, one hotel per line.
+        
+        The file is memory-mapped. In parallel mode it is split into byte
+        ranges on line boundaries, cut lazily as workers take them, and each
+        worker maps, decodes and counts the lines of its own range, so no
+        record data crosses process boundaries and the file is never scanned
+        up front. As ranges come back in order, their records are renumbered
+        with the lines of the ranges before. Malformed lines are quarantined
+        one by one; a file that cannot be read at all is quarantined like a
+        broken file.
+        """
+        logger.info(f"Reading JSON Lines file: {os.path.basename(file_path)}")
+        try:
+            range_size = config.get_ndjson_range_size()
+            if parallel and os.path.getsize(file_path) > range_size:
+                logger.info(f"Processing line ranges of up to {range_size} bytes with {max_workers} worker processes")
+                tasks = (
+                    ([file_path], _process_line_range, (file_path, start, end))
+                    for start, end in iter_line_ranges(file_path, range_size)
+                )
+                lines_before = 0
+                for _, (entries, line_count) in self._run_pool(tasks, max_workers):
+                    for line, record, failure in entries:
+                        member_name = ndjson_record_name(file_path, lines_before + line)
+                        if failure is not None:
+                            self.handle_failed_file(file_path, failure[0], member_name=member_name, data=failure[1])
+                        else:
+                            record['fileId'] = source_file_id(member_name)
+                        yield file_path, record
+                    lines_before += line_count
+                return
+            
+            for line, data in iter_ndjson_lines(file_path):
+                member_name = ndjson_record_name(file_path, line)
+                yield file_path, self.process_single_file(file_path, data=data, member_name=member_name)
+        except Exception as e:
+            self.handle_failed_file(file_path, e)
+            yield file_path, None
+    
+    def _iter_parallel(
+        self,
+        file_paths: Iterable[str],
+        max_workers: int
+    ) -> Iterator[Tuple[str, Optional[Dict[str, Any]]]]:
+        """
+        Extract files in a process pool, one chunk per task.
+        
+        Chunks hold up to ``batch_size`` files and are closed early once they
+        reach ``processing.chunk_mb``, using the sizes discovered paths carry,
+        so a run of large files does not all land on one worker. Chunks are
+        cut as paths arrive, so workers start before discovery finishes.
+        """
+        batch_size = max(1, config.get_batch_size())
+        chunks = chunk_by_size(file_paths, batch_size, config.get_chunk_bytes())
+        
+        logger.info(
+            f"Processing files in chunks of up to {batch_size} files "
+            f"with {max_workers} worker processes"
+        )
+        
+        tasks = ((chunk, _process_file_chunk, (chunk,)) for chunk in chunks)
+        yield from self._run_pool(tasks, max_workers)
+    
+    def _run_pool(
+        self,
+        tasks: Iterator[Tuple[List[str], Callable, tuple]],
+        max_workers: int
+    ) -> Iterator[Tuple[str, Optional[Dict[str, Any]]]]:
+        """
+        Run chunk tasks in a process pool.
+        
+        Each task is (result labels, worker function, arguments), where the
+        labels are zipped with the worker's results. Tasks are
+        submitted through a bounded window and collected in submission order,
+        so results come back exactly as a serial run would produce them
+        without buffering the whole batch.
+        """
+        from concurrent.futures import ProcessPoolExecutor
+        metrics = get_run_metrics()
+        with ProcessPoolExecutor(
+            max_workers=max_workers,
+            initializer=_init_worker,
+            initargs=(
+                metrics is not None, get_worker_log_queue(), config.config,
+                self.fields, bool(self.child_tables), self.default_only, self._stamp_sources,
+                self._keep_image_dates
+            )
+        ) as executor:
+            pending = deque()
+            
+            for labels, func, args in tasks:
+                pending.append((labels, executor.submit(func, *args)))
+                if len(pending) >= max_workers * 2:
+                    break
+            
+            while pending:
+                labels, future = pending.popleft()
+                results, worker_metrics = future.result()
+                if metrics is not None and worker_metrics is not None:
+                    metrics.merge(worker_metrics)
+                
+                next_task = next(tasks, None)
+                if next_task is not None:
+                    labels_next, func, args = next_task
+                    pending.append((labels_next, executor.submit(func, *args)))
+                
+                yield from zip(labels, results)
     
-    def save_results(self, df: pd.DataFrame, output_path: str = None) -> None:
+    def save_results(self, df: 'pd.DataFrame', output_path: str = None) -> None:
         """
-        Save extracted results to CSV file.
+        Save extracted results in the configured output format.
         
         Args:
             df: DataFrame with extracted data
             output_path: Output file path
         """
         if output_path is None:
-            output_path = os.path.join(config.get_output_dir(), 'extracted_hotels.csv')
+            output_path = os.path.join(config.get_output_dir(), output_filename('extracted_hotels'))
+        
+        if config.get_output_format().lower() == 'csv' and not config.get_compression():
+            save_csv_file(df, output_path)
+        else:
+            columns = [key for key in self.df_keys if key in df.columns]
+            columns += [key for key in df.columns if key not in columns]
+            with open_writer(output_path, columns, key='giataId') as writer:
+                writer.write_frame(df)
+        logger.info(f"Results saved to: {output_path}")
+    
+    def save_records(self, records: List[Dict[str, Any]], output_path: str = None) -> None:
+        """
+        Save extracted records in the configured output format.
+        
+        CSV output is serialized row by row without building a DataFrame and
+        matches what save_results writes for the same records byte for byte.
+        Child tables of relational extraction are written next to output_path.
+        
+        Args:
+            records: Extracted records
+            output_path: Output file path
+        """
+        if output_path is None:
+            output_path = os.path.join(config.get_output_dir(), output_filename('extracted_hotels'))
+        
+        if self.child_tables:
+            with ExitStack() as stack:
+                child_writers = self._open_child_writers(stack, output_path)
+                for record in records:
+                    _write_child_rows(child_writers, record)
+        
+        writer_class = get_writer_class()
+        if not writer_class.serializes_records or config.should_include_index():
+            import pandas as pd
+            from extractors.schema import apply_schema
+            df = pd.DataFrame(records).drop(columns=list(_PRIVATE_KEYS), errors='ignore')
+            self.save_results(apply_schema(df), output_path)
+            self._write_lookup_index(records, output_path, row_count=len(df))
+            self._write_dedup_scores(records, output_path)
+            return
+        
+        # Columns in first-seen order, as pd.DataFrame(records) would have them
+        columns = list(dict.fromkeys(key for record in records for key in record))
+        columns = [key for key in columns if key not in _PRIVATE_KEYS]
+        if writer_class is not CSVChunkWriter or config.get_compression():
+            columns = [key for key in self.df_keys if key in columns] + [
+                key for key in columns if key not in self.df_keys
+            ]
+        with open_writer(output_path, columns, key='giataId', track_offsets=self.lookup_index) as writer:
+            for record in records:
+                writer.write(record)
+        logger.info(f"Results saved to: {output_path}")
+        self._write_lookup_index(records, output_path, writer.row_offsets, writer.rows_written)
+        self._write_dedup_scores(records, output_path)
+    
+    def _write_lookup_index(
+        self,
+        records: List[Dict[str, Any]],
+        output_path: str,
+        row_offsets: Optional[array] = None,
+        row_count: Optional[int] = None
+    ) -> None:
+        """Write the lookup index of an output holding records, if enabled (see LookupIndexBuilder.write)."""
+        if not self.lookup_index:
+            return
+        lookup = LookupIndexBuilder()
+        for record in records:
+            lookup.add(record)
+        lookup.write(output_path, row_offsets, row_count)
+    
+    def _write_dedup_scores(self, records: List[Dict[str, Any]], output_path: str) -> None:
+        """Write the precedence scores of a deduplicated output, if needed (see DedupScoresBuilder)."""
+        if self.dedup_by not in SCORED_PRECEDENCES:
+            return
+        scores = DedupScoresBuilder(self.dedup_by)
+        for record in records:
+            scores.add(record)
+        scores.write(output_path)
+    
+    def _open_child_writers(
+        self,
+        stack: ExitStack,
+        output_path: str,
+        chunk_size: Optional[int] = None,
+        append: bool = False
+    ) -> Dict[str, OutputWriter]:
+        """
+        Open a writer for each child table, closed when the stack unwinds.
+        
+        Args:
+            stack: Exit stack owning the writers
+            output_path: Path of the main output file
+            chunk_size: Records per flush (defaults to performance.chunk_size)
+            append: Add to existing child tables instead of replacing them
+            
+        Returns:
+            Open writers by table name (empty unless extracting relationally)
+        """
+        return {
+            table: stack.enter_context(
+                open_writer(child_table_path(output_path, table), columns, chunk_size=chunk_size, append=append)
+            )
+            for table, columns in self.child_tables.items()
+        }
+
+
+def _write_child_rows(child_writers: Dict[str, OutputWriter], record: Dict[str, Any]) -> None:
+    """Pass the child table rows of a record to their writers."""
+    for table, rows in record.get(CHILD_ROWS_KEY, {}).items():
+        writer = child_writers[table]
+        for row in rows:
+            writer.write(row)
+
+
+def _counted(
+    results: Iterator[Tuple[str, Optional[Dict[str, Any]]]],
+    progress: "_Progress"
+) -> Iterator[Tuple[str, Optional[Dict[str, Any]]]]:
+    """Pass results through, counting each one in progress."""
+    for item in results:
+        yield item
+        progress.step()
+
+
+def _with_sources(
+    results: Iterator[Tuple[str, Optional[Dict[str, Any]]]]
+) -> Iterator[Tuple[str, Optional[Dict[str, Any]]]]:
+    """Pass results through, recording each record's source path for the lookup index."""
+    for file_path, result in results:
+        if result:
+            result[SOURCE_KEY] = file_path
+        yield file_path, result
+
+
+def _source_mtime(file_path: str) -> Optional[int]:
+    """Modification time of a record's source file, from discovery if it was recorded."""
+    mtime_ns = getattr(file_path, 'mtime_ns', 0)
+    if mtime_ns:
+        return mtime_ns
+    try:
+        return os.stat(file_path).st_mtime_ns
+    except OSError:
+        return None
+
+
+def _describe_files(total_files: Optional[int]) -> str:
+    """Describe a batch for logging, whose size is unknown while it is discovered."""
+    return f"{total_files} files" if total_files is not None else "files as they are discovered"
+
+
+class _Progress:
+    """
+    Log batch progress every ``logging.progress_every`` files instead of per file.
+    
+    The total is None while the input is still being discovered.
+    """
+    
+    def __init__(self, total: Optional[int]):
+        self.total = total
+        self.every = max(1, config.get_log_progress_every())
+        self.count = 0
+        self.start = time.perf_counter()
+    
+    def step(self) -> None:
+        """Count one result, logging every ``every`` results."""
+        self.count += 1
+        if self.count % self.every == 0:
+            self._log()
+    
+    def done(self) -> None:
+        """Log the final count unless it was just logged."""
+        if self.count % self.every:
+            self._log()
+    
+    def _log(self) -> None:
+        elapsed = time.perf_counter() - self.start
+        rate = self.count / elapsed if elapsed else 0.0
+        if self.total is None:
+            logger.info("Processed %d files (%.1f files/s)", self.count, rate)
+        else:
+            logger.info("Processed %d/%d files (%.1f files/s)", self.count, self.total, rate)
+
+
+# Per-process extractor used by pool workers
+_worker_extractor: Optional[HotelDataExtractor] = None
+
+
+def _init_worker(
+    collect_metrics: bool = False,
+    log_queue: Optional[Any] = None,
+    config_values: Optional[Dict[str, Any]] = None,
+    fields: Optional[List[str]] = None,
+    relational: Optional[bool] = None,
+    default_only: Optional[bool] = None,
+    stamp_sources: bool = False,
+    keep_image_dates: bool = False
+) -> None:
+    """
+    Build the extractor once per worker process.
+    
+    The parent's configuration and extractor settings are passed in, so
+    workers extract exactly what a serial run would whatever the start
+    method (spawned workers would otherwise re-read the defaults).
+    
+    Args:
+        collect_metrics: Collect run metrics and send them back with each chunk
+        log_queue: Queue to send log records to the parent process through
+        config_values: Parent's configuration values, including CLI overrides
+        fields: Fields the parent extractor extracts
+        relational: Whether the parent extractor emits child table rows
+        default_only: Whether the parent extractor keeps only default entries
+        stamp_sources: Whether the parent caches results, so plain files are
+            stamped as they are read (see HotelDataExtractor.read_input)
+        keep_image_dates: Whether the parent deduplicates by images_lastUpdate,
+            so records keep the lastUpdate of every image
+    """
+    global _worker_extractor
+    if config_values is not None:
+        config.config = config_values
+    if log_queue is not None:
+        configure_worker_logging(log_queue)
+    # Dedup and lookup indexes are applied by the parent to the merged results
+    _worker_extractor = HotelDataExtractor(
+        fields=fields, relational=relational, dedup_by='', lookup_index=False
+    )
+    if default_only is not None:
+        _worker_extractor.default_only = default_only
+    _worker_extractor._stamp_sources = stamp_sources
+    _worker_extractor._keep_image_dates = keep_image_dates
+    if collect_metrics:
+        enable_run_metrics()
+    else:
+        disable_run_metrics()
+
+
+def _process_file_chunk(
+    file_paths: List[str]
+) -> Tuple[List[Optional[Dict[str, Any]]], Optional[Dict[str, Any]]]:
+    """
+    Extract a chunk of files inside a worker process.
+    
+    Args:
+        file_paths: Paths of the JSON files in this chunk
+        
+    Returns:
+        Flat records (or None for failed files) in the same order as file_paths,
+        and the chunk's raw metrics if metrics are being collected
+    """
+    if _worker_extractor is None:
+        _init_worker()
+    results = [_worker_extractor.process_single_file(file_path) for file_path in file_paths]
+    return results, _take_worker_metrics()
+
+
+def _process_member_chunk(
+    archive_path: str,
+    members: List[Tuple[str, bytes]]
+) -> Tuple[List[Optional[Dict[str, Any]]], Optional[Dict[str, Any]]]:
+    """
+    Extract a chunk of archive members or JSON array items inside a worker process.
+    
+    Args:
+        archive_path: Path to the archive or JSON array file the members came from
+        members: (member name, member bytes) pairs
         
-        save_csv_file(df, output_path)
-        logger.info(f"Results saved to: {output_path}") 
\ No newline at end of file
+    Returns:
+        Flat records (or None for failed members) in the same order as members,
+        and the chunk's raw metrics if metrics are being collected
+    """
+    if _worker_extractor is None:
+        _init_worker()
+    results = [
+        _worker_extractor.process_single_file(archive_path, data=data, member_name=member_name)
+        for member_name, data in members
+    ]
+    return results, _take_worker_metrics()
+
+
+def _process_line_range(
+    file_path: str,
+    start: int,
+    end: int
+) -> Tuple[List[Tuple[List[Tuple[int, Any, Any]], int]], Optional[Dict[str, Any]]]:
+    """
+    Extract one byte range of a JSON Lines file inside a worker process.
+    
+    The worker does not know how many lines precede its range, so lines are
+    numbered from 1 within it. Failed lines are handed back rather than
+    quarantined, for the parent to report under their line in the file.
+    
+    Args:
+        file_path: Path to the JSON Lines file
+        start: Offset of the first byte of the range
+        end: Offset just past the range
+        
+    Returns:
+        A single result of (entries, number of lines in the range), with an
+        entry of (line in the range, flat record or None, (error, line
+        bytes) or None) per non-blank line, and the chunk's raw metrics if
+        metrics are being collected
+    """
+    if _worker_extractor is None:
+        _init_worker()
+    name = os.path.basename(file_path)
+    entries = []
+    line_count = 0
+    failures = _worker_extractor._deferred_failures = []
+    try:
+        for line, data in iter_ndjson_lines(file_path, start, end, include_blank=True):
+            line_count = line
+            if not data or data.isspace():
+                continue
+            record = _worker_extractor.process_single_file(
+                file_path, data=data, member_name=f"{name}:{line} of the range at byte {start}"
+            )
+            entries.append((line, record, failures.pop() if failures else None))
+    finally:
+        _worker_extractor._deferred_failures = None
+    return [(entries, line_count)], _take_worker_metrics()
+
+
+def _take_worker_metrics() -> Optional[Dict[str, Any]]:
+    """Snapshot and reset this worker's metrics, if they are being collected."""
+    metrics = get_run_metrics()
+    if metrics is None:
+        return None
+    snapshot = metrics.snapshot()
+    enable_run_metrics()
+    return snapshot
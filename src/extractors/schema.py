@@ -0,0 +1,116 @@
+"""
+Output schema for extracted hotel records.
+
+Maps every column of ``HotelDataExtractor.df_keys`` to a logical type so that
+typed output formats do not have to infer one from the data, and DataFrames
+of extracted records get compact dtypes (categoricals, nullable integers,
+single-precision ratings) instead of object columns.
+"""
+
+from typing import TYPE_CHECKING, Dict, List
+
+from utils.logger import get_logger
+
+if TYPE_CHECKING:
+    import pandas as pd
+
+logger = get_logger(__name__)
+
+# Integer identifiers
+INT_COLUMNS = [
+    'giataId', 'destination_giataId', 'city_giataId', 'facts_factDefId',
+    'facts_attributes_attributeDefId', 'facts_attributes_unitDefId',
+    'roomTypes_categoryInformation_attributeDefId',
+    'roomTypes_typeInformation_attributeDefId',
+    'roomTypes_viewInformation_attributeDefId', 'images_id'
+]
+
+# Floating point measures; coordinates keep double precision
+FLOAT_COLUMNS = ['geoCodes_latitude', 'geoCodes_longitude']
+
+# Measures that fit in single precision
+FLOAT32_COLUMNS = ['ratings_value']
+
+# Low-cardinality strings
+CATEGORY_COLUMNS = [
+    'names_locale', 'country_code', 'source', 'country_locale',
+    'destination_locale', 'city_locale', 'addresses_federalStateCode',
+    'geoCodes_accuracy', 'images_motifType', 'roomTypes_category',
+    'roomTypes_type', 'roomTypes_view', 'roomTypes_categoryInformation_name',
+    'roomTypes_typeInformation_name', 'roomTypes_viewInformation_name'
+]
+
+# Flags
+BOOL_COLUMNS = ['images_heroImage', 'names_isDefault']
+
+# List-valued columns and the type of their elements
+LIST_COLUMNS: Dict[str, str] = {
+    'phones_phone': 'string',
+    'phones_fax': 'string',
+    'emails': 'string',
+    'urls': 'string',
+    'chains_giataId': 'int',
+    'chains_names': 'string',
+    'images_sizes': 'int',
+    'roomTypes_imageRelations': 'string',
+    'variantGroups': 'string'
+}
+
+
+def column_kind(column: str) -> str:
+    """
+    Get the logical type of an output column.
+    
+    Args:
+        column: Column name
+        
+    Returns:
+        One of 'int', 'float', 'float32', 'bool', 'category', 'list' or 'string'
+    """
+    if column in LIST_COLUMNS:
+        return 'list'
+    if column in INT_COLUMNS:
+        return 'int'
+    if column in FLOAT_COLUMNS:
+        return 'float'
+    if column in FLOAT32_COLUMNS:
+        return 'float32'
+    if column in BOOL_COLUMNS:
+        return 'bool'
+    if column in CATEGORY_COLUMNS:
+        return 'category'
+    return 'string'
+
+
+# pandas dtype for each logical type; strings and lists keep the inferred dtype
+PANDAS_DTYPES = {
+    'int': 'Int64',
+    'float': 'float64',
+    'float32': 'float32',
+    'bool': 'boolean',
+    'category': 'category'
+}
+
+
+def apply_schema(df: 'pd.DataFrame') -> 'pd.DataFrame':
+    """
+    Cast the columns of a DataFrame of extracted records to their schema dtypes.
+    
+    A column whose values do not fit its type (e.g. a non-numeric id) is left
+    as inferred and a warning is logged.
+    
+    Args:
+        df: DataFrame built from extracted records
+        
+    Returns:
+        The same DataFrame with typed columns
+    """
+    for column in df.columns:
+        dtype = PANDAS_DTYPES.get(column_kind(column))
+        if dtype is None or df[column].dtype == dtype:
+            continue
+        try:
+            df[column] = df[column].astype(dtype)
+        except (TypeError, ValueError) as e:
+            logger.warning(f"Keeping inferred dtype for column {column}: {e}")
+    return df
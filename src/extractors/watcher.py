@@ -0,0 +1,451 @@
+"""
+Watch mode for the hotel data extraction tool.
+
+Instead of re-running a full batch on a schedule, a long-running watcher
+picks up files that are new or modified since they were last seen. Changed
+files are grouped into micro-batches, closed once enough files are waiting
+or the oldest has waited long enough. Each batch is extracted with the same
+warm HotelDataExtractor, so a file's rows show up seconds after it lands.
+
+Finding changed files never re-stats the whole tree. With watchdog installed,
+filesystem change notifications name the files. Otherwise each poll stats
+only the directories scanned so far and re-lists those whose mtime moved,
+i.e. that had files added, removed or renamed into place; only files with a
+new name or inode are stat'ed. A full rescan every
+``watch.full_rescan_interval`` seconds catches files rewritten in place
+(which leave their directory untouched) and lost notifications.
+
+New files are appended to the output. Modified files replace their rows in
+SQLite output, which upserts by giataId; other outputs cannot update rows in
+place, so their rows are appended to an ``_updates`` output next to it
+(later rows of a giataId supersede earlier ones).
+"""
+
+import os
+import threading
+import time
+from typing import Dict, List, Optional, Set, Tuple
+
+from config.settings import config
+from utils.discovery import InputFile, InputFilter, scan_directory
+from utils.logger import get_logger
+from utils.writers import child_table_path, get_writer_class
+
+logger = get_logger(__name__)
+
+# Directories modified this close to their last scan are listed again, in
+# case a file landed within the filesystem's timestamp granularity
+_MTIME_SLACK_NS = 2 * 10 ** 9
+
+# State of a file that was picked up and has since disappeared
+_GONE = (-1, -1, -1)
+
+
+class _ScannedDirectory:
+    """A directory as of its last scan."""
+    
+    __slots__ = ('relative', 'depth', 'mtime_ns', 'scanned_ns', 'files', 'subdirectories')
+    
+    def __init__(
+        self,
+        relative: str,
+        depth: int,
+        mtime_ns: int,
+        scanned_ns: int,
+        files: Dict[str, int],
+        subdirectories: List[str]
+    ):
+        self.relative = relative
+        self.depth = depth
+        self.mtime_ns = mtime_ns
+        self.scanned_ns = scanned_ns
+        # Inode of every input file, so replaced files are told apart without a stat
+        self.files = files
+        self.subdirectories = subdirectories
+
+
+class DirectoryWatcher:
+    """
+    Watch an input directory and write the rows of changed files to the output.
+    """
+    
+    def __init__(
+        self,
+        extractor,
+        input_dir: str,
+        output_path: str,
+        poll_interval: Optional[float] = None,
+        batch_files: Optional[int] = None,
+        batch_window: Optional[float] = None,
+        settle_seconds: Optional[float] = None,
+        notify: Optional[bool] = None,
+        full_rescan_interval: Optional[float] = None
+    ):
+        """
+        Initialize the watcher.
+        
+        Args:
+            extractor: HotelDataExtractor reused for every micro-batch
+            input_dir: Directory to watch (filtered like a batch run)
+            output_path: CSV or SQLite output file the rows are written to
+            poll_interval: Seconds between polls (defaults to config)
+            batch_files: Files that close a micro-batch (defaults to config)
+            batch_window: Seconds the oldest waiting file may wait (defaults to config)
+            settle_seconds: Minimum age of a file's mtime before it is picked
+                up, so half-written files are left alone (defaults to config)
+            notify: Use change notifications if watchdog is installed (defaults to config)
+            full_rescan_interval: Seconds between full rescans of the tree, 0
+                for never (defaults to config)
+                
+        Raises:
+            ValueError: If the output format cannot be appended to
+        """
+        writer_class = get_writer_class()
+        if not writer_class.supports_append:
+            raise ValueError(
+                f"Watch mode appends to its output, and {writer_class.format_name} output "
+                f"cannot be appended to; use CSV or SQLite output"
+            )
+        self.extractor = extractor
+        self.input_dir = input_dir
+        self.output_path = output_path
+        # Rows of modified files, unless the output replaces them itself
+        self.updates_path = output_path if writer_class.supports_upsert else child_table_path(output_path, 'updates')
+        self.poll_interval = poll_interval if poll_interval is not None else config.get_watch_interval()
+        self.batch_files = max(1, batch_files or config.get_watch_batch_files())
+        self.batch_window = batch_window if batch_window is not None else config.get_watch_batch_window()
+        self.settle_seconds = settle_seconds if settle_seconds is not None else config.get_watch_settle_seconds()
+        self.notify = config.should_watch_use_notifications() if notify is None else notify
+        self.full_rescan_interval = (
+            full_rescan_interval if full_rescan_interval is not None else config.get_watch_full_rescan_interval()
+        )
+        self.batches = 0
+        self.rows_written = 0
+        
+        self._filter = InputFilter()
+        # (inode, size, mtime_ns) of every file picked up so far
+        self._seen: Dict[str, Tuple[int, int, int]] = {}
+        self._directories: Dict[str, _ScannedDirectory] = {}
+        # Files found before they settled, looked at again on every poll
+        self._settling: Set[str] = set()
+        self._pending: Dict[str, InputFile] = {}
+        self._modified: Set[str] = set()
+        self._pending_since: Optional[float] = None
+        self._last_full_scan: Optional[float] = None
+        self._stop = threading.Event()
+        
+        self._observer = None
+        self._events: Dict[str, bool] = {}
+        self._events_lock = threading.Lock()
+    
+    def baseline(self) -> int:
+        """
+        Mark the files already in the input directory as seen, without extracting them.
+        
+        Returns:
+            Number of files found
+        """
+        self._start_notifications()
+        self._full_scan(queue=False)
+        logger.info(f"Watching {self.input_dir}: {len(self._seen)} existing files left as they are")
+        return len(self._seen)
+    
+    def poll(self) -> int:
+        """
+        Look for new and modified files once, queueing them.
+        
+        Files whose mtime is younger than ``settle_seconds`` are looked at
+        again on later polls; files that disappeared are forgotten, so they
+        are picked up again if they come back.
+        
+        Returns:
+            Number of files queued by this poll
+        """
+        self._start_notifications()
+        settled_before = time.time_ns() - int(self.settle_seconds * 1e9)
+        queued = 0
+        
+        for file_path in list(self._settling):
+            queued += self._check(InputFile(file_path), settled_before)
+        
+        full_scan_due = self._last_full_scan is None or (
+            self.full_rescan_interval and time.monotonic() - self._last_full_scan >= self.full_rescan_interval
+        )
+        if full_scan_due:
+            queued += self._full_scan(settled_before=settled_before)
+        elif self._observer is not None:
+            queued += self._apply_notifications(settled_before)
+        else:
+            queued += self._rescan_changed_directories(settled_before)
+        
+        if queued and self._pending_since is None:
+            self._pending_since = time.monotonic()
+        return queued
+    
+    def is_due(self) -> bool:
+        """Check whether the waiting files make up a micro-batch."""
+        if not self._pending:
+            return False
+        return (
+            len(self._pending) >= self.batch_files
+            or time.monotonic() - self._pending_since >= self.batch_window
+        )
+    
+    def flush(self) -> int:
+        """
+        Extract the waiting files, appending the rows of new files to the output.
+        
+        Rows of modified files go to ``updates_path``.
+        
+        Returns:
+            Number of rows written
+        """
+        if not self._pending:
+            return 0
+        file_paths: List[InputFile] = list(self._pending.values())
+        modified = [file_path for file_path in file_paths if file_path in self._modified]
+        added = [file_path for file_path in file_paths if file_path not in self._modified]
+        self._pending = {}
+        self._modified = set()
+        self._pending_since = None
+        
+        rows = 0
+        if added:
+            rows += self.extractor.process_batch_to_file(added, self.output_path, append=True)
+        if modified:
+            rows += self.extractor.process_batch_to_file(modified, self.updates_path, append=True)
+        self.batches += 1
+        self.rows_written += rows
+        
+        oldest = min(file_path.mtime_ns for file_path in file_paths)
+        logger.info(
+            f"Micro-batch {self.batches}: wrote {rows} rows from {len(added)} new and {len(modified)} "
+            f"modified files ({time.time() - oldest / 1e9:.1f} s after the oldest file was written)"
+        )
+        return rows
+    
+    def run(self, max_polls: Optional[int] = None) -> int:
+        """
+        Poll and extract until stop is called.
+        
+        Files still waiting when the watcher stops are extracted before
+        returning.
+        
+        Args:
+            max_polls: Stop after this many polls (None to run until stopped)
+            
+        Returns:
+            Number of rows written
+        """
+        self._start_notifications()
+        logger.info(
+            f"Watching {self.input_dir} every {self.poll_interval:g} s "
+            f"({'change notifications' if self._observer is not None else 'directory mtimes'}), "
+            f"writing to {self.output_path} in micro-batches of up to {self.batch_files} files "
+            f"or {self.batch_window:g} s"
+        )
+        polls = 0
+        try:
+            while not self._stop.is_set():
+                self.poll()
+                polls += 1
+                if self.is_due():
+                    self.flush()
+                if max_polls is not None and polls >= max_polls:
+                    break
+                self._stop.wait(self.poll_interval)
+            
+            self.flush()
+        finally:
+            self.close()
+        logger.info(f"Stopped watching after {self.batches} micro-batches ({self.rows_written} rows)")
+        return self.rows_written
+    
+    def stop(self) -> None:
+        """Ask run to return after the current poll or micro-batch; safe from signal handlers."""
+        self._stop.set()
+    
+    def close(self) -> None:
+        """Stop receiving change notifications."""
+        if self._observer is not None:
+            self._observer.stop()
+            self._observer.join()
+            self._observer = None
+    
+    def _check(self, input_file: InputFile, settled_before: int, queue: bool = True) -> int:
+        """Queue a file if it is new or changed and has settled, returning 1 if it was queued."""
+        state = (input_file.inode, input_file.size, input_file.mtime_ns)
+        previous = self._seen.get(input_file)
+        if state == previous or state[0] == 0:
+            # Unchanged, or gone before it could be read
+            self._settling.discard(input_file)
+            return 0
+        if queue and input_file.mtime_ns > settled_before:
+            self._settling.add(str(input_file))
+            return 0
+        
+        self._settling.discard(input_file)
+        self._seen[input_file] = state
+        if not queue:
+            return 0
+        self._pending[input_file] = input_file
+        if previous is not None:
+            self._modified.add(str(input_file))
+        return 1
+    
+    def _forget_file(self, file_path: str) -> None:
+        """Forget a file that disappeared, keeping that its rows were written."""
+        if file_path in self._seen:
+            self._seen[file_path] = _GONE
+        self._settling.discard(file_path)
+    
+    def _forget_directory(self, path: str) -> None:
+        """Forget a directory that disappeared, and everything below it."""
+        directory = self._directories.pop(path, None)
+        if directory is None:
+            return
+        for file_path in directory.files:
+            self._forget_file(file_path)
+        for subdirectory in directory.subdirectories:
+            self._forget_directory(subdirectory)
+    
+    def _scan_tree(
+        self,
+        path: str,
+        relative: str,
+        depth: int,
+        settled_before: int,
+        check_all: bool,
+        queue: bool = True
+    ) -> int:
+        """
+        Scan a directory and the subdirectories below it.
+        
+        With check_all, every file is stat'ed and every subdirectory is
+        scanned; otherwise only files with a new name or inode are, and only
+        subdirectories not scanned before are descended into.
+        
+        Returns:
+            Number of files queued
+        """
+        queued = 0
+        stack = [(path, relative, depth)]
+        while stack:
+            path, relative, depth = stack.pop()
+            scanned_ns = time.time_ns()
+            try:
+                mtime_ns = os.stat(path).st_mtime_ns
+                files, subdirectories = scan_directory(path, relative, depth, self._filter)
+            except OSError:
+                self._forget_directory(path)
+                continue
+            
+            previous = self._directories.get(path)
+            known = previous.files if previous is not None else {}
+            inodes = {}
+            for input_file in files:
+                inodes[input_file] = input_file.inode
+                if check_all or known.get(input_file) != inodes[input_file]:
+                    queued += self._check(input_file, settled_before, queue)
+            for file_path in known.keys() - inodes.keys():
+                self._forget_file(file_path)
+            
+            subdirectory_paths = [subdirectory[0] for subdirectory in subdirectories]
+            if previous is not None:
+                for subdirectory in set(previous.subdirectories) - set(subdirectory_paths):
+                    self._forget_directory(subdirectory)
+            stack.extend(
+                subdirectory for subdirectory in reversed(subdirectories)
+                if check_all or subdirectory[0] not in self._directories
+            )
+            self._directories[path] = _ScannedDirectory(
+                relative, depth, mtime_ns, scanned_ns, inodes, subdirectory_paths
+            )
+        return queued
+    
+    def _full_scan(self, settled_before: int = 0, queue: bool = True) -> int:
+        """Scan the whole input tree, stat'ing every file."""
+        self._last_full_scan = time.monotonic()
+        if not os.path.isdir(self.input_dir):
+            logger.warning(f"Directory does not exist: {self.input_dir}")
+            return 0
+        # Notifications received meanwhile are covered by the scan
+        with self._events_lock:
+            self._events = {}
+        return self._scan_tree(self.input_dir, '', 0, settled_before, check_all=True, queue=queue)
+    
+    def _rescan_changed_directories(self, settled_before: int) -> int:
+        """Stat the known directories and list again those whose entries changed."""
+        queued = 0
+        for path, directory in list(self._directories.items()):
+            if self._directories.get(path) is not directory:
+                # Forgotten or rescanned as part of another directory
+                continue
+            try:
+                mtime_ns = os.stat(path).st_mtime_ns
+            except OSError:
+                self._forget_directory(path)
+                continue
+            if mtime_ns != directory.mtime_ns or mtime_ns >= directory.scanned_ns - _MTIME_SLACK_NS:
+                queued += self._scan_tree(path, directory.relative, directory.depth, settled_before, check_all=False)
+        return queued
+    
+    def _apply_notifications(self, settled_before: int) -> int:
+        """Look at the files and directories named by the notifications since the last poll."""
+        with self._events_lock:
+            events, self._events = self._events, {}
+        
+        queued = 0
+        for path, is_directory in events.items():
+            relative = os.path.relpath(path, self.input_dir).replace(os.sep, '/')
+            if relative == '.' or relative.startswith('../'):
+                continue
+            if not os.path.exists(path):
+                if is_directory:
+                    self._forget_directory(path)
+                else:
+                    self._forget_file(path)
+                continue
+            
+            if is_directory:
+                depth = relative.count('/') + 1
+                parts = relative.split('/')
+                excluded = any(self._filter.skips('/'.join(parts[:level])) for level in range(1, len(parts) + 1))
+                if not excluded and self._filter.enters(depth):
+                    queued += self._scan_tree(path, relative + '/', depth, settled_before, check_all=False)
+            elif self._filter.accepts_path(relative):
+                queued += self._check(InputFile(path), settled_before)
+        return queued
+    
+    def _start_notifications(self) -> None:
+        """Start receiving change notifications, if enabled and watchdog is installed."""
+        if self._observer is not None or not self.notify or not os.path.isdir(self.input_dir):
+            return
+        try:
+            from watchdog.events import FileSystemEventHandler
+            from watchdog.observers import Observer
+        except ImportError:
+            logger.debug("watchdog is not installed; watching directory mtimes")
+            self.notify = False
+            return
+        
+        watcher = self
+        
+        class _Handler(FileSystemEventHandler):
+            def on_any_event(self, event):
+                # A directory's own modified events only say its entries changed;
+                # the entries report themselves
+                if event.event_type in ('opened', 'closed_no_write') or (
+                    event.is_directory and event.event_type in ('modified', 'closed')
+                ):
+                    return
+                with watcher._events_lock:
+                    watcher._events[os.fsdecode(event.src_path)] = event.is_directory
+                    if getattr(event, 'dest_path', ''):
+                        watcher._events[os.fsdecode(event.dest_path)] = event.is_directory
+        
+        observer = Observer()
+        observer.schedule(_Handler(), self.input_dir, recursive=True)
+        observer.daemon = True
+        observer.start()
+        self._observer = observer
@@ -6,20 +6,34 @@ This script provides a command-line interface for extracting hotel data from JSO
 and converting them to structured CSV format.
 """
 
+import json
 import os
+import signal
 import sys
 import time
 import argparse
+from itertools import chain
 from pathlib import Path
-from typing import List, Optional
+from typing import Iterable, List, Optional
 
 # Add src directory to Python path
 sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
 
 from config.settings import config
 from utils.logger import setup_logger, get_logger
-from utils.file_utils import get_json_files, ensure_directory
+from utils.file_utils import get_json_files, ensure_directory, load_json_file
+from utils.discovery import iter_input_files
+from utils.writers import open_writer, output_filename
+from utils.shards import merge_shard_outputs, shard_stem
+from utils.delta import previous_output_path, write_delta
+from utils.lookup import find_lookup_indexes, lookup
+from utils.sources import (
+    ARCHIVE_SUFFIXES, GZIP_JSON_SUFFIX, NDJSON_SUFFIXES, is_gzip_json, is_multi_document
+)
+from utils.metrics import enable_run_metrics
+from extractors.dedup import PRECEDENCES
 from extractors.hotel_extractor import HotelDataExtractor
+from extractors.watcher import DirectoryWatcher
 
 
 def parse_arguments():
@@ -31,8 +45,22 @@ def parse_arguments():
 Examples:
   python src/main.py --batch
   python src/main.py --file data/inputJSONs/hotel.json
+  python src/main.py --file data/inputJSONs/supplier_drop.tar.gz
+  python src/main.py --file data/inputJSONs/export.jsonl --parallel
   python src/main.py --input data/custom_input --output data/custom_output
+  python src/main.py --batch --include "2024-*/*.json" --exclude "*/_staging"
   python src/main.py --verbose --batch
+  python src/main.py --batch --parallel --workers 8
+  python src/main.py --batch --stream
+  python src/main.py --file data/inputJSONs/all_hotels.json --stream-arrays
+  python src/main.py --batch --relational
+  python src/main.py --batch --dedup images_lastUpdate
+  python src/main.py --batch --dedup --delta
+  python src/main.py --batch --shard 2/4
+  python src/main.py --merge-shards
+  python src/main.py --async-batch
+  python src/main.py --watch
+  python src/main.py --lookup 12345 --with-source
         """
     )
     
@@ -42,10 +70,35 @@ Examples:
         help='Process all JSON files in the input directory'
     )
     
+    parser.add_argument(
+        '--async-batch',
+        action='store_true',
+        help='Process all JSON files, overlapping file reads with extraction'
+    )
+    
+    parser.add_argument(
+        '--watch',
+        action='store_true',
+        help='Keep running, appending the rows of new or modified JSON files to the output as they arrive'
+    )
+    
     parser.add_argument(
         '--file',
         type=str,
-        help='Process a specific JSON file'
+        help='Process a specific JSON file, .json.gz file, zip/tar archive or .jsonl file'
+    )
+    
+    parser.add_argument(
+        '--lookup',
+        type=str,
+        metavar='GIATA_ID',
+        help='Print the output row and source file of a hotel, using the lookup index of the last batch run'
+    )
+    
+    parser.add_argument(
+        '--with-source',
+        action='store_true',
+        help='With --lookup, also print the source JSON document'
     )
     
     parser.add_argument(
@@ -60,6 +113,39 @@ Examples:
         help='Output directory for CSV files (overrides config)'
     )
     
+    parser.add_argument(
+        '--include',
+        action='append',
+        metavar='PATTERN',
+        help='Only process files matching this glob, relative to the input directory (repeatable; overrides config)'
+    )
+    
+    parser.add_argument(
+        '--exclude',
+        action='append',
+        metavar='PATTERN',
+        help='Skip files and directories matching this glob (repeatable; overrides config)'
+    )
+    
+    parser.add_argument(
+        '--max-depth',
+        type=int,
+        help='Subdirectory levels of the input directory to scan, 0 for the top level only (overrides config)'
+    )
+    
+    parser.add_argument(
+        '--shard',
+        type=str,
+        metavar='I/N',
+        help='Only process shard I of N of the input files (by a stable hash of their path)'
+    )
+    
+    parser.add_argument(
+        '--merge-shards',
+        action='store_true',
+        help='Combine the outputs of all shards in the output directory into the final output'
+    )
+    
     parser.add_argument(
         '--verbose',
         action='store_true',
@@ -73,6 +159,69 @@ Examples:
         help='Path to configuration file (default: config.yaml)'
     )
     
+    parser.add_argument(
+        '--parallel',
+        action='store_true',
+        help='Spread batch processing across a process pool'
+    )
+    
+    parser.add_argument(
+        '--workers',
+        type=int,
+        help='Number of worker processes for --parallel (overrides config)'
+    )
+    
+    parser.add_argument(
+        '--stream',
+        action='store_true',
+        help='Write batch output to disk in chunks instead of holding it in memory'
+    )
+    
+    parser.add_argument(
+        '--stream-arrays',
+        action='store_true',
+        help='Read JSON files holding a top-level array of hotels one hotel at a time'
+    )
+    
+    parser.add_argument(
+        '--relational',
+        action='store_true',
+        help='Also write all names, room types, images and facts to child tables keyed by giataId'
+    )
+    
+    parser.add_argument(
+        '--dedup',
+        nargs='?',
+        const='mtime',
+        choices=PRECEDENCES,
+        help='Keep one row per giataId, from the newest file by default (overrides config)'
+    )
+    
+    parser.add_argument(
+        '--delta',
+        action='store_true',
+        help='Also write the rows inserted, updated and deleted since the previous output'
+    )
+    
+    parser.add_argument(
+        '--format',
+        type=str,
+        choices=['csv', 'parquet', 'feather', 'sqlite'],
+        help='Output file format (overrides config)'
+    )
+    
+    parser.add_argument(
+        '--metrics',
+        action='store_true',
+        help='Collect per-stage timings and write a metrics JSON next to the output'
+    )
+    
+    parser.add_argument(
+        '--no-cache',
+        action='store_true',
+        help='Re-extract every file instead of reusing cached results'
+    )
+    
     parser.add_argument(
         '--dry-run',
         action='store_true',
@@ -107,10 +256,10 @@ def validate_environment():
 
 def process_single_file(file_path: str, extractor: HotelDataExtractor) -> bool:
     """
-    Process a single JSON file.
+    Process a single JSON file, or every JSON document in one archive or JSON Lines file.
     
     Args:
-        file_path: Path to the JSON file
+        file_path: Path to the JSON file, archive or JSON Lines file
         extractor: Hotel data extractor instance
         
     Returns:
@@ -122,20 +271,28 @@ def process_single_file(file_path: str, extractor: HotelDataExtractor) -> bool:
         logger.error(f"File not found: {file_path}")
         return False
     
-    if not file_path.endswith('.json'):
+    if not (file_path.endswith('.json') or is_gzip_json(file_path) or is_multi_document(file_path)):
         logger.error(f"File is not a JSON file: {file_path}")
         return False
     
     try:
-        result = extractor.process_single_file(file_path)
-        if result:
+        if extractor.is_multi_document(file_path):
+            records = extractor.collect_batch([file_path])
+        else:
+            result = extractor.process_single_file(file_path)
+            records = [result] if result else []
+        if records:
             # Save single file result
-            df = pd.DataFrame([result])
+            stem = os.path.basename(file_path)
+            for suffix in (GZIP_JSON_SUFFIX, '.json') + ARCHIVE_SUFFIXES + NDJSON_SUFFIXES:
+                if stem.lower().endswith(suffix):
+                    stem = stem[:-len(suffix)]
+                    break
             output_path = os.path.join(
                 config.get_output_dir(),
-                f"extracted_{os.path.basename(file_path).replace('.json', '.csv')}"
+                output_filename(f"extracted_{stem}")
             )
-            extractor.save_results(df, output_path)
+            extractor.save_records(records, output_path)
             return True
         else:
             return False
@@ -144,9 +301,27 @@ def process_single_file(file_path: str, extractor: HotelDataExtractor) -> bool:
         return False
 
 
+def batch_output_stem() -> str:
+    """
+    Get the stem of this run's output files.
+    
+    Each shard writes its own outputs, combined later by merge_shards, so
+    shards running at the same time never overwrite each other's files.
+    
+    Returns:
+        'extracted_hotels', or e.g. 'extracted_hotels_shard-2-of-8' with --shard
+    """
+    shard = config.get_shard()
+    return shard_stem('extracted_hotels', *shard) if shard else 'extracted_hotels'
+
+
 def process_batch(input_dir: str, extractor: HotelDataExtractor) -> bool:
     """
-    Process all JSON files in a directory.
+    Process all JSON files in a directory tree.
+    
+    Files are extracted as the directory is scanned rather than after the
+    whole tree has been listed. With ``output.delta`` set, the rows inserted,
+    updated and deleted since the previous output are also written.
     
     Args:
         input_dir: Directory containing JSON files
@@ -157,38 +332,229 @@ def process_batch(input_dir: str, extractor: HotelDataExtractor) -> bool:
     """
     logger = get_logger(__name__)
     
-    # Get all JSON files
-    json_files = get_json_files(input_dir)
+    shard = config.get_shard()
+    stem = batch_output_stem()
+    output_path = os.path.join(config.get_output_dir(), output_filename(stem))
+    
+    # Discover JSON files lazily
+    json_files = iter_input_files(input_dir, shard=shard)
+    first_file = next(json_files, None)
     
-    if not json_files:
-        logger.warning(f"No JSON files found in {input_dir}")
+    if first_file is None:
+        if shard:
+            logger.warning(f"No JSON files of shard {shard[0]}/{shard[1]} found in {input_dir}")
+        else:
+            logger.warning(f"No JSON files found in {input_dir}")
+        # An empty shard still leaves an output, so the set of shards is complete,
+        # and an empty delta run still deletes every row of the previous output
+        if not shard and not config.should_write_delta():
+            return False
+        json_files = iter(())
+    else:
+        json_files = chain([first_file], json_files)
+    
+    if not config.should_write_delta():
+        return extract_to_output(json_files, output_path, extractor, allow_empty=bool(shard))
+    
+    # The previous output is kept aside until the delta against it is written;
+    # if anything fails it is put back, so the next run compares against it again
+    previous_path = None
+    if os.path.exists(output_path):
+        previous_path = previous_output_path(output_path)
+        os.replace(output_path, previous_path)
+    
+    try:
+        # Extracting nothing leaves an empty output, so every previous row is a delete
+        if not extract_to_output(json_files, output_path, extractor, allow_empty=True):
+            raise RuntimeError("extraction failed")
+        write_delta(
+            previous_path,
+            output_path,
+            summary_path=os.path.join(config.get_output_dir(), f'{stem}_delta.json')
+        )
+    except Exception as e:
+        logger.error(f"Delta not written: {e}")
+        if previous_path:
+            os.replace(previous_path, output_path)
+            logger.info(f"Restored the previous output: {output_path}")
         return False
     
-    logger.info(f"Found {len(json_files)} JSON files to process")
+    if previous_path:
+        os.remove(previous_path)
+    return True
+
+
+def extract_to_output(
+    json_files: Iterable[str],
+    output_path: str,
+    extractor: HotelDataExtractor,
+    allow_empty: bool = False
+) -> bool:
+    """
+    Extract files into the batch output.
+    
+    Args:
+        json_files: JSON file paths, consumed lazily
+        output_path: Output file path
+        extractor: Hotel data extractor instance
+        allow_empty: Write an output with no rows if nothing is extracted
+        
+    Returns:
+        True if any data was extracted (or allow_empty is set and extraction
+        did not fail), False otherwise
+    """
+    logger = get_logger(__name__)
     
     try:
+        if config.should_stream_output():
+            # Stream records to disk as they are extracted
+            rows_written = extractor.process_batch_to_file(json_files, output_path)
+            if rows_written:
+                logger.info(f"Successfully processed {rows_written} hotels")
+                return True
+            logger.warning("No data was extracted")
+            return allow_empty
+        
         # Process files in batch
-        df = extractor.process_batch(json_files)
+        records = extractor.collect_batch(json_files)
         
-        if not df.empty:
+        if records:
             # Save results
-            output_path = os.path.join(config.get_output_dir(), 'extracted_hotels.csv')
-            extractor.save_results(df, output_path)
-            logger.info(f"Successfully processed {len(df)} hotels")
+            extractor.save_records(records, output_path)
+            logger.info(f"Successfully processed {len(records)} hotels")
             return True
         else:
             logger.warning("No data was extracted")
-            return False
-            
+            if allow_empty:
+                with open_writer(output_path, extractor.df_keys, key='giataId'):
+                    pass
+            return allow_empty
+    
     except Exception as e:
         logger.error(f"Error during batch processing: {e}")
         return False
 
 
+def watch_directory(input_dir: str, extractor: HotelDataExtractor) -> bool:
+    """
+    Watch a directory, extracting new or modified files in micro-batches until stopped.
+    
+    Rows of new files are appended to the CSV or SQLite output with the same
+    warm extractor; rows of modified files are upserted into SQLite output
+    or written to an ``_updates`` output next to a CSV one. Files already in
+    the directory are left alone unless ``watch.process_existing`` is set.
+    SIGINT and SIGTERM stop the watcher after the current micro-batch.
+    
+    Args:
+        input_dir: Directory to watch
+        extractor: Hotel data extractor instance
+        
+    Returns:
+        True once the watcher has stopped cleanly, False otherwise
+    """
+    logger = get_logger(__name__)
+    
+    output_path = os.path.join(config.get_output_dir(), output_filename(batch_output_stem()))
+    try:
+        watcher = DirectoryWatcher(extractor, input_dir, output_path)
+    except ValueError as e:
+        logger.error(f"Cannot watch {input_dir}: {e}")
+        return False
+    if not config.should_watch_process_existing():
+        watcher.baseline()
+    
+    def stop_watching(signum, frame):
+        logger.info(f"Received {signal.Signals(signum).name}, stopping after the current micro-batch")
+        watcher.stop()
+    
+    previous_handlers = {
+        signum: signal.signal(signum, stop_watching) for signum in (signal.SIGINT, signal.SIGTERM)
+    }
+    try:
+        watcher.run()
+    except Exception as e:
+        logger.error(f"Error while watching {input_dir}: {e}")
+        return False
+    finally:
+        for signum, handler in previous_handlers.items():
+            signal.signal(signum, handler)
+    return True
+
+
+def lookup_hotel(giata_id: str, with_source: bool = False) -> bool:
+    """
+    Print the output rows of a hotel as JSON lines, found through the lookup indexes.
+    
+    The indexes of the main output and of any shard outputs in the output
+    directory are searched.
+    
+    Args:
+        giata_id: giataId to look up
+        with_source: Also print the source JSON document of each row
+        
+    Returns:
+        True if the hotel was found, False otherwise
+    """
+    logger = get_logger(__name__)
+    
+    index_paths = find_lookup_indexes(config.get_output_dir(), 'extracted_hotels')
+    if not index_paths:
+        logger.error(f"No lookup index found in {config.get_output_dir()}; run a batch with output.lookup_index enabled")
+        return False
+    
+    found = False
+    for index_path in index_paths:
+        try:
+            matches = lookup(index_path, giata_id)
+        except ValueError as e:
+            logger.warning(str(e))
+            continue
+        for match in matches:
+            source = match['source']
+            if with_source and source and os.path.isfile(source) and not is_multi_document(source):
+                match['document'] = load_json_file(source)
+            print(json.dumps(match, ensure_ascii=False, default=str))
+            found = True
+    
+    if not found:
+        logger.warning(f"giataId {giata_id} not found")
+    return found
+
+
+def merge_shards(extractor: HotelDataExtractor) -> bool:
+    """
+    Merge the shard outputs in the output directory into the final output.
+    
+    Args:
+        extractor: Hotel data extractor instance, for the column order and child tables
+        
+    Returns:
+        True if successful, False otherwise
+    """
+    logger = get_logger(__name__)
+    
+    # Plain CSV batches order columns as first seen; every other output leads with df_keys
+    plain_csv = output_filename('') == '.csv' and not config.should_stream_output()
+    try:
+        rows = merge_shard_outputs(
+            config.get_output_dir(),
+            'extracted_hotels',
+            leading_columns=None if plain_csv else extractor.df_keys,
+            tables=list(extractor.child_tables),
+            dedup_by=extractor.dedup_by
+        )
+    except ValueError as e:
+        logger.error(str(e))
+        return False
+    logger.info(f"Merged {rows} hotels")
+    return True
+
+
 def main():
     """Main function."""
     # Parse command line arguments
     args = parse_arguments()
+    config.use_file(args.config)
     
     # Set up logging
     log_level = "DEBUG" if args.verbose else None
@@ -200,9 +566,6 @@ def main():
         # Validate environment
         validate_environment()
         
-        # Initialize extractor
-        extractor = HotelDataExtractor()
-        
         # Determine input directory
         input_dir = args.input or config.get_data_dir()
         
@@ -211,14 +574,57 @@ def main():
             config.config['data']['output_dir'] = args.output
             ensure_directory(args.output)
         
+        # Apply discovery overrides
+        if args.include:
+            config.config['data']['include'] = args.include
+        if args.exclude:
+            config.config['data']['exclude'] = args.exclude
+        if args.max_depth is not None:
+            config.config['data']['max_depth'] = args.max_depth
+        if args.shard:
+            config.config['data']['shard'] = args.shard
+        shard = config.get_shard()
+        
+        # Apply processing overrides
+        if args.async_batch:
+            config.config['processing']['async_io'] = True
+        if args.parallel:
+            config.config['processing']['parallel'] = True
+        if args.workers:
+            config.config['processing']['max_workers'] = args.workers
+        if args.stream:
+            config.config.setdefault('performance', {})['streaming'] = True
+        if args.stream_arrays:
+            config.config.setdefault('performance', {})['stream_json_arrays'] = True
+        if args.format:
+            config.config['output']['format'] = args.format
+        if args.no_cache:
+            config.config.setdefault('performance', {})['cache_results'] = False
+        if args.metrics:
+            config.config.setdefault('performance', {})['metrics'] = True
+        if args.relational:
+            config.config['extraction']['relational'] = True
+        if args.dedup:
+            config.config['output']['dedup'] = args.dedup
+        if args.delta:
+            config.config['output']['delta'] = True
+        
+        # Initialize extractor
+        extractor = HotelDataExtractor()
+        
         if args.dry_run:
             logger.info("DRY RUN MODE - No files will be processed")
             
             if args.file:
                 logger.info(f"Would process file: {args.file}")
-            elif args.batch:
-                json_files = get_json_files(input_dir)
-                logger.info(f"Would process {len(json_files)} files from {input_dir}")
+            elif args.merge_shards:
+                logger.info(f"Would merge shard outputs in {config.get_output_dir()}")
+            elif args.watch:
+                logger.info(f"Would watch {input_dir} for new or modified files")
+            elif args.batch or args.async_batch:
+                json_files = get_json_files(input_dir, shard=shard)
+                shard_note = f" (shard {shard[0]}/{shard[1]})" if shard else ""
+                logger.info(f"Would process {len(json_files)} files from {input_dir}{shard_note}")
             else:
                 logger.info("No processing mode specified")
             
@@ -226,13 +632,28 @@ def main():
         
         # Process files based on arguments
         start_time = time.time()
+        metrics = enable_run_metrics() if config.should_collect_metrics() else None
         
         if args.file:
             # Process single file
             logger.info(f"Processing single file: {args.file}")
             success = process_single_file(args.file, extractor)
-            
-        elif args.batch:
+        
+        elif args.lookup:
+            # Find one hotel through the lookup index
+            success = lookup_hotel(args.lookup, args.with_source)
+        
+        elif args.merge_shards:
+            # Combine the outputs of a sharded run
+            logger.info(f"Merging shard outputs in: {config.get_output_dir()}")
+            success = merge_shards(extractor)
+        
+        elif args.watch:
+            # Keep extracting files as they arrive
+            logger.info(f"Watching for new JSON files in: {input_dir}")
+            success = watch_directory(input_dir, extractor)
+        
+        elif args.batch or args.async_batch:
             # Process all files in directory
             logger.info(f"Processing all JSON files in: {input_dir}")
             success = process_batch(input_dir, extractor)
@@ -246,6 +667,15 @@ def main():
         end_time = time.time()
         duration = end_time - start_time
         
+        if metrics is not None:
+            summary = metrics.save(
+                os.path.join(config.get_output_dir(), f"{batch_output_stem()}_metrics.json")
+            )
+            logger.info(
+                f"Stage times: {summary['stages']}, "
+                f"p95 file latency: {summary['file_latency_ms']['p95']} ms"
+            )
+        
         if success:
             logger.info(f"Processing completed successfully in {duration:.2f} seconds")
             return 0
@@ -262,5 +692,4 @@ def main():
 
 
 if __name__ == "__main__":
-    import pandas as pd
     sys.exit(main()) 
\ No newline at end of file
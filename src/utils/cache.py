@@ -0,0 +1,249 @@
+"""
+Result caching for incremental extraction runs.
+"""
+
+import hashlib
+import json
+import os
+import time
+from typing import TYPE_CHECKING, Any, Dict, Optional
+
+from config.settings import config
+from .file_utils import ensure_directory
+from .logger import get_logger
+
+if TYPE_CHECKING:
+    import sqlite3
+
+logger = get_logger(__name__)
+
+# Bump when the layout of cached rows changes
+MANIFEST_VERSION = 1
+
+# Key a record carries the (size, mtime_ns, content hash) of its input file
+# under, as taken when the file was read, until the manifest records it
+STAMP_KEY = '_stamp'
+
+
+def content_digest():
+    """
+    Create the hash object content hashes are computed with.
+    
+    Returns:
+        A hashlib object; feed it the raw bytes of a file
+    """
+    return hashlib.blake2b(digest_size=16)
+
+
+def hash_file(file_path: str, block_size: int = 1024 * 1024) -> str:
+    """
+    Compute a content hash of a file.
+    
+    Args:
+        file_path: Path to the file
+        block_size: Read block size in bytes
+        
+    Returns:
+        Hex digest of the file contents
+    """
+    digest = content_digest()
+    with open(file_path, 'rb') as file:
+        for block in iter(lambda: file.read(block_size), b''):
+            digest.update(block)
+    return digest.hexdigest()
+
+
+class ResultManifest:
+    """
+    Persistent manifest of input files and their extracted rows.
+    
+    Each entry records the input's path, size, mtime and content hash along
+    with the row extracted from it. A file whose size and mtime are unchanged
+    is served from the manifest without being read; a file whose mtime moved
+    but whose content hash still matches is served too. Entries for inputs
+    that no longer exist are dropped when the manifest is closed; inputs a
+    partial run did not cover (other shards, filtered-out paths, a single
+    file) keep their entries for the next full run.
+    
+    The whole manifest is invalidated when ``fingerprint`` (the extraction
+    settings that shape a row) differs from the one it was written with.
+    """
+    
+    FILENAME = 'manifest.sqlite'
+    
+    def __init__(self, fingerprint: str, cache_dir: Optional[str] = None, commit_every: int = 1000):
+        """
+        Initialize the manifest.
+        
+        Args:
+            fingerprint: Identifier of the extraction settings
+            cache_dir: Directory holding the manifest (defaults to config)
+            commit_every: Number of recorded rows per transaction
+        """
+        self.cache_dir = cache_dir or config.get_cache_dir()
+        self.path = os.path.join(self.cache_dir, self.FILENAME)
+        self.fingerprint = f"{MANIFEST_VERSION}:{fingerprint}"
+        self.commit_every = commit_every
+        self.hits = 0
+        self.misses = 0
+        
+        self._conn: Optional['sqlite3.Connection'] = None
+        self._run_id = time.time_ns()
+        self._pending = 0
+    
+    def __enter__(self) -> "ResultManifest":
+        self.open()
+        return self
+    
+    def __exit__(self, exc_type, exc_value, traceback) -> None:
+        self.close(prune=exc_type is None)
+    
+    def open(self) -> None:
+        """Open (or create) the manifest database."""
+        import sqlite3
+        ensure_directory(self.cache_dir)
+        self._conn = sqlite3.connect(self.path)
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS meta (key TEXT PRIMARY KEY, value TEXT)"
+        )
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS files ("
+            "path TEXT PRIMARY KEY, size INTEGER, mtime_ns INTEGER, "
+            "hash TEXT, row TEXT, run_id INTEGER)"
+        )
+        
+        stored = self._conn.execute(
+            "SELECT value FROM meta WHERE key = 'fingerprint'"
+        ).fetchone()
+        if stored is None or stored[0] != self.fingerprint:
+            if stored is not None:
+                logger.info("Extraction settings changed, discarding cached results")
+            self._conn.execute("DELETE FROM files")
+            self._conn.execute(
+                "INSERT OR REPLACE INTO meta (key, value) VALUES ('fingerprint', ?)",
+                (self.fingerprint,)
+            )
+        self._conn.commit()
+        logger.debug(f"Opened result manifest: {self.path}")
+    
+    def is_current(self, file_path: str) -> bool:
+        """
+        Check whether the cached row for an input file is still valid.
+        
+        Args:
+            file_path: Path to the input file
+            
+        Returns:
+            True if the file is unchanged since its row was recorded
+        """
+        key = os.path.abspath(file_path)
+        entry = self._conn.execute(
+            "SELECT size, mtime_ns, hash FROM files WHERE path = ?", (key,)
+        ).fetchone()
+        if entry is None:
+            self.misses += 1
+            return False
+        
+        size, mtime_ns, content_hash = entry
+        try:
+            stat = os.stat(file_path)
+        except OSError:
+            self.misses += 1
+            return False
+        
+        if stat.st_size != size:
+            self.misses += 1
+            return False
+        
+        if stat.st_mtime_ns != mtime_ns:
+            # Touched but possibly unchanged: fall back to the content hash
+            if hash_file(file_path) != content_hash:
+                self.misses += 1
+                return False
+        
+        self._conn.execute(
+            "UPDATE files SET mtime_ns = ?, run_id = ? WHERE path = ?",
+            (stat.st_mtime_ns, self._run_id, key)
+        )
+        self._tick()
+        self.hits += 1
+        return True
+    
+    def load_row(self, file_path: str) -> Optional[Dict[str, Any]]:
+        """
+        Load the cached row for an input file.
+        
+        Args:
+            file_path: Path to the input file
+            
+        Returns:
+            Cached row, or None if the file has no entry
+        """
+        entry = self._conn.execute(
+            "SELECT row FROM files WHERE path = ?", (os.path.abspath(file_path),)
+        ).fetchone()
+        return json.loads(entry[0]) if entry else None
+    
+    def record(self, file_path: str, row: Dict[str, Any]) -> None:
+        """
+        Store the row extracted from an input file.
+        
+        The row should carry the stamp of the bytes it was extracted from
+        under STAMP_KEY (it is removed from the row): the file is then not
+        read again, and a change made after it was read leaves a newer mtime
+        than the one recorded, so the next run checks its hash again. Rows
+        without a stamp have the file stat'ed and hashed here.
+        
+        Args:
+            file_path: Path to the input file
+            row: Extracted flat record
+        """
+        stamp = row.pop(STAMP_KEY, None)
+        if stamp is None:
+            try:
+                stat = os.stat(file_path)
+                stamp = (stat.st_size, stat.st_mtime_ns, hash_file(file_path))
+            except OSError as e:
+                logger.warning("Could not cache result for %s: %s", file_path, e)
+                return
+        size, mtime_ns, content_hash = stamp
+        
+        self._conn.execute(
+            "INSERT OR REPLACE INTO files (path, size, mtime_ns, hash, row, run_id) "
+            "VALUES (?, ?, ?, ?, ?, ?)",
+            (
+                os.path.abspath(file_path), size, mtime_ns,
+                content_hash, json.dumps(row, default=str), self._run_id
+            )
+        )
+        self._tick()
+    
+    def close(self, prune: bool = True) -> None:
+        """
+        Commit pending changes and close the manifest.
+        
+        Args:
+            prune: Drop entries for inputs that were not seen during this run
+                and no longer exist
+        """
+        if self._conn is None:
+            return
+        try:
+            if prune:
+                unseen = self._conn.execute("SELECT path FROM files WHERE run_id != ?", (self._run_id,))
+                gone = [(path,) for (path,) in unseen if not os.path.exists(path)]
+                self._conn.executemany("DELETE FROM files WHERE path = ?", gone)
+                if gone:
+                    logger.debug(f"Pruned {len(gone)} manifest entries of deleted inputs")
+            self._conn.commit()
+        finally:
+            self._conn.close()
+            self._conn = None
+        logger.info(f"Result cache: {self.hits} reused, {self.misses} extracted")
+    
+    def _tick(self) -> None:
+        """Commit every ``commit_every`` changes."""
+        self._pending += 1
+        if self._pending >= self.commit_every:
+            self._conn.commit()
+            self._pending = 0
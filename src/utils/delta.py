@@ -0,0 +1,193 @@
+"""
+Change data capture between runs of the hotel data extraction tool.
+
+Instead of re-loading the whole output every night, downstream loaders can
+apply only what changed. The previous run's output is compared with the new
+one by giataId and a fingerprint of each row's content, and the differences
+are written to ``_inserts``, ``_updates`` and ``_deletes`` outputs next to the
+main output, plus a JSON summary.
+
+Neither output is loaded into memory: both are streamed, and only sorted
+int64 arrays of giataIds and row fingerprints (8 bytes a value) are kept to
+match rows across the two files.
+"""
+
+import hashlib
+import json
+import os
+from array import array
+from itertools import islice
+from typing import Any, Dict, Iterator, List, Optional, Tuple
+
+from config.settings import config
+from extractors.dedup import giata_id_key
+from .file_utils import ensure_directory
+from .logger import get_logger
+from .writers import child_table_path, iter_output_records, open_writer, read_output_columns
+
+logger = get_logger(__name__)
+
+# Outputs written next to the main output, in the order they are produced
+DELTA_TABLES = ('inserts', 'updates', 'deletes')
+
+
+def previous_output_path(output_path: str) -> str:
+    """
+    Build the path the previous output is kept at while a delta run writes the new one.
+    
+    Args:
+        output_path: Path of the main output file
+        
+    Returns:
+        Path such as 'extracted_hotels_previous.csv'
+    """
+    return child_table_path(output_path, 'previous')
+
+
+def row_fingerprint(record: Dict[str, Any]) -> int:
+    """
+    Hash the content of an output row.
+    
+    Empty cells are skipped and columns are taken in name order, so the
+    fingerprint does not depend on the column order or on columns that are
+    empty in every row.
+    
+    Args:
+        record: Row as read back by iter_output_records
+        
+    Returns:
+        Signed 64-bit fingerprint
+    """
+    digest = hashlib.blake2b(digest_size=8)
+    for column in sorted(record):
+        value = record[column]
+        if not _is_blank(value):
+            digest.update(f"{column}\x1f{value}\x1e".encode('utf-8'))
+    return int.from_bytes(digest.digest(), 'big', signed=True)
+
+
+def write_delta(
+    previous_path: Optional[str],
+    current_path: str,
+    summary_path: Optional[str] = None
+) -> Dict[str, int]:
+    """
+    Write the rows inserted, updated and deleted between two outputs.
+    
+    A current row is unchanged if the previous output holds a row with the
+    same fingerprint, an update if it holds another row with its giataId, and
+    an insert otherwise. Previous rows whose giataId is gone are deletes.
+    Rows without a giataId cannot be matched and are only counted. Inserts
+    and updates keep the current output's columns and order, deletes the
+    previous output's.
+    
+    Args:
+        previous_path: Previous run's output (None if there was none, so
+            every row is an insert)
+        current_path: This run's output; the delta outputs are written next to it
+        summary_path: JSON file to save the counts to (None to skip)
+        
+    Returns:
+        Counts of previous, current, inserted, updated, deleted, unchanged
+        and unkeyed rows
+    """
+    import numpy as np
+    
+    summary = dict.fromkeys(
+        ('previous_rows', 'current_rows', 'inserted', 'updated', 'deleted', 'unchanged', 'unkeyed'), 0
+    )
+    previous_ids, previous_fingerprints = array('q'), array('q')
+    if previous_path is not None:
+        for chunk in _iter_chunks(previous_path):
+            summary['previous_rows'] += len(chunk)
+            ids, fingerprints, keyed = _keys_of(chunk)
+            previous_ids.extend(ids[keyed].tolist())
+            previous_fingerprints.extend(fingerprints[keyed].tolist())
+    previous_ids = np.sort(np.array(previous_ids, dtype=np.int64))
+    previous_fingerprints = np.sort(np.array(previous_fingerprints, dtype=np.int64))
+    
+    # Inserts and updates, in a single pass over the current output
+    current_ids = array('q')
+    columns = read_output_columns(current_path)
+    with open_writer(child_table_path(current_path, 'inserts'), columns) as inserts, \
+            open_writer(child_table_path(current_path, 'updates'), columns) as updates:
+        for chunk in _iter_chunks(current_path):
+            summary['current_rows'] += len(chunk)
+            ids, fingerprints, keyed = _keys_of(chunk)
+            current_ids.extend(ids[keyed].tolist())
+            unchanged = _contains(previous_fingerprints, fingerprints)
+            known = _contains(previous_ids, ids)
+            for record, is_keyed, is_unchanged, is_known in zip(chunk, keyed, unchanged, known):
+                if not is_keyed:
+                    summary['unkeyed'] += 1
+                elif is_unchanged:
+                    summary['unchanged'] += 1
+                elif is_known:
+                    updates.write(record)
+                else:
+                    inserts.write(record)
+    summary['inserted'] = inserts.rows_written
+    summary['updated'] = updates.rows_written
+    
+    # Deletes, in a second pass over the previous output
+    current_ids = np.sort(np.array(current_ids, dtype=np.int64))
+    deletes_path = child_table_path(current_path, 'deletes')
+    previous_columns = read_output_columns(previous_path) if previous_path is not None else columns
+    with open_writer(deletes_path, previous_columns) as deletes:
+        if previous_path is not None:
+            for chunk in _iter_chunks(previous_path):
+                ids, _, keyed = _keys_of(chunk, fingerprints=False)
+                gone = keyed & ~_contains(current_ids, ids)
+                for record, is_gone in zip(chunk, gone):
+                    if is_gone:
+                        deletes.write(record)
+    summary['deleted'] = deletes.rows_written
+    
+    logger.info(
+        f"Delta against the previous output: {summary['inserted']} inserted, {summary['updated']} updated, "
+        f"{summary['deleted']} deleted, {summary['unchanged']} unchanged"
+    )
+    if summary['unkeyed']:
+        logger.warning(f"{summary['unkeyed']} rows without a giataId were left out of the delta")
+    
+    if summary_path:
+        ensure_directory(os.path.dirname(summary_path))
+        with open(summary_path, 'w', encoding='utf-8') as file:
+            outputs = {table: child_table_path(current_path, table) for table in DELTA_TABLES}
+            json.dump(dict(summary, outputs=outputs), file, indent=2)
+    return summary
+
+
+def _iter_chunks(file_path: str) -> Iterator[List[Dict[str, Any]]]:
+    """Read an output file in chunks of performance.chunk_size records."""
+    records = iter_output_records(file_path)
+    chunk_size = max(1, config.get_chunk_size())
+    while True:
+        chunk = list(islice(records, chunk_size))
+        if not chunk:
+            return
+        yield chunk
+
+
+def _keys_of(chunk: List[Dict[str, Any]], fingerprints: bool = True) -> Tuple[Any, Any, Any]:
+    """Get the giataId keys, fingerprints and has-a-giataId mask of a chunk of rows as numpy arrays."""
+    import numpy as np
+    keys = [giata_id_key(record.get('giataId')) for record in chunk]
+    keyed = np.array([key is not None for key in keys], dtype=bool)
+    ids = np.array([key if key is not None else 0 for key in keys], dtype=np.int64)
+    hashes = np.array([row_fingerprint(record) for record in chunk] if fingerprints else [], dtype=np.int64)
+    return ids, hashes, keyed
+
+
+def _contains(sorted_values, values):
+    """Check which of values occur in a sorted array."""
+    import numpy as np
+    if not len(sorted_values) or not len(values):
+        return np.zeros(len(values), dtype=bool)
+    positions = np.minimum(np.searchsorted(sorted_values, values), len(sorted_values) - 1)
+    return sorted_values[positions] == values
+
+
+def _is_blank(value: Any) -> bool:
+    """Check if a cell is empty (missing, NaN or an empty string)."""
+    return value is None or value == '' or (isinstance(value, float) and value != value)
@@ -0,0 +1,346 @@
+"""
+Input discovery for the hotel data extraction tool.
+
+Input directories are walked lazily with ``os.scandir``: files are yielded as
+directories are scanned, so extraction starts before a tree of millions of
+(e.g. date-partitioned) files has been fully listed. Each path can report
+its size and mtime, but only stats the file when a consumer (size-balanced
+chunking, the mmap threshold, watch mode) first asks for them, so a plain
+serial run costs no ``stat`` call per file.
+"""
+
+import fnmatch
+import hashlib
+import os
+from typing import Iterator, List, Optional, Sequence, Tuple
+
+from config.settings import config
+from .logger import get_logger
+from .sources import is_archive, is_gzip_json, is_json_array, is_ndjson
+
+logger = get_logger(__name__)
+
+
+class InputFile(str):
+    """
+    Path of a discovered input file, with its size in bytes, mtime and inode.
+    
+    It is a ``str``, so it can be used as the plain path anywhere. The size
+    and mtime are read on first access, from the directory entry the file
+    was found through (free on Windows, one ``stat`` elsewhere), and go
+    along once known when the path is sent to worker processes, as does
+    whether the file holds a JSON array.
+    """
+    
+    def __new__(
+        cls,
+        path: str,
+        size: Optional[int] = None,
+        mtime_ns: Optional[int] = None,
+        entry: Optional[os.DirEntry] = None,
+        json_array: Optional[bool] = None
+    ) -> "InputFile":
+        input_file = super().__new__(cls, path)
+        input_file._size = size
+        input_file._mtime_ns = mtime_ns
+        input_file._inode = None
+        input_file._entry = entry
+        input_file._json_array = json_array
+        return input_file
+    
+    @property
+    def size(self) -> int:
+        """Size of the file in bytes (0 if it cannot be read)."""
+        if self._size is None:
+            self._stat()
+        return self._size
+    
+    @property
+    def mtime_ns(self) -> int:
+        """Modification time of the file in nanoseconds (0 if it cannot be read)."""
+        if self._mtime_ns is None:
+            self._stat()
+        return self._mtime_ns
+    
+    @property
+    def inode(self) -> int:
+        """Inode number of the file, which changes when it is replaced (0 if it cannot be read)."""
+        if self._inode is None:
+            if self._entry is not None:
+                try:
+                    # Part of the directory listing on POSIX, no stat needed
+                    self._inode = self._entry.inode()
+                except OSError:
+                    self._inode = 0
+            else:
+                self._stat()
+        return self._inode
+    
+    @property
+    def json_array(self) -> bool:
+        """Whether the file holds a top-level JSON array, peeked at once (see sources.is_json_array)."""
+        if self._json_array is None:
+            self._json_array = is_json_array(self)
+        return self._json_array
+    
+    def _stat(self) -> None:
+        """Read the size, mtime and inode of the file."""
+        try:
+            stat = self._entry.stat() if self._entry is not None else os.stat(self)
+            self._size, self._mtime_ns = stat.st_size, stat.st_mtime_ns
+            if self._inode is None:
+                self._inode = stat.st_ino
+        except OSError:
+            # Vanished since the scan; extracting it reports the error
+            self._size, self._mtime_ns = 0, 0
+            if self._inode is None:
+                self._inode = 0
+        self._entry = None
+    
+    def __reduce__(self):
+        return InputFile, (str(self), self._size, self._mtime_ns, None, self._json_array)
+
+
+class InputFilter:
+    """
+    Which files and directories of an input tree a run reads.
+    
+    Patterns are ``fnmatch`` globs matched against the path relative to the
+    input directory, with ``/`` separators (``*`` also matches across ``/``).
+    """
+    
+    def __init__(
+        self,
+        include: Optional[Sequence[str]] = None,
+        exclude: Optional[Sequence[str]] = None,
+        max_depth: Optional[int] = None,
+        shard: Optional[Tuple[int, int]] = None
+    ):
+        """
+        Initialize the filter.
+        
+        Args:
+            include: Patterns a file must match (defaults to ``data.include``;
+                empty means every input file)
+            exclude: Patterns of files and directories to skip (defaults to
+                ``data.exclude``)
+            max_depth: Subdirectory levels to descend into, 0 for the root only
+                (defaults to ``data.max_depth``; None means unlimited)
+            shard: (index, count) to only accept the files of one shard, see
+                shard_of (defaults to ``data.shard``)
+        """
+        self.include = list(config.get_include_patterns() if include is None else include)
+        self.exclude = list(config.get_exclude_patterns() if exclude is None else exclude)
+        self.max_depth = config.get_max_depth() if max_depth is None else max_depth
+        self.shard = config.get_shard() if shard is None else shard
+        self.read_archives = config.should_read_archives()
+        self.read_ndjson = config.should_read_ndjson()
+    
+    def skips(self, relative_path: str) -> bool:
+        """Check if a file or directory is excluded."""
+        return bool(self.exclude) and _matches(relative_path, self.exclude)
+    
+    def enters(self, depth: int) -> bool:
+        """Check if subdirectories this many levels below the root are scanned."""
+        return self.max_depth is None or depth <= self.max_depth
+    
+    def is_multi_document(self, name: str) -> bool:
+        """Check if a file is read as an archive or JSON Lines file."""
+        return (self.read_archives and is_archive(name)) or (self.read_ndjson and is_ndjson(name))
+    
+    def accepts(self, relative_path: str, name: str) -> bool:
+        """
+        Check if a file found while scanning its directory is an input file.
+        
+        Args:
+            relative_path: Path relative to the root, not excluded itself
+            name: File name
+            
+        Returns:
+            True if the file is read by this run
+        """
+        if not (self.is_multi_document(name) or name.endswith('.json')
+                or (self.read_archives and is_gzip_json(name))):
+            return False
+        if self.include and not _matches(relative_path, self.include):
+            return False
+        return not self.shard or shard_of(relative_path, self.shard[1]) == self.shard[0]
+    
+    def accepts_path(self, relative_path: str) -> bool:
+        """
+        Check if a file is an input file, including the rules of the directories above it.
+        
+        Args:
+            relative_path: Path relative to the root, with ``/`` separators
+            
+        Returns:
+            True if a scan of the whole tree would yield the file
+        """
+        parts = relative_path.split('/')
+        if not self.enters(len(parts) - 1):
+            return False
+        if any(self.skips('/'.join(parts[:level])) for level in range(1, len(parts) + 1)):
+            return False
+        return self.accepts(relative_path, parts[-1])
+
+
+def scan_directory(
+    path: str,
+    relative_dir: str,
+    depth: int,
+    input_filter: InputFilter
+) -> Tuple[List[InputFile], List[Tuple[str, str, int]]]:
+    """
+    List one directory of an input tree.
+    
+    Args:
+        path: Directory to list
+        relative_dir: Its path relative to the root, '' for the root or
+            ending with '/'
+        depth: Its level below the root, 0 for the root
+        input_filter: Rules of the run
+        
+    Returns:
+        Input files of the directory and the (path, relative path, depth) of
+        the subdirectories to scan, both in name order
+        
+    Raises:
+        OSError: If the directory cannot be listed
+    """
+    with os.scandir(path) as scan:
+        entries = sorted(scan, key=lambda entry: entry.name)
+    
+    files = []
+    subdirectories = []
+    for entry in entries:
+        relative = relative_dir + entry.name
+        if input_filter.skips(relative):
+            continue
+        try:
+            if entry.is_dir():
+                if input_filter.enters(depth + 1):
+                    subdirectories.append((entry.path, relative + '/', depth + 1))
+            elif entry.is_file() and input_filter.accepts(relative, entry.name):
+                files.append(InputFile(entry.path, entry=entry))
+        except OSError as e:
+            logger.warning(f"Cannot read directory entry {entry.path}: {e}")
+    return files, subdirectories
+
+
+def iter_input_files(
+    directory_path: str,
+    include: Optional[Sequence[str]] = None,
+    exclude: Optional[Sequence[str]] = None,
+    max_depth: Optional[int] = None,
+    shard: Optional[Tuple[int, int]] = None
+) -> Iterator[InputFile]:
+    """
+    Walk a directory tree, yielding input files as they are found.
+    
+    Entries are visited in name order, each directory's files before its
+    subdirectories. Plain JSON (and ``.json.gz``) files are yielded right
+    away; archives and JSON Lines files, which yield many records each, are
+    held back and yielded after the walk, like ``get_json_files`` lists them.
+    Patterns are ``fnmatch`` globs matched against the path relative to
+    directory_path, with ``/`` separators (``*`` also matches across ``/``).
+    
+    Args:
+        directory_path: Root directory
+        include: Patterns a file must match (defaults to ``data.include``;
+            empty means every input file)
+        exclude: Patterns of files and directories to skip (defaults to
+            ``data.exclude``)
+        max_depth: Subdirectory levels to descend into, 0 for the root only
+            (defaults to ``data.max_depth``; None means unlimited)
+        shard: (index, count) to only yield the files of one shard, see
+            shard_of (defaults to ``data.shard``)
+            
+    Yields:
+        InputFile paths
+    """
+    if not os.path.isdir(directory_path):
+        logger.warning(f"Directory does not exist: {directory_path}")
+        return
+    
+    input_filter = InputFilter(include, exclude, max_depth, shard)
+    multi_document_files: List[InputFile] = []
+    # Directories still to scan: (path, path relative to the root, depth)
+    stack: List[Tuple[str, str, int]] = [(directory_path, '', 0)]
+    while stack:
+        path, relative_dir, depth = stack.pop()
+        try:
+            files, subdirectories = scan_directory(path, relative_dir, depth, input_filter)
+        except OSError as e:
+            logger.warning(f"Cannot scan directory {path}: {e}")
+            continue
+        
+        for input_file in files:
+            if input_filter.is_multi_document(os.path.basename(input_file)):
+                multi_document_files.append(input_file)
+            else:
+                yield input_file
+        
+        # Popped from the end, so push in reverse to visit in name order
+        stack.extend(reversed(subdirectories))
+    
+    yield from multi_document_files
+
+
+def _matches(relative_path: str, patterns: Sequence[str]) -> bool:
+    """Check a relative path against glob patterns."""
+    return any(fnmatch.fnmatchcase(relative_path, pattern) for pattern in patterns)
+
+
+def shard_of(relative_path: str, count: int) -> int:
+    """
+    Get the shard a file belongs to.
+    
+    The hash depends only on the path relative to the input directory (with
+    ``/`` separators), so every machine agrees on it wherever the input is
+    mounted, unlike Python's salted ``hash``.
+    
+    Args:
+        relative_path: Path relative to the input directory
+        count: Number of shards
+        
+    Returns:
+        Shard index from 1 to count
+    """
+    digest = hashlib.blake2b(relative_path.encode('utf-8'), digest_size=8).digest()
+    return int.from_bytes(digest, 'big') % count + 1
+
+
+def chunk_by_size(
+    file_paths: Iterator[str],
+    max_files: int,
+    max_bytes: Optional[int] = None
+) -> Iterator[List[str]]:
+    """
+    Group paths into chunks of at most max_files files and about max_bytes bytes.
+    
+    Sizes are taken from InputFile paths; plain strings count as empty, so
+    chunks of them are cut by count only. A file larger than max_bytes gets
+    a chunk of its own.
+    
+    Args:
+        file_paths: Paths, consumed lazily
+        max_files: Maximum files per chunk
+        max_bytes: Byte budget per chunk (None for no limit)
+        
+    Yields:
+        Lists of paths, in input order
+    """
+    chunk: List[str] = []
+    chunk_bytes = 0
+    for file_path in file_paths:
+        size = getattr(file_path, 'size', 0)
+        if chunk and max_bytes and chunk_bytes + size > max_bytes:
+            yield chunk
+            chunk, chunk_bytes = [], 0
+        chunk.append(file_path)
+        chunk_bytes += size
+        if len(chunk) >= max_files:
+            yield chunk
+            chunk, chunk_bytes = [], 0
+    if chunk:
+        yield chunk
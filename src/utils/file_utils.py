@@ -4,13 +4,21 @@ File utility functions for the hotel data extraction tool.
 
 import os
 import json
+import mmap
 import shutil
+import time
 from pathlib import Path
-from typing import List, Dict, Any, Optional
-import pandas as pd
+from typing import TYPE_CHECKING, List, Dict, Any, Optional, Tuple
 
-from ..config.settings import config
+from config.settings import config
 from .logger import get_logger
+from .json_backend import decode_json, decodes_buffers
+from .metrics import get_run_metrics
+from .discovery import iter_input_files
+from .sources import decompress_member, is_gzip_json, is_multi_document, member_quarantine_path
+
+if TYPE_CHECKING:
+    import pandas as pd
 
 logger = get_logger(__name__)
 
@@ -26,33 +34,115 @@ def ensure_directory(directory_path: str) -> None:
     logger.debug(f"Ensured directory exists: {directory_path}")
 
 
-def get_json_files(directory_path: str) -> List[str]:
+def get_json_files(directory_path: str, shard: Optional[Tuple[int, int]] = None) -> List[str]:
     """
-    Get all JSON files in a directory.
+    Get all JSON files in a directory tree.
+    
+    When ``data.read_archives`` is enabled, gzipped ``.json.gz`` files and
+    zip/tar bundles are included too, and when ``data.read_ndjson`` is
+    enabled so are ``.jsonl``/``.ndjson`` files. This collects
+    iter_input_files into a list, keeping its order: the walk holds
+    multi-document files back until every plain file has been yielded, so
+    plain files are still processed as one run. Subdirectories and
+    include/exclude patterns are handled as described there.
     
     Args:
         directory_path: Path to the directory
-        
+        shard: (index, count) to only list the files of one shard (defaults
+            to ``data.shard``)
+            
     Returns:
-        List of JSON file paths
+        List of JSON file paths (InputFile paths, which report their size)
     """
-    if not os.path.exists(directory_path):
-        logger.warning(f"Directory does not exist: {directory_path}")
-        return []
-    
-    json_files = []
-    for file in os.listdir(directory_path):
-        if file.endswith('.json'):
-            json_files.append(os.path.join(directory_path, file))
+    json_files = list(iter_input_files(directory_path, shard=shard))
+    multi_document_count = sum(1 for file_path in json_files if is_multi_document(file_path))
     
-    logger.info(f"Found {len(json_files)} JSON files in {directory_path}")
+    if multi_document_count:
+        logger.info(
+            f"Found {len(json_files) - multi_document_count} JSON files and {multi_document_count} "
+            f"archive/JSON Lines files in {directory_path}"
+        )
+    else:
+        logger.info(f"Found {len(json_files)} JSON files in {directory_path}")
     return json_files
 
 
+def read_file_bytes(file_path: str, digest: Optional[Any] = None) -> bytes:
+    """
+    Read the raw contents of an input file.
+    
+    Gzipped ``.json.gz`` files are decompressed in memory.
+    
+    Args:
+        file_path: Path to the file
+        digest: hashlib object to feed the bytes read from disk to (before
+            decompression), to hash the file without reading it again
+            
+    Returns:
+        File contents
+        
+    Raises:
+        FileNotFoundError: If file doesn't exist
+    """
+    metrics = get_run_metrics()
+    try:
+        if metrics is None and digest is None:
+            with open(file_path, 'rb') as file:
+                return decompress_member(file_path, file.read())
+        
+        start = time.perf_counter()
+        with open(file_path, 'rb') as file:
+            data = file.read()
+        if digest is not None:
+            digest.update(data)
+        if metrics is None:
+            return decompress_member(file_path, data)
+        metrics.count('bytes_read', len(data))
+        data = decompress_member(file_path, data)
+        metrics.add_time('read', time.perf_counter() - start)
+        return data
+    except FileNotFoundError:
+        logger.error("File not found: %s", file_path)
+        raise
+
+
+def parse_json_bytes(data: bytes, file_path: str) -> Dict[str, Any]:
+    """
+    Decode the raw contents of a JSON file.
+    
+    Args:
+        data: Raw JSON document
+        file_path: Path the data was read from (for logging)
+        
+    Returns:
+        JSON data as dictionary
+        
+    Raises:
+        json.JSONDecodeError: If data is not valid JSON
+    """
+    metrics = get_run_metrics()
+    try:
+        if metrics is None:
+            return decode_json(data)
+        
+        start = time.perf_counter()
+        parsed = decode_json(data)
+        metrics.add_time('parse', time.perf_counter() - start)
+        return parsed
+    except json.JSONDecodeError as e:
+        logger.error("Invalid JSON in file %s: %s", file_path, e)
+        raise
+
+
 def load_json_file(file_path: str) -> Dict[str, Any]:
     """
     Load JSON data from a file.
     
+    The file is read as bytes and decoded by the backend selected with
+    ``performance.json_backend``. Files of at least ``performance.mmap_min_mb``
+    are memory-mapped instead when the backend decodes buffers, so the
+    document is parsed straight from the page cache without a copy.
+    
     Args:
         file_path: Path to the JSON file
         
@@ -63,16 +153,45 @@ def load_json_file(file_path: str) -> Dict[str, Any]:
         FileNotFoundError: If file doesn't exist
         json.JSONDecodeError: If file contains invalid JSON
     """
+    if _should_map(file_path):
+        data = _load_mapped_json(file_path)
+    else:
+        data = parse_json_bytes(read_file_bytes(file_path), file_path)
+    logger.debug("Successfully loaded JSON file: %s", file_path)
+    return data
+
+
+def _should_map(file_path: str) -> bool:
+    """Check if a JSON file is large enough to be memory-mapped rather than read."""
+    threshold = config.get_mmap_threshold()
+    if threshold is None or is_gzip_json(file_path) or not decodes_buffers():
+        return False
+    # Discovered files carry their size; others are stat'ed
+    size = getattr(file_path, 'size', None)
+    if size is None:
+        try:
+            size = os.path.getsize(file_path)
+        except OSError:
+            return False
+    return size >= max(threshold, 1)
+
+
+def _load_mapped_json(file_path: str) -> Dict[str, Any]:
+    """Decode a JSON file through a read-only memory map of it."""
+    metrics = get_run_metrics()
+    start = time.perf_counter()
     try:
-        with open(file_path, 'r', encoding='utf-8') as file:
-            data = json.load(file)
-        logger.debug(f"Successfully loaded JSON file: {file_path}")
-        return data
+        with open(file_path, 'rb') as file, mmap.mmap(file.fileno(), 0, access=mmap.ACCESS_READ) as mapped:
+            if hasattr(mmap, 'MADV_SEQUENTIAL'):
+                mapped.madvise(mmap.MADV_SEQUENTIAL)
+            if metrics is not None:
+                metrics.count('bytes_read', len(mapped))
+                metrics.add_time('read', time.perf_counter() - start)
+            # The view must be released before the map is closed
+            with memoryview(mapped) as view:
+                return parse_json_bytes(view, file_path)
     except FileNotFoundError:
-        logger.error(f"File not found: {file_path}")
-        raise
-    except json.JSONDecodeError as e:
-        logger.error(f"Invalid JSON in file {file_path}: {e}")
+        logger.error("File not found: %s", file_path)
         raise
 
 
@@ -95,7 +214,7 @@ def save_json_file(data: Dict[str, Any], file_path: str) -> None:
         raise
 
 
-def save_csv_file(data: pd.DataFrame, file_path: str, **kwargs) -> None:
+def save_csv_file(data: 'pd.DataFrame', file_path: str, **kwargs) -> None:
     """
     Save DataFrame to CSV file.
     
@@ -111,12 +230,16 @@ def save_csv_file(data: pd.DataFrame, file_path: str, **kwargs) -> None:
         encoding = kwargs.get('encoding', config.get_output_encoding())
         index = kwargs.get('index', config.should_include_index())
         
+        start = time.perf_counter()
         data.to_csv(
             file_path,
             encoding=encoding,
             index=index,
             **kwargs
         )
+        metrics = get_run_metrics()
+        if metrics is not None:
+            metrics.add_time('write', time.perf_counter() - start)
         logger.info(f"Successfully saved CSV file: {file_path}")
     except Exception as e:
         logger.error(f"Failed to save CSV file {file_path}: {e}")
@@ -177,7 +300,34 @@ def move_failed_file(file_path: str, failed_dir: str = None) -> str:
         failed_path = os.path.join(failed_dir, f"{name}_{timestamp}{ext}")
     
     shutil.move(file_path, failed_path)
-    logger.info(f"Moved failed file to: {failed_path}")
+    logger.info("Moved failed file to: %s", failed_path)
+    
+    return failed_path
+
+
+def save_failed_member(archive_path: str, member_name: str, data: bytes, failed_dir: str = None) -> str:
+    """
+    Write a failed archive member or JSON Lines record to the failed files directory.
+    
+    The archive itself is left in place; only the member that could not be
+    processed is copied out, under a directory named after the archive.
+    
+    Args:
+        archive_path: Path to the archive the member came from
+        member_name: Member name inside the archive
+        data: Member contents
+        failed_dir: Directory to write failed files to
+        
+    Returns:
+        Path to the written file
+    """
+    failed_dir = failed_dir or config.get_failed_dir()
+    failed_path = member_quarantine_path(failed_dir, archive_path, member_name)
+    ensure_directory(os.path.dirname(failed_path))
+    
+    with open(failed_path, 'wb') as file:
+        file.write(data)
+    logger.info("Saved failed archive member to: %s", failed_path)
     
     return failed_path
 
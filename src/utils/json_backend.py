@@ -0,0 +1,167 @@
+"""
+JSON decoding backends for the hotel data extraction tool.
+
+Input files are read as bytes once and handed to the fastest available
+decoder. Documents a faster backend rejects or may have decoded lossily are
+decoded again by the standard library, so what is accepted, how it is
+decoded and the ``json.JSONDecodeError`` raised for malformed input are the
+same whichever backend is active: ``NaN`` and ``Infinity`` are accepted and
+integers wider than 64 bits stay exact. Backends in BUFFER_BACKENDS also
+decode any buffer, such as a memoryview of a memory-mapped file, without it
+being copied into bytes first.
+"""
+
+import json
+from typing import Any, Callable, Dict, Optional
+
+from config.settings import config
+from .logger import get_logger
+
+logger = get_logger(__name__)
+
+# Preference order for 'auto'
+AUTO_ORDER = ['orjson', 'ujson', 'simdjson', 'json']
+
+# Backends whose decoder accepts memoryviews as well as bytes
+BUFFER_BACKENDS = {'orjson'}
+
+# Digits map to '0' and everything else to ' ', so a run of digits too long
+# for a 64-bit integer (which orjson turns into a float) is a plain substring
+_DIGITS = bytes(0x30 if 0x30 <= byte <= 0x39 else 0x20 for byte in range(256))
+_WIDE_NUMBER = b'0' * 20
+
+# Bytes of a buffer checked for wide numbers at a time
+_CHECK_BYTES = 1024 * 1024
+
+_decoder_cache: Dict[str, Callable[[bytes], Any]] = {}
+# Backend each configured name resolved to, e.g. 'auto' -> 'orjson'
+_name_cache: Dict[str, str] = {}
+
+
+def _load_orjson() -> Callable[[bytes], Any]:
+    import orjson
+    return orjson.loads
+
+
+def _load_ujson() -> Callable[[bytes], Any]:
+    import ujson
+    return ujson.loads
+
+
+def _load_simdjson() -> Callable[[bytes], Any]:
+    import simdjson
+    return simdjson.loads
+
+
+def _load_stdlib() -> Callable[[bytes], Any]:
+    return json.loads
+
+
+_BACKENDS = {
+    'orjson': _load_orjson,
+    'ujson': _load_ujson,
+    'simdjson': _load_simdjson,
+    'json': _load_stdlib
+}
+
+
+def get_decoder(backend: Optional[str] = None) -> Callable[[bytes], Any]:
+    """
+    Get the decode function for a JSON backend.
+    
+    Args:
+        backend: Backend name, or 'auto' for the fastest installed one
+            (defaults to config)
+            
+    Returns:
+        Function decoding UTF-8 JSON bytes into Python objects
+        
+    Raises:
+        ValueError: If the backend name is unknown
+        ImportError: If an explicitly requested backend is not installed
+    """
+    backend = (backend or config.get_json_backend()).lower()
+    if backend in _decoder_cache:
+        return _decoder_cache[backend]
+    
+    if backend == 'auto':
+        for name in AUTO_ORDER:
+            try:
+                decoder = _BACKENDS[name]()
+            except ImportError:
+                continue
+            logger.debug(f"Using JSON backend: {name}")
+            break
+    elif backend in _BACKENDS:
+        name = backend
+        decoder = _BACKENDS[backend]()
+    else:
+        raise ValueError(
+            f"Unknown JSON backend: {backend} "
+            f"(expected auto or one of {', '.join(AUTO_ORDER)})"
+        )
+    
+    _decoder_cache[backend] = decoder
+    _name_cache[backend] = name
+    return decoder
+
+
+def decodes_buffers(backend: Optional[str] = None) -> bool:
+    """
+    Check if a JSON backend decodes memoryviews without copying them.
+    
+    Args:
+        backend: Backend name, or 'auto' (defaults to config)
+        
+    Returns:
+        True if decode_json may be given any buffer, False if it needs bytes
+    """
+    backend = (backend or config.get_json_backend()).lower()
+    get_decoder(backend)
+    return _name_cache[backend] in BUFFER_BACKENDS
+
+
+def decode_json(data: bytes, backend: Optional[str] = None) -> Any:
+    """
+    Decode JSON bytes with the configured backend.
+    
+    When a faster backend fails, or the document holds a number too wide
+    for it to decode exactly, the standard library decodes the document
+    instead and decides whether it is valid.
+    
+    Args:
+        data: Raw JSON document (or any buffer, if decodes_buffers is True)
+        backend: Backend name (defaults to config)
+        
+    Returns:
+        Decoded JSON data
+        
+    Raises:
+        json.JSONDecodeError: If the data is not valid JSON
+        ValueError: If the backend name is unknown (raised before any data
+            is decoded, so the input is not mistaken for malformed JSON)
+    """
+    decoder = get_decoder(backend)
+    if decoder is json.loads:
+        return decoder(data)
+    try:
+        if not _has_wide_number(data):
+            return decoder(data)
+    except ValueError:
+        # JSONDecodeError, UnicodeDecodeError and the plain ValueErrors of ujson and simdjson
+        pass
+    return json.loads(data if isinstance(data, (bytes, bytearray)) else bytes(data))
+
+
+def _has_wide_number(data: Any) -> bool:
+    """Check a document for a run of digits too long for a 64-bit integer."""
+    if isinstance(data, bytes):
+        return _WIDE_NUMBER in data.translate(_DIGITS)
+    # Buffers such as memory maps are checked a piece at a time, overlapping
+    # by a run's length so none is split between pieces
+    with memoryview(data) as view:
+        overlap = len(_WIDE_NUMBER) - 1
+        for start in range(0, max(len(view) - overlap, 1), _CHECK_BYTES):
+            if _WIDE_NUMBER in bytes(view[start:start + _CHECK_BYTES + overlap]).translate(_DIGITS):
+                return True
+    return False
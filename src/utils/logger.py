@@ -1,14 +1,87 @@
 """
 Logging utilities for the hotel data extraction tool.
+
+Module loggers returned by ``get_logger`` are children of the configured
+``hotel_extractor`` logger. With ``logging.queue`` enabled, records are handed
+to a ``QueueHandler`` and the console and file handlers run on a background
+``QueueListener`` thread, so slow handler I/O never blocks extraction. Worker
+processes send their records to the parent through a multiprocessing queue.
+
+Nothing is configured at import: the first record logged calls setup_logger,
+so importing a module neither reads ``config.yaml`` nor opens the log file.
 """
 
+import atexit
+import json
 import logging
 import logging.handlers
 import os
+import queue
 from pathlib import Path
-from typing import Optional
+from typing import Any, List, Optional
+
+from config.settings import config
+
+# Name of the logger configured by setup_logger; module loggers are its children
+ROOT_LOGGER_NAME = "hotel_extractor"
+
+# Attributes every LogRecord has; anything else was passed with ``extra=``
+_RECORD_ATTRIBUTES = set(vars(logging.LogRecord('', 0, '', 0, '', (), None))) | {'message', 'asctime'}
+
+# Background handler threads owned by this process
+_listeners: List[logging.handlers.QueueListener] = []
+_handlers: List[logging.Handler] = []
+_worker_queue = None
+
+
+class JsonFormatter(logging.Formatter):
+    """
+    Format records as one JSON object per line.
+    
+    Values passed with ``extra=`` are included as additional keys.
+    """
+    
+    def format(self, record: logging.LogRecord) -> str:
+        entry = {
+            'time': self.formatTime(record),
+            'level': record.levelname,
+            'logger': record.name,
+            'message': record.getMessage()
+        }
+        for key, value in vars(record).items():
+            if key not in _RECORD_ATTRIBUTES and not key.startswith('_'):
+                entry[key] = value
+        if record.exc_info:
+            entry['exception'] = self.formatException(record.exc_info)
+        return json.dumps(entry, ensure_ascii=False, default=str)
+
 
-from ..config.settings import config
+class _LocalQueueHandler(logging.handlers.QueueHandler):
+    """
+    Queue records for a listener thread in the same process.
+    
+    Records are queued as they are, so message formatting (including the
+    ``%`` arguments of lazily formatted calls) happens on the listener thread.
+    """
+    
+    def prepare(self, record: logging.LogRecord) -> logging.LogRecord:
+        return record
+
+
+class _DeferredSetupHandler(logging.Handler):
+    """
+    Run setup_logger when the first record arrives, then hand it on.
+    
+    Installed at import in place of the real handlers, which setup_logger
+    replaces it with.
+    """
+    
+    def emit(self, record: logging.LogRecord) -> None:
+        logger = setup_logger()
+        if logger.isEnabledFor(record.levelno):
+            for handler in logger.handlers:
+                if record.levelno >= handler.level:
+                    handler.handle(record)
 
 
 def setup_logger(
@@ -19,6 +92,9 @@ def setup_logger(
     """
     Set up a logger with file and console handlers.
     
+    Calling it again replaces the handlers (and stops the listener threads)
+    of the previous setup.
+    
     Args:
         name: Logger name
         level: Logging level
@@ -38,17 +114,21 @@ def setup_logger(
     logger = logging.getLogger(name)
     logger.setLevel(getattr(logging, log_level.upper()))
     
-    # Clear existing handlers
-    logger.handlers.clear()
+    # Clear existing handlers (rebinding the list, as a record may be mid-dispatch)
+    logger.handlers = []
+    stop_log_listeners()
+    for handler in _handlers:
+        handler.close()
+    handlers = []
     
     # Create formatter
-    formatter = logging.Formatter(log_format)
+    formatter = JsonFormatter() if config.should_log_json() else logging.Formatter(log_format)
     
     # Create console handler
     console_handler = logging.StreamHandler()
     console_handler.setLevel(logging.INFO)
     console_handler.setFormatter(formatter)
-    logger.addHandler(console_handler)
+    handlers.append(console_handler)
     
     # Create file handler with rotation
     if log_file:
@@ -68,11 +148,75 @@ def setup_logger(
         )
         file_handler.setLevel(logging.DEBUG)
         file_handler.setFormatter(formatter)
-        logger.addHandler(file_handler)
+        handlers.append(file_handler)
+    
+    _handlers[:] = handlers
+    if config.should_log_via_queue():
+        log_queue = queue.SimpleQueue()
+        listener = logging.handlers.QueueListener(log_queue, *handlers, respect_handler_level=True)
+        listener.start()
+        _listeners.append(listener)
+        logger.addHandler(_LocalQueueHandler(log_queue))
+    else:
+        for handler in handlers:
+            logger.addHandler(handler)
     
     return logger
 
 
+def get_worker_log_queue() -> Optional[Any]:
+    """
+    Get the queue worker processes send their log records to.
+    
+    The queue is created on first use and drained by a listener thread
+    feeding this process's handlers.
+    
+    Returns:
+        A multiprocessing queue, or None if queued logging is disabled
+    """
+    global _worker_queue
+    if not _listeners:
+        return None
+    if _worker_queue is None:
+        import multiprocessing
+        _worker_queue = multiprocessing.Queue()
+        listener = logging.handlers.QueueListener(_worker_queue, *_handlers, respect_handler_level=True)
+        listener.start()
+        _listeners.append(listener)
+    return _worker_queue
+
+
+def configure_worker_logging(log_queue: Any) -> None:
+    """
+    Route a worker process's records to the parent's log queue.
+    
+    The level comes from ``logging.level`` as in the parent, so a worker
+    started by spawn or forkserver does not send DEBUG records the parent
+    would drop.
+    
+    Args:
+        log_queue: Queue returned by get_worker_log_queue in the parent
+    """
+    global _worker_queue
+    # Listener threads belong to the parent (or to this process's own import-time setup)
+    _listeners.clear()
+    _handlers.clear()
+    _worker_queue = None
+    
+    logger = logging.getLogger(ROOT_LOGGER_NAME)
+    logger.setLevel(getattr(logging, config.get_log_level().upper()))
+    logger.handlers = []
+    logger.addHandler(logging.handlers.QueueHandler(log_queue))
+
+
+def stop_log_listeners() -> None:
+    """Flush queued records and stop the background handler threads."""
+    global _worker_queue
+    while _listeners:
+        _listeners.pop().stop()
+    _worker_queue = None
+
+
 def _parse_size(size_str: str) -> int:
     """
     Parse size string to bytes.
@@ -94,18 +238,27 @@ def _parse_size(size_str: str) -> int:
         return int(size_str)
 
 
-def get_logger(name: str = "hotel_extractor") -> logging.Logger:
+def get_logger(name: str = ROOT_LOGGER_NAME) -> logging.Logger:
     """
     Get a configured logger instance.
     
+    Module names are placed under the ``hotel_extractor`` logger so their
+    records reach the handlers set up by setup_logger.
+    
     Args:
         name: Logger name
         
     Returns:
         Logger instance
     """
+    if name != ROOT_LOGGER_NAME and not name.startswith(ROOT_LOGGER_NAME + '.'):
+        name = f"{ROOT_LOGGER_NAME}.{name}"
     return logging.getLogger(name)
 
 
-# Default logger instance
-logger = setup_logger() 
\ No newline at end of file
+# Configure the default logger on its first record
+logger = logging.getLogger(ROOT_LOGGER_NAME)
+if not logger.handlers:
+    logger.setLevel(logging.DEBUG)
+    logger.addHandler(_DeferredSetupHandler())
+atexit.register(stop_log_listeners) 
\ No newline at end of file
@@ -0,0 +1,326 @@
+"""
+On-disk giataId lookup index for the hotel data extraction tool.
+
+Batch runs write ``<output>.idx`` next to their output, mapping every
+giataId to the source file it was extracted from and to the position of its
+row in the output: a byte offset into uncompressed CSV, the row number in
+other formats. Lookups memory-map the index and binary search its sorted
+keys, so finding a hotel touches a handful of pages instead of scanning a
+multi-GB output or the input directory.
+
+Layout (little-endian): a fixed header; the sorted giataId keys, the row
+positions and the source numbers as int64 arrays of one entry a row; the
+offsets of the source paths as an int64 array; then the source paths as
+UTF-8.
+"""
+
+import csv
+import io
+import mmap
+import os
+import struct
+from array import array
+from itertools import islice
+from typing import Any, Dict, List, Optional
+
+from config.settings import config
+from extractors.dedup import giata_id_key
+from .logger import get_logger
+from .writers import iter_output_records, read_output_columns
+
+logger = get_logger(__name__)
+
+# Key records carry their source file path under while a lookup index is built
+SOURCE_KEY = '_source'
+
+_MAGIC = b'HTLIDX01'
+# magic, entry count, position kind, output size, source count
+_HEADER = struct.Struct('<8sQ8sQQ')
+
+# Row positions: byte offsets, row numbers, or none (SQLite is queried by giataId)
+BYTE_OFFSETS = b'offset'
+ROW_NUMBERS = b'row'
+NO_POSITIONS = b'none'
+
+# Key of rows without a giataId; left out of the index
+_NO_KEY = -(2 ** 63)
+
+# Bytes scanned at a time while locating CSV rows
+_SCAN_BYTES = 4 * 1024 * 1024
+
+
+def lookup_index_path(output_path: str) -> str:
+    """
+    Build the path of the lookup index of an output file.
+    
+    Args:
+        output_path: Path of the main output file
+        
+    Returns:
+        Path such as 'extracted_hotels.csv.idx'
+    """
+    return f"{output_path}.idx"
+
+
+class LookupIndexBuilder:
+    """
+    Collect the giataId and source of every row written to an output.
+    
+    Rows are added in output order; only an int64 key and a source number
+    are kept per row. Call write once the output file is complete.
+    """
+    
+    def __init__(self):
+        self._keys = array('q')
+        self._sources = array('q')
+        self._source_numbers: Dict[str, int] = {}
+    
+    def __len__(self) -> int:
+        return len(self._keys)
+    
+    def add(self, record: Dict[str, Any]) -> None:
+        """
+        Add the next row of the output.
+        
+        Args:
+            record: Extracted record, with its source path under SOURCE_KEY
+        """
+        key = giata_id_key(record.get('giataId'))
+        source = record.get(SOURCE_KEY)
+        # Rows without a giataId keep their place, so positions stay aligned
+        self._keys.append(key if key is not None else _NO_KEY)
+        if source is None:
+            self._sources.append(-1)
+        else:
+            self._sources.append(self._source_numbers.setdefault(str(source), len(self._source_numbers)))
+    
+    def write(
+        self,
+        output_path: str,
+        row_offsets: Optional[array] = None,
+        row_count: Optional[int] = None
+    ) -> Optional[str]:
+        """
+        Write the index of a complete output file.
+        
+        The positions come from the writer where it tracked them; only when
+        it did not is the output read back to locate its rows.
+        
+        Args:
+            output_path: Output file the rows were written to
+            row_offsets: Byte offsets of the rows of an uncompressed CSV
+                output, as tracked by its writer (OutputWriter.row_offsets)
+            row_count: Rows written to the output (OutputWriter.rows_written)
+            
+        Returns:
+            Path of the index, or None if the output's rows did not match the
+            rows added (e.g. rows already in an appended-to file)
+        """
+        import numpy as np
+        
+        kind, positions = _row_positions(output_path, len(self._keys), row_offsets, row_count)
+        if positions is None:
+            logger.warning(f"Rows of {output_path} do not match the rows extracted; lookup index not written")
+            return None
+        
+        keys = np.frombuffer(self._keys, dtype=np.int64) if self._keys else np.empty(0, dtype=np.int64)
+        sources = np.frombuffer(self._sources, dtype=np.int64) if self._sources else np.empty(0, dtype=np.int64)
+        order = np.argsort(keys, kind='stable')
+        keyed = order[keys[order] != _NO_KEY]
+        
+        paths = [path.encode('utf-8') for path in self._source_numbers]
+        path_offsets = np.cumsum([0] + [len(path) for path in paths], dtype=np.int64)
+        
+        index_path = lookup_index_path(output_path)
+        temp_path = f"{index_path}.tmp"
+        with open(temp_path, 'wb') as file:
+            file.write(_HEADER.pack(_MAGIC, len(keyed), kind, os.path.getsize(output_path), len(paths)))
+            for values in (keys[keyed], positions[keyed], sources[keyed], path_offsets):
+                file.write(values.astype('<i8').tobytes())
+            file.write(b''.join(paths))
+        os.replace(temp_path, index_path)
+        logger.info(f"Lookup index of {len(keyed)} hotels saved to: {index_path}")
+        return index_path
+
+
+def lookup(index_path: str, giata_id: Any) -> List[Dict[str, Any]]:
+    """
+    Find the rows of a giataId through a lookup index.
+    
+    Args:
+        index_path: Lookup index written next to an output file
+        giata_id: giataId to find
+        
+    Returns:
+        One entry per matching row, with the giataId, the source path (None
+        if unknown) and the output row
+        
+    Raises:
+        ValueError: If the file is not a lookup index or its output changed since
+    """
+    import numpy as np
+    
+    output_path = index_path[:-len('.idx')]
+    key = giata_id_key(giata_id)
+    if key is None:
+        return []
+    
+    with open(index_path, 'rb') as file, mmap.mmap(file.fileno(), 0, access=mmap.ACCESS_READ) as view:
+        if len(view) < _HEADER.size:
+            raise ValueError(f"Not a lookup index: {index_path}")
+        magic, count, kind, output_size, source_count = _HEADER.unpack_from(view)
+        if magic != _MAGIC:
+            raise ValueError(f"Not a lookup index: {index_path}")
+        if not os.path.exists(output_path) or os.path.getsize(output_path) != output_size:
+            raise ValueError(f"Output changed since the lookup index was written: {output_path}")
+        kind = kind.rstrip(b'\0')
+        
+        # Binary search over the memory-mapped keys; only the pages it visits are read
+        keys = np.frombuffer(view, dtype='<i8', count=count, offset=_HEADER.size)
+        first = int(np.searchsorted(keys, key, side='left'))
+        last = int(np.searchsorted(keys, key, side='right'))
+        del keys
+        
+        positions = struct.unpack_from(f'<{last - first}q', view, _HEADER.size + (count + first) * 8)
+        source_numbers = struct.unpack_from(f'<{last - first}q', view, _HEADER.size + (2 * count + first) * 8)
+        offsets_start = _HEADER.size + 3 * count * 8
+        paths_start = offsets_start + (source_count + 1) * 8
+        sources = []
+        for source_number in source_numbers:
+            if source_number < 0:
+                sources.append(None)
+                continue
+            start, end = struct.unpack_from('<2q', view, offsets_start + source_number * 8)
+            sources.append(view[paths_start + start:paths_start + end].decode('utf-8'))
+    
+    return [
+        {'giataId': giata_id, 'source': source, 'row': _read_row(output_path, kind, position, giata_id)}
+        for position, source in zip(positions, sources)
+    ]
+
+
+def find_lookup_indexes(output_dir: str, stem: str) -> List[str]:
+    """
+    Find the lookup indexes of a corpus' outputs, including those of shards.
+    
+    Args:
+        output_dir: Output directory
+        stem: Output stem of the whole corpus, e.g. 'extracted_hotels'
+        
+    Returns:
+        Index paths, sorted by name
+    """
+    if not os.path.isdir(output_dir):
+        return []
+    return [
+        os.path.join(output_dir, name) for name in sorted(os.listdir(output_dir))
+        if name.startswith(stem) and name.endswith('.idx')
+    ]
+
+
+def _row_positions(
+    output_path: str,
+    expected_rows: int,
+    row_offsets: Optional[array] = None,
+    row_count: Optional[int] = None
+):
+    """Locate the rows of an output file, returning (position kind, positions) or (kind, None) on a mismatch."""
+    import numpy as np
+    
+    name = output_path.lower()
+    if name.endswith('.sqlite'):
+        # Upserts may have merged rows; lookups query the table by giataId
+        return NO_POSITIONS, np.full(expected_rows, -1, dtype=np.int64)
+    if name.endswith('.csv'):
+        if row_offsets is not None:
+            positions = np.array(row_offsets, dtype=np.int64)
+        else:
+            positions = _csv_row_offsets(output_path)
+        kind = BYTE_OFFSETS
+    else:
+        if row_count is None:
+            row_count = sum(1 for _ in iter_output_records(output_path))
+        positions = np.arange(row_count, dtype=np.int64)
+        kind = ROW_NUMBERS
+    return kind, positions if len(positions) == expected_rows else None
+
+
+def _csv_row_offsets(file_path: str):
+    """
+    Find the byte offset of every data row of an uncompressed CSV file.
+    
+    Only needed for outputs written without offset tracking, e.g. by pandas.
+    A newline ends a row unless it is inside a quoted field. Doubled quotes
+    inside a field flip the quote state twice, so counting quotes is enough.
+    """
+    import numpy as np
+    
+    size = os.path.getsize(file_path)
+    if not size:
+        return np.empty(0, dtype=np.int64)
+    
+    row_ends = []
+    in_quotes = 0
+    with open(file_path, 'rb') as file, mmap.mmap(file.fileno(), 0, access=mmap.ACCESS_READ) as view:
+        data = np.frombuffer(view, dtype=np.uint8)
+        for start in range(0, size, _SCAN_BYTES):
+            chunk = data[start:start + _SCAN_BYTES]
+            quoted = (np.cumsum(chunk == ord('"'), dtype=np.int64) + in_quotes) & 1
+            row_ends.append(np.flatnonzero((chunk == ord('\n')) & (quoted == 0)) + start + 1)
+            in_quotes = int(quoted[-1])
+        del data, chunk
+    
+    starts = np.concatenate(row_ends)
+    # The first row is the header; the last newline ends the file
+    return starts[:-1] if len(starts) and starts[-1] == size else starts
+
+
+def _read_row_number(output_path: str, position: int) -> Optional[Dict[str, Any]]:
+    """Read one row of an output file by number, decoding only the row group or batch holding it."""
+    name = output_path.lower()
+    if name.endswith('.parquet'):
+        import pyarrow.parquet as pq
+        parquet = pq.ParquetFile(output_path)
+        for group in range(parquet.num_row_groups):
+            rows = parquet.metadata.row_group(group).num_rows
+            if position < rows:
+                return parquet.read_row_group(group).slice(position, 1).to_pylist()[0]
+            position -= rows
+        return None
+    
+    if name.endswith('.feather'):
+        import pyarrow.ipc as ipc
+        with ipc.open_file(output_path) as reader:
+            for index in range(reader.num_record_batches):
+                batch = reader.get_batch(index)
+                if position < batch.num_rows:
+                    return batch.slice(position, 1).to_pylist()[0]
+                position -= batch.num_rows
+        return None
+    
+    # Compressed CSV cannot be seeked into
+    return next(islice(iter_output_records(output_path), position, None), None)
+
+
+def _read_row(output_path: str, kind: bytes, position: int, giata_id: Any) -> Optional[Dict[str, Any]]:
+    """Read one row of an output file at a position from the index."""
+    if kind == BYTE_OFFSETS:
+        header = read_output_columns(output_path)
+        with open(output_path, 'rb') as file:
+            file.seek(position)
+            text = io.TextIOWrapper(file, encoding=config.get_output_encoding(), newline='')
+            row = next(csv.reader(text), None)
+        return dict(zip(header, row)) if row is not None else None
+    
+    if kind == ROW_NUMBERS:
+        return _read_row_number(output_path, position)
+    
+    import sqlite3
+    from contextlib import closing
+    with closing(sqlite3.connect(output_path)) as connection:
+        connection.row_factory = sqlite3.Row
+        table = connection.execute("SELECT name FROM sqlite_master WHERE type = 'table'").fetchone()[0]
+        quoted = '"' + table.replace('"', '""') + '"'
+        value = int(giata_id) if str(giata_id).lstrip('-').isdigit() else giata_id
+        row = connection.execute(f'SELECT * FROM {quoted} WHERE "giataId" = ?', (value,)).fetchone()
+    return dict(row) if row is not None else None
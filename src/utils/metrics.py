@@ -0,0 +1,163 @@
+"""
+Run metrics for the hotel data extraction tool.
+
+Instrumented code asks for the active collector with ``get_run_metrics()`` and
+does nothing when it returns None, so the hooks cost a single global lookup
+when metrics are disabled.
+"""
+
+import json
+import math
+import os
+import time
+from array import array
+from collections import defaultdict
+from pathlib import Path
+from typing import Any, Dict, List, Optional
+
+from .logger import get_logger
+
+logger = get_logger(__name__)
+
+_active: Optional["RunMetrics"] = None
+
+
+class RunMetrics:
+    """
+    Aggregate per-stage timings, counters and per-file latencies for one run.
+    """
+    
+    def __init__(self):
+        """Initialize an empty collector."""
+        self.started_at = time.time()
+        self._start = time.perf_counter()
+        self.stage_seconds: Dict[str, float] = defaultdict(float)
+        self.counters: Dict[str, int] = defaultdict(int)
+        self.file_latencies = array('d')
+    
+    def add_time(self, stage: str, seconds: float) -> None:
+        """
+        Add time spent in a stage.
+        
+        Args:
+            stage: Stage name (e.g. 'read', 'parse', 'extract', 'write')
+            seconds: Elapsed wall-clock seconds
+        """
+        self.stage_seconds[stage] += seconds
+    
+    def count(self, name: str, amount: int = 1) -> None:
+        """
+        Increment a counter.
+        
+        Args:
+            name: Counter name (e.g. 'bytes_read', 'records', 'failures')
+            amount: Increment
+        """
+        self.counters[name] += amount
+    
+    def record_file(self, seconds: float) -> None:
+        """
+        Record the end-to-end latency of one input file.
+        
+        Args:
+            seconds: Time from opening the file to having its record
+        """
+        self.file_latencies.append(seconds)
+    
+    def snapshot(self) -> Dict[str, Any]:
+        """Return raw state for merging into another collector."""
+        return {
+            'stage_seconds': dict(self.stage_seconds),
+            'counters': dict(self.counters),
+            'file_latencies': self.file_latencies.tobytes()
+        }
+    
+    def merge(self, snapshot: Dict[str, Any]) -> None:
+        """
+        Merge the raw state of another collector (e.g. from a worker process).
+        
+        Args:
+            snapshot: Result of RunMetrics.snapshot()
+        """
+        for stage, seconds in snapshot['stage_seconds'].items():
+            self.stage_seconds[stage] += seconds
+        for name, amount in snapshot['counters'].items():
+            self.counters[name] += amount
+        self.file_latencies.frombytes(snapshot['file_latencies'])
+    
+    def summary(self) -> Dict[str, Any]:
+        """
+        Summarize the run.
+        
+        Returns:
+            Wall time, per-stage seconds, counters, throughput and
+            p50/p95/p99 per-file latencies in milliseconds
+        """
+        wall_seconds = time.perf_counter() - self._start
+        latencies = sorted(self.file_latencies)
+        files = len(latencies)
+        
+        return {
+            'started_at': self.started_at,
+            'wall_seconds': round(wall_seconds, 6),
+            'stages': {stage: round(seconds, 6) for stage, seconds in sorted(self.stage_seconds.items())},
+            'counters': dict(sorted(self.counters.items())),
+            'files_per_sec': round(files / wall_seconds, 2) if wall_seconds else 0.0,
+            'mb_per_sec': round(self.counters.get('bytes_read', 0) / wall_seconds / 1024 / 1024, 2)
+            if wall_seconds else 0.0,
+            'file_latency_ms': {
+                'count': files,
+                'p50': _percentile(latencies, 50),
+                'p95': _percentile(latencies, 95),
+                'p99': _percentile(latencies, 99),
+                'max': round(latencies[-1] * 1000, 3) if latencies else None
+            }
+        }
+    
+    def save(self, file_path: str) -> Dict[str, Any]:
+        """
+        Write the run summary as JSON.
+        
+        Args:
+            file_path: Path to the metrics file
+            
+        Returns:
+            The written summary
+        """
+        summary = self.summary()
+        Path(os.path.dirname(file_path) or '.').mkdir(parents=True, exist_ok=True)
+        with open(file_path, 'w', encoding='utf-8') as file:
+            json.dump(summary, file, indent=2)
+        logger.info(f"Run metrics saved to: {file_path}")
+        return summary
+
+
+def _percentile(sorted_values: List[float], percent: float) -> Optional[float]:
+    """Nearest-rank percentile of sorted seconds, in milliseconds."""
+    if not sorted_values:
+        return None
+    rank = max(1, math.ceil(percent / 100 * len(sorted_values)))
+    return round(sorted_values[rank - 1] * 1000, 3)
+
+
+def get_run_metrics() -> Optional[RunMetrics]:
+    """Get the active metrics collector, or None if metrics are disabled."""
+    return _active
+
+
+def enable_run_metrics() -> RunMetrics:
+    """
+    Start collecting metrics in this process.
+    
+    Returns:
+        The new active collector
+    """
+    global _active
+    _active = RunMetrics()
+    return _active
+
+
+def disable_run_metrics() -> None:
+    """Stop collecting metrics in this process."""
+    global _active
+    _active = None
@@ -0,0 +1,225 @@
+"""
+Sharding of the input across machines for the hotel data extraction tool.
+
+With ``--shard i/N`` input discovery keeps only the files of shard i (see
+``utils.discovery.shard_of``), so N independent invocations on different
+machines cover the corpus with no overlap. Each writes its own
+``extracted_hotels_shard-i-of-N`` output, and ``--merge-shards`` combines them
+into the final output. Deduplication of a shard only sees its own files, so
+with ``output.dedup`` set the merge deduplicates across shards again.
+"""
+
+import os
+import re
+from array import array
+from typing import Any, Callable, Dict, List, Optional, Sequence, Set
+
+from extractors.dedup import SCORED_PRECEDENCES, GiataIdIndex, giata_id_key, read_dedup_scores
+from .logger import get_logger
+from .writers import child_table_path, iter_output_records, open_writer, output_filename, read_output_columns
+
+logger = get_logger(__name__)
+
+# Key of rows without a giataId while shards are deduplicated
+_NO_KEY = -(2 ** 63)
+
+
+def shard_stem(stem: str, index: int, count: int) -> str:
+    """
+    Build the output file stem of one shard.
+    
+    Args:
+        stem: Output stem of the whole corpus, e.g. 'extracted_hotels'
+        index: Shard index from 1 to count
+        count: Number of shards
+        
+    Returns:
+        Stem such as 'extracted_hotels_shard-2-of-8'
+    """
+    return f"{stem}_shard-{index}-of-{count}"
+
+
+def find_shard_outputs(output_dir: str, stem: str) -> List[str]:
+    """
+    Find the complete set of shard outputs of a corpus.
+    
+    Args:
+        output_dir: Directory holding the shard outputs
+        stem: Output stem of the whole corpus
+        
+    Returns:
+        Shard output paths ordered by shard index
+        
+    Raises:
+        ValueError: If there are no shard outputs, outputs of different shard
+            counts, or missing shards
+    """
+    extension = output_filename('')
+    pattern = re.compile(rf"{re.escape(stem)}_shard-(\d+)-of-(\d+){re.escape(extension)}")
+    shards: Dict[int, Dict[int, str]] = {}
+    for name in os.listdir(output_dir) if os.path.isdir(output_dir) else []:
+        match = pattern.fullmatch(name)
+        if match:
+            index, count = int(match.group(1)), int(match.group(2))
+            shards.setdefault(count, {})[index] = os.path.join(output_dir, name)
+    
+    if not shards:
+        raise ValueError(f"No {stem} shard outputs found in {output_dir}")
+    if len(shards) > 1:
+        raise ValueError(f"Shard outputs for different shard counts found in {output_dir}: {sorted(shards)}")
+    
+    count, paths = next(iter(shards.items()))
+    missing = [index for index in range(1, count + 1) if index not in paths]
+    if missing:
+        raise ValueError(f"Missing outputs of shards {missing} of {count} in {output_dir}")
+    return [paths[index] for index in range(1, count + 1)]
+
+
+def merge_outputs(
+    input_paths: Sequence[str],
+    output_path: str,
+    leading_columns: Optional[Sequence[str]] = None,
+    key: Optional[str] = None,
+    keep_row: Optional[Callable[[int, int, Dict[str, Any]], bool]] = None
+) -> int:
+    """
+    Concatenate output files into one, in the order given.
+    
+    Records are streamed through, so memory stays bounded by one chunk.
+    Columns are the union of the inputs' columns in first-seen order, with
+    leading_columns (those present) moved to the front.
+    
+    Args:
+        input_paths: Files written by the writers of the configured format
+        output_path: Merged output file path
+        leading_columns: Columns to put first, e.g. the extractor's df_keys
+        key: Column identifying a row, upserted on by SQLite output
+        keep_row: Called with the input's index, the row number in that input
+            and the record; rows it returns False for are left out
+            
+    Returns:
+        Number of records written
+    """
+    columns = list(dict.fromkeys(
+        column for input_path in input_paths for column in read_output_columns(input_path)
+    ))
+    if leading_columns:
+        leading = [column for column in leading_columns if column in columns]
+        columns = leading + [column for column in columns if column not in leading]
+    
+    with open_writer(output_path, columns, key=key) as writer:
+        for input_number, input_path in enumerate(input_paths):
+            for row_number, record in enumerate(iter_output_records(input_path)):
+                if keep_row is None or keep_row(input_number, row_number, record):
+                    writer.write(record)
+    return writer.rows_written
+
+
+def merge_shard_outputs(
+    output_dir: str,
+    stem: str,
+    leading_columns: Optional[Sequence[str]] = None,
+    tables: Sequence[str] = (),
+    dedup_by: Optional[str] = None
+) -> int:
+    """
+    Merge the outputs of all shards into the final output.
+    
+    Rows are written shard by shard, in shard index order, so the merged
+    output is the same whichever order the shards finished in. Child tables
+    of relational extraction are merged the same way.
+    
+    With dedup_by set, a giataId found in several shards keeps one row, chosen
+    by the same GiataIdIndex precedence as within a shard; ``first`` and
+    ``last`` follow the merged order. The shard outputs are then read twice,
+    and child rows of a dropped hotel row are dropped with it.
+    
+    Args:
+        output_dir: Directory holding the shard outputs
+        stem: Output stem of the whole corpus
+        leading_columns: Columns to put first in the main table
+        tables: Child tables to merge too
+        dedup_by: Dedup precedence (see extractors.dedup.PRECEDENCES), or None
+        
+    Returns:
+        Number of records in the merged main table
+        
+    Raises:
+        ValueError: If the shard outputs are incomplete, or deduplicating by
+            mtime or images_lastUpdate and a shard output has no scores for it
+    """
+    shard_paths = find_shard_outputs(output_dir, stem)
+    output_path = os.path.join(output_dir, output_filename(stem))
+    logger.info(f"Merging {len(shard_paths)} shard outputs into {output_path}")
+    
+    keep_row = keep_child_row = None
+    if dedup_by:
+        keep_row, keep_child_row = _shard_dedup_filters(shard_paths, dedup_by)
+    
+    rows = merge_outputs(shard_paths, output_path, leading_columns, key='giataId', keep_row=keep_row)
+    for table in tables:
+        table_paths = [child_table_path(path, table) for path in shard_paths]
+        shard_numbers = [number for number, path in enumerate(table_paths) if os.path.exists(path)]
+        if shard_numbers:
+            keep_table_row = None
+            if keep_child_row is not None:
+                keep_table_row = lambda number, row_number, record: keep_child_row(
+                    shard_numbers[number], record
+                )
+            merge_outputs(
+                [table_paths[number] for number in shard_numbers],
+                child_table_path(output_path, table),
+                keep_row=keep_table_row
+            )
+    return rows
+
+
+def _shard_dedup_filters(shard_paths: Sequence[str], dedup_by: str):
+    """
+    Choose one row per giataId across shard outputs.
+    
+    Returns:
+        (keep_row, keep_child_row): a merge_outputs filter for the main table,
+        and a (shard number, record) filter for child tables
+    """
+    import numpy as np
+    
+    index = GiataIdIndex(dedup_by)
+    keys = array('q')
+    shard_starts = []
+    for shard_path in shard_paths:
+        shard_starts.append(len(index))
+        scored = dedup_by in SCORED_PRECEDENCES
+        scores = read_dedup_scores(shard_path, dedup_by) if scored else None
+        for row_number, record in enumerate(iter_output_records(shard_path)):
+            giata_id = giata_id_key(record.get('giataId'))
+            keys.append(giata_id if giata_id is not None else _NO_KEY)
+            if scored:
+                if scores is None or row_number >= len(scores):
+                    raise ValueError(
+                        f"{shard_path} has no {dedup_by} scores to deduplicate by; "
+                        f"rerun the shard with --dedup {dedup_by}"
+                    )
+                index.add(record, scores[row_number])
+            else:
+                index.add(record)
+    keep = index.keep_mask()
+    
+    # Per shard, the giataIds whose winning row is in another shard; usually few
+    keys = np.frombuffer(keys, dtype=np.int64) if keys else np.empty(0, dtype=np.int64)
+    shards = np.searchsorted(np.array(shard_starts), np.arange(len(keys)), side='right') - 1
+    dropped: List[Set[int]] = [set() for _ in shard_paths]
+    for position in np.flatnonzero(~keep):
+        if keys[position] != _NO_KEY:
+            dropped[shards[position]].add(int(keys[position]))
+    # A shard whose own row won keeps its child rows
+    for position in np.flatnonzero(keep & np.isin(keys, keys[~keep])):
+        dropped[shards[position]].discard(int(keys[position]))
+    
+    def keep_row(shard_number: int, row_number: int, record: Dict[str, Any]) -> bool:
+        return bool(keep[shard_starts[shard_number] + row_number])
+    
+    def keep_child_row(shard_number: int, record: Dict[str, Any]) -> bool:
+        return giata_id_key(record.get('giataId')) not in dropped[shard_number]
+    
+    return keep_row, keep_child_row
@@ -0,0 +1,436 @@
+"""
+Input sources for the hotel data extraction tool.
+
+Besides plain ``.json`` files, hotel documents can be read from individually
+gzipped ``.json.gz`` files, from ``.zip`` / ``.tar`` (optionally gzip, bz2
+or xz compressed) bundles, from JSON Lines (``.jsonl`` / ``.ndjson``)
+exports with one hotel per line and from files holding one top-level JSON
+array of hotels. Archive members are streamed straight into the decoder
+without being unpacked to disk; JSON Lines files are memory-mapped and split
+into byte ranges on line boundaries; JSON arrays are scanned incrementally so
+only one hotel at a time is held in memory.
+"""
+
+import gzip
+import mmap
+import os
+import re
+import tarfile
+import time
+import zipfile
+from typing import Iterator, Optional, Tuple
+
+from .metrics import get_run_metrics
+
+ARCHIVE_SUFFIXES = ('.zip', '.tar', '.tar.gz', '.tgz', '.tar.bz2', '.tbz2', '.tar.xz', '.txz')
+GZIP_JSON_SUFFIX = '.json.gz'
+NDJSON_SUFFIXES = ('.jsonl', '.ndjson')
+
+# Bytes read at a time when scanning a JSON array
+ARRAY_READ_SIZE = 1024 * 1024
+
+# A complete JSON string, and runs of bytes up to the next bracket (or, at the
+# top level of an array item, the next comma) that skip over whole strings
+_STRING = rb'"[^"\\]*(?:\\.[^"\\]*)*"'
+_SKIP_NESTED = re.compile(rb'[^"\[\]{}]*(?:' + _STRING + rb'[^"\[\]{}]*)*', re.DOTALL)
+_SKIP_TOP = re.compile(rb'[^"\[\]{},]*(?:' + _STRING + rb'[^"\[\]{},]*)*', re.DOTALL)
+_WHITESPACE = re.compile(rb'[ \t\r\n]*')
+_RECORD_NAME = re.compile(r':(\d+)|\[(\d+)\]')
+
+
+def is_archive(file_path: str) -> bool:
+    """
+    Check if a path is a zip or tar bundle.
+    
+    Args:
+        file_path: Path to the file
+        
+    Returns:
+        True if the file is an archive of hotel documents
+    """
+    return file_path.lower().endswith(ARCHIVE_SUFFIXES)
+
+
+def is_gzip_json(file_path: str) -> bool:
+    """
+    Check if a path is an individually gzipped JSON file.
+    
+    Args:
+        file_path: Path to the file
+        
+    Returns:
+        True if the file ends with .json.gz
+    """
+    return file_path.lower().endswith(GZIP_JSON_SUFFIX)
+
+
+def is_ndjson(file_path: str) -> bool:
+    """
+    Check if a path is a JSON Lines file.
+    
+    Args:
+        file_path: Path to the file
+        
+    Returns:
+        True if the file ends with .jsonl or .ndjson
+    """
+    return file_path.lower().endswith(NDJSON_SUFFIXES)
+
+
+def is_multi_document(file_path: str) -> bool:
+    """
+    Check if a path holds more than one hotel document.
+    
+    Args:
+        file_path: Path to the file
+        
+    Returns:
+        True for archives and JSON Lines files
+    """
+    return is_archive(file_path) or is_ndjson(file_path)
+
+
+def is_json_member(name: str) -> bool:
+    """Check if an archive member (or file name) holds a hotel document."""
+    lower = name.lower()
+    return lower.endswith('.json') or lower.endswith(GZIP_JSON_SUFFIX)
+
+
+def source_file_id(name: str) -> str:
+    """
+    Get the fileId for a document, dropping a trailing .gz.
+    
+    Args:
+        name: File or member name
+        
+    Returns:
+        Identifier comparable with the unpacked file name
+    """
+    return name[:-3] if is_gzip_json(name) else name
+
+
+def iter_archive_members(archive_path: str) -> Iterator[Tuple[str, bytes]]:
+    """
+    Stream the JSON documents stored in an archive.
+    
+    Zip files are read member by member; tar files are read in streaming mode
+    so compressed bundles are decompressed in a single sequential pass.
+    Gzipped ``.json.gz`` members are yielded as stored and are decompressed
+    by the extraction stage.
+    
+    Args:
+        archive_path: Path to the .zip or .tar[.gz|.bz2|.xz] file
+        
+    Yields:
+        Tuples of (member name, member bytes)
+    """
+    metrics = get_run_metrics()
+    
+    if archive_path.lower().endswith('.zip'):
+        with zipfile.ZipFile(archive_path) as archive:
+            for info in archive.infolist():
+                if info.is_dir() or not is_json_member(info.filename):
+                    continue
+                start = time.perf_counter()
+                data = archive.read(info)
+                _record_read(metrics, start, data)
+                yield info.filename, data
+        return
+    
+    with tarfile.open(archive_path, mode='r|*') as archive:
+        for member in archive:
+            if not member.isfile() or not is_json_member(member.name):
+                continue
+            start = time.perf_counter()
+            data = archive.extractfile(member).read()
+            _record_read(metrics, start, data)
+            yield member.name, data
+
+
+def _record_read(metrics, start: float, data: bytes) -> None:
+    """Report the time and size of one member read."""
+    if metrics is not None:
+        metrics.add_time('read', time.perf_counter() - start)
+        metrics.count('bytes_read', len(data))
+
+
+def decompress_member(name: str, data: bytes) -> bytes:
+    """
+    Decompress a member or file if it is gzipped JSON.
+    
+    Args:
+        name: File or member name
+        data: Stored bytes
+        
+    Returns:
+        Raw JSON document
+    """
+    if is_gzip_json(name):
+        return gzip.decompress(data)
+    return data
+
+
+def ndjson_record_name(file_path: str, line: int) -> str:
+    """
+    Get the fileId of one JSON Lines record.
+    
+    Args:
+        file_path: Path to the JSON Lines file
+        line: 1-based line number
+        
+    Returns:
+        ``<file name>:<line>``
+    """
+    return f"{os.path.basename(file_path)}:{line}"
+
+
+def iter_line_ranges(file_path: str, range_size: int) -> Iterator[Tuple[int, int]]:
+    """
+    Split a JSON Lines file into byte ranges that end on line boundaries.
+    
+    Ranges are cut lazily: each boundary is found by jumping ``range_size``
+    bytes ahead and looking for the next newline, so only the pages around
+    the boundaries are read. Each range can be decoded independently (e.g.
+    by a worker process) with iter_ndjson_lines; the lines before a range
+    are not counted here.
+    
+    Args:
+        file_path: Path to the JSON Lines file
+        range_size: Approximate number of bytes per range
+        
+    Yields:
+        (start offset, end offset) per range
+    """
+    size = os.path.getsize(file_path)
+    if size == 0:
+        return
+    
+    range_size = max(1, range_size)
+    with open(file_path, 'rb') as file, mmap.mmap(file.fileno(), 0, access=mmap.ACCESS_READ) as view:
+        start = 0
+        while start < size:
+            end = start + range_size
+            if end >= size:
+                end = size
+            else:
+                newline = view.find(b'\n', end - 1)
+                end = size if newline == -1 else newline + 1
+            yield start, end
+            start = end
+
+
+def iter_ndjson_lines(
+    file_path: str,
+    start: int = 0,
+    end: Optional[int] = None,
+    first_line: int = 1,
+    include_blank: bool = False
+) -> Iterator[Tuple[int, bytes]]:
+    """
+    Stream the records of a JSON Lines file, or of one range of it.
+    
+    The file is memory-mapped and only one line at a time is copied out.
+    Blank lines are skipped but still counted.
+    
+    Args:
+        file_path: Path to the JSON Lines file
+        start: Offset of the first byte of the range
+        end: Offset just past the range (defaults to the end of the file)
+        first_line: Number of the line starting at ``start``
+        include_blank: Also yield blank lines, e.g. to count every line of a range
+        
+    Yields:
+        Tuples of (line number, line bytes)
+    """
+    if os.path.getsize(file_path) == 0:
+        return
+    
+    with open(file_path, 'rb') as file, mmap.mmap(file.fileno(), 0, access=mmap.ACCESS_READ) as view:
+        if end is None:
+            end = len(view)
+        position, line = start, first_line
+        while position < end:
+            newline = view.find(b'\n', position, end)
+            stop = end if newline == -1 else newline
+            data = view[position:stop] if stop > position else b''
+            if include_blank or (data and not data.isspace()):
+                yield line, data
+            position = stop + 1
+            line += 1
+    
+    metrics = get_run_metrics()
+    if metrics is not None:
+        metrics.count('bytes_read', end - start)
+
+
+def array_item_name(file_path: str, index: int) -> str:
+    """
+    Get the fileId of one item of a JSON array file.
+    
+    Args:
+        file_path: Path to the JSON file
+        index: 0-based position in the top-level array
+        
+    Returns:
+        ``<file name>[<index>]``
+    """
+    return f"{os.path.basename(file_path)}[{index}]"
+
+
+def is_json_array(file_path: str) -> bool:
+    """
+    Check if a JSON file holds a top-level array, by peeking at its first byte.
+    
+    Args:
+        file_path: Path to the .json or .json.gz file
+        
+    Returns:
+        True if the document starts with '['
+    """
+    if not (file_path.endswith('.json') or is_gzip_json(file_path)):
+        return False
+    opener = gzip.open if is_gzip_json(file_path) else open
+    try:
+        with opener(file_path, 'rb') as file:
+            head = file.read(64).lstrip(b'\xef\xbb\xbf \t\r\n')
+    except OSError:
+        return False
+    return head.startswith(b'[')
+
+
+def iter_json_array(file_path: str, read_size: int = ARRAY_READ_SIZE) -> Iterator[Tuple[int, bytes]]:
+    """
+    Stream the items of a file holding one top-level JSON array.
+    
+    The file is read in chunks and scanned for item boundaries, skipping over
+    strings; only the raw bytes of each item are handed out, so memory is
+    bounded by the largest single item rather than the file size. Items are
+    not validated here: a malformed item fails when it is decoded, while a
+    file whose brackets or strings do not close raises ValueError.
+    
+    Args:
+        file_path: Path to the .json or .json.gz file
+        read_size: Bytes read at a time
+        
+    Yields:
+        Tuples of (0-based item index, item bytes)
+        
+    Raises:
+        ValueError: If the file is not a well-formed top-level array
+    """
+    opener = gzip.open if is_gzip_json(file_path) else open
+    with opener(file_path, 'rb') as file:
+        yield from _ArrayScanner(file, read_size).items()
+
+
+class _ArrayScanner:
+    """
+    Find the items of a top-level JSON array in a chunked byte stream.
+    """
+    
+    def __init__(self, file, read_size: int):
+        self.file = file
+        self.read_size = max(1, read_size)
+        self.buffer = bytearray()
+        self.pos = 0
+        self.metrics = get_run_metrics()
+    
+    def fill(self, keep: int) -> bool:
+        """Drop the bytes before ``keep`` and read another chunk; False at end of file."""
+        if keep:
+            del self.buffer[:keep]
+            self.pos -= keep
+        start = time.perf_counter()
+        chunk = self.file.read(self.read_size)
+        _record_read(self.metrics, start, chunk)
+        self.buffer += chunk
+        return bool(chunk)
+    
+    def skip_whitespace(self) -> bool:
+        """Move to the next significant byte; False at end of file."""
+        while True:
+            self.pos = _WHITESPACE.match(self.buffer, self.pos).end()
+            if self.pos < len(self.buffer):
+                return True
+            if not self.fill(self.pos):
+                return False
+    
+    def items(self) -> Iterator[Tuple[int, bytes]]:
+        """Yield (index, bytes) for every item of the array."""
+        if self.skip_whitespace() and self.buffer[self.pos] == 0xEF:
+            while len(self.buffer) < self.pos + 3 and self.fill(0):
+                pass
+            if self.buffer.startswith(b'\xef\xbb\xbf', self.pos):
+                self.pos += 3
+        if not self.skip_whitespace() or self.buffer[self.pos] != ord('['):
+            raise ValueError("File does not contain a top-level JSON array")
+        self.pos += 1
+        
+        index = 0
+        while True:
+            if not self.skip_whitespace():
+                raise ValueError("Unexpected end of file inside the top-level JSON array")
+            byte = self.buffer[self.pos]
+            if byte == ord(']'):
+                return
+            if byte == ord(','):
+                self.pos += 1
+                continue
+            
+            start = self.item_end()
+            yield index, bytes(self.buffer[start:self.pos])
+            index += 1
+    
+    def item_end(self) -> int:
+        """Advance past the item starting at pos and return its (shifted) start."""
+        start = self.pos
+        depth = 0
+        while True:
+            skip = _SKIP_NESTED if depth else _SKIP_TOP
+            self.pos = skip.match(self.buffer, self.pos).end()
+            
+            # A run or string cut off by the end of the buffer: read more
+            if self.pos >= len(self.buffer) or self.buffer[self.pos] == ord('"'):
+                if not self.fill(start):
+                    raise ValueError("Unexpected end of file inside the top-level JSON array")
+                start = 0
+                continue
+            
+            byte = self.buffer[self.pos]
+            if byte in b'[{':
+                depth += 1
+                self.pos += 1
+            elif byte in b']}':
+                if depth == 0:
+                    return start
+                depth -= 1
+                self.pos += 1
+                if depth == 0:
+                    return start
+            else:
+                return start
+
+
+def member_quarantine_path(failed_dir: str, archive_path: str, member_name: str) -> str:
+    """
+    Get where a failed archive member is written for inspection.
+    
+    JSON Lines records (named ``<file name>:<line>``) and JSON array items
+    (named ``<file name>[<index>]``) are written as ``<line>.json`` and
+    ``<index>.json``.
+    
+    Args:
+        failed_dir: Failed files directory
+        archive_path: Path to the archive the member came from
+        member_name: Member name inside the archive
+        
+    Returns:
+        Path under failed_dir/<archive name>/
+    """
+    base_name = os.path.basename(archive_path)
+    record = _RECORD_NAME.fullmatch(member_name[len(base_name):]) if member_name.startswith(base_name) else None
+    if record:
+        member_name = (record.group(1) or record.group(2)) + '.json'
+    parts = [part for part in source_file_id(member_name).replace('\\', '/').split('/')
+             if part not in ('', '.', '..')]
+    return os.path.join(failed_dir, os.path.basename(archive_path), *parts)
@@ -0,0 +1,919 @@
+"""
+Output writers for the hotel data extraction tool.
+
+Writers are selected by ``output.format`` and share one chunked interface, so
+the same extraction loop can produce CSV, Parquet, Feather or SQLite output
+either in one go or streamed in ``performance.chunk_size`` pieces.
+
+CSV and SQLite rows are serialized straight from the extracted records,
+without pandas; the columnar formats go through a typed DataFrame per chunk.
+"""
+
+import bz2
+import csv
+import gzip
+import json
+import lzma
+import math
+import numbers
+import os
+import struct
+import sys
+import time
+from array import array
+from contextlib import closing
+from functools import lru_cache
+from typing import TYPE_CHECKING, Any, Callable, Dict, Iterator, List, Optional, Tuple, Type
+
+from config.settings import config
+from extractors.schema import LIST_COLUMNS, column_kind
+from .file_utils import ensure_directory
+from .logger import get_logger
+from .metrics import get_run_metrics
+
+if TYPE_CHECKING:
+    import pandas as pd
+
+logger = get_logger(__name__)
+
+# Compressed text streams available to the CSV writer
+_CSV_OPENERS = {
+    'gzip': gzip.open,
+    'bz2': bz2.open,
+    'xz': lzma.open
+}
+
+# File extensions of the compressed CSV codecs
+_CSV_EXTENSIONS = {'gzip': '.gz', 'bz2': '.bz2', 'xz': '.xz'}
+
+
+class OutputWriter:
+    """
+    Base class for chunked output writers.
+    
+    Records are buffered until ``chunk_size`` of them have accumulated and are
+    then written out, so memory stays bounded by one chunk regardless of how
+    many records pass through. Subclasses implement ``_open``, ``_write_frame``
+    and ``_close``.
+    """
+    
+    format_name = ''
+    extension = ''
+    # Whether records are written without going through a DataFrame
+    serializes_records = False
+    # Whether rows can be added to an existing file
+    supports_append = True
+    # Whether a row written again with the same key replaces the stored one
+    supports_upsert = False
+    # Byte offset of every row written, when tracked (see track_offsets)
+    row_offsets: Optional[array] = None
+    
+    def __init__(
+        self,
+        file_path: str,
+        columns: List[str],
+        chunk_size: Optional[int] = None,
+        compression: Optional[str] = None,
+        append: bool = False,
+        key: Optional[str] = None,
+        track_offsets: bool = False
+    ):
+        """
+        Initialize the writer.
+        
+        Args:
+            file_path: Path to the output file
+            columns: Output columns, in order
+            chunk_size: Number of records per flush (defaults to config)
+            compression: Compression codec (defaults to config)
+            append: Add to an existing output file instead of replacing it
+            key: Column identifying a row, e.g. giataId for the hotel table;
+                outputs that support it (SQLite) upsert on it
+            track_offsets: Record the byte offset each row starts at in
+                ``row_offsets``, for formats whose rows can be seeked to
+                (uncompressed CSV); ignored by the others
+        """
+        if append and not self.supports_append:
+            raise ValueError(f"{self.format_name} output cannot be appended to; use CSV or SQLite output")
+        self.file_path = file_path
+        self.columns = list(columns)
+        self.chunk_size = max(1, chunk_size or config.get_chunk_size())
+        self.compression = compression if compression is not None else config.get_compression()
+        self.append = append
+        self.key = key if key in self.columns else None
+        self.track_offsets = track_offsets
+        self.rows_written = 0
+        
+        self._buffer: List[Dict[str, Any]] = []
+        self._is_open = False
+        self._started = False
+    
+    def __enter__(self) -> "OutputWriter":
+        self.open()
+        return self
+    
+    def __exit__(self, exc_type, exc_value, traceback) -> None:
+        self.close()
+    
+    def open(self) -> None:
+        """Create (or truncate, unless appending) the output file."""
+        ensure_directory(os.path.dirname(self.file_path))
+        self._open()
+        self._is_open = True
+        logger.debug(f"Opened {self.format_name} output: {self.file_path}")
+    
+    def write(self, record: Dict[str, Any]) -> None:
+        """
+        Buffer a record, flushing when the chunk is full.
+        
+        Args:
+            record: Flat record as produced by HotelDataExtractor
+        """
+        self._buffer.append(record)
+        if len(self._buffer) >= self.chunk_size:
+            self.flush()
+    
+    def write_frame(self, df: 'pd.DataFrame') -> None:
+        """
+        Write a whole DataFrame, bypassing the record buffer.
+        
+        Args:
+            df: DataFrame with the writer's columns
+        """
+        self.flush()
+        start = time.perf_counter()
+        self._write_frame(df.reindex(columns=self.columns))
+        self._record_write_time(start)
+        self._started = True
+        self.rows_written += len(df)
+    
+    def flush(self) -> None:
+        """Write out buffered records."""
+        if not self._is_open:
+            self.open()
+        
+        if not self._buffer and self._started:
+            return
+        
+        # Taken off the buffer first, so a chunk that fails is not written again on close
+        records, self._buffer = self._buffer, []
+        start = time.perf_counter()
+        self._write_records(records)
+        self._record_write_time(start)
+        self._started = True
+        self.rows_written += len(records)
+        logger.debug("Flushed %d records to %s", len(records), self.file_path)
+    
+    def close(self) -> None:
+        """Flush remaining records and close the output file."""
+        if not self._is_open:
+            return
+        try:
+            self.flush()
+        finally:
+            self._close()
+            self._is_open = False
+        logger.info(
+            f"Successfully saved {self.format_name} file: {self.file_path} "
+            f"({self.rows_written} rows)"
+        )
+    
+    def _record_write_time(self, start: float) -> None:
+        """Report time spent writing to the active run metrics."""
+        metrics = get_run_metrics()
+        if metrics is not None:
+            metrics.add_time('write', time.perf_counter() - start)
+    
+    def _write_records(self, records: List[Dict[str, Any]]) -> None:
+        """Write buffered records through a DataFrame typed by the output schema."""
+        import pandas as pd
+        from extractors.schema import apply_schema
+        self._write_frame(apply_schema(pd.DataFrame(records, columns=self.columns)))
+    
+    def _open(self) -> None:
+        raise NotImplementedError
+    
+    def _write_frame(self, df: 'pd.DataFrame') -> None:
+        raise NotImplementedError
+    
+    def _close(self) -> None:
+        raise NotImplementedError
+
+
+class CSVChunkWriter(OutputWriter):
+    """
+    Write records to a CSV file, with the header written once.
+    
+    Records are serialized row by row in ``columns`` order, producing the
+    same bytes as ``DataFrame.to_csv`` on the schema-typed DataFrame: missing
+    values are empty, ints are written without a fraction, floats in their
+    shortest round-trip form (single precision for ``float32`` columns) and
+    list-valued fields as their Python list repr, e.g. ``['+1', '+2']``.
+    
+    When appending to a non-empty file, rows follow that file's header
+    instead of ``columns``, so they line up with the rows already there.
+    Compressed files get a new compressed stream appended, which gzip, bz2
+    and xz readers decode as one.
+    
+    With ``track_offsets``, uncompressed rows are formatted into lines first
+    and their encoded lengths summed, so ``row_offsets`` is known without
+    reading the file back.
+    """
+    
+    format_name = 'CSV'
+    extension = '.csv'
+    serializes_records = True
+    
+    def __init__(self, *args, encoding: Optional[str] = None, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.encoding = encoding or config.get_output_encoding()
+        self._file = None
+        self._csv = None
+        self._formatters = [(column, _CSV_FORMATTERS[column_kind(column)]) for column in self.columns]
+        if self.track_offsets and not self.compression:
+            self.row_offsets = array('q')
+    
+    def _open(self) -> None:
+        if self.append and os.path.exists(self.file_path) and os.path.getsize(self.file_path):
+            header = read_output_columns(self.file_path)
+            if header != self.columns:
+                logger.warning(f"Appending to {self.file_path} with its existing columns")
+                self.columns = header
+                self._formatters = [(column, _CSV_FORMATTERS[column_kind(column)]) for column in header]
+            self._started = True
+        
+        mode = 'a' if self.append else 'w'
+        if self.compression:
+            if self.compression not in _CSV_OPENERS:
+                raise ValueError(f"Unsupported CSV compression: {self.compression}")
+            opener = _CSV_OPENERS[self.compression]
+            self._file = opener(self.file_path, mode + 't', encoding=self.encoding, newline='')
+        else:
+            self._file = open(self.file_path, mode, encoding=self.encoding, newline='')
+        # Same dialect as DataFrame.to_csv
+        self._csv = csv.writer(self._file, lineterminator=os.linesep)
+    
+    def _write_records(self, records: List[Dict[str, Any]]) -> None:
+        if not self._started:
+            self._csv.writerow(self.columns)
+        formatters = self._formatters
+        rows = [
+            [format_value(record.get(column)) for column, format_value in formatters]
+            for record in records
+        ]
+        if self.row_offsets is None:
+            self._csv.writerows(rows)
+        else:
+            self._write_tracked(rows)
+        self._file.flush()
+    
+    def _write_tracked(self, rows: List[List[str]]) -> None:
+        """Write formatted rows, recording the byte offset each row starts at."""
+        lines = _LineBuffer()
+        csv.writer(lines, lineterminator=os.linesep).writerows(rows)
+        # The header is written already, so tell() is a plain byte position
+        offset = self._file.tell()
+        offsets = self.row_offsets
+        for line in lines:
+            offsets.append(offset)
+            offset += len(line) if line.isascii() else len(line.encode(self.encoding))
+        self._file.write(''.join(lines))
+    
+    def _write_frame(self, df: 'pd.DataFrame') -> None:
+        # Rows written by pandas cannot be located without reading them back
+        self.row_offsets = None
+        df.to_csv(self._file, header=not self._started, index=False)
+        self._file.flush()
+    
+    def _close(self) -> None:
+        self._file.close()
+        self._file = None
+        self._csv = None
+
+
+class _ArrowWriter(OutputWriter):
+    """
+    Base for Arrow-backed columnar writers.
+    
+    Values are coerced to the types in ``extractors.schema`` so that every
+    chunk shares one schema and list-valued columns are stored as native
+    Arrow lists rather than their Python reprs.
+    """
+    
+    default_compression = None
+    supports_append = False
+    
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.pa = _import_pyarrow(self.format_name)
+        self.schema = arrow_schema(self.columns)
+        self._writer = None
+    
+    @property
+    def codec(self) -> Optional[str]:
+        """Compression codec passed to pyarrow."""
+        return self.compression or self.default_compression
+    
+    def _write_frame(self, df: 'pd.DataFrame') -> None:
+        arrays = [
+            self.pa.array(self._coerce_column(df[column].tolist(), column), type=self.schema.field(column).type)
+            for column in self.columns
+        ]
+        self._writer.write_table(self.pa.Table.from_arrays(arrays, schema=self.schema))
+    
+    def _coerce_column(self, values: List[Any], column: str) -> List[Any]:
+        """
+        Coerce the cells of a column to its Arrow type.
+        
+        Raises:
+            ValueError: If any cell does not fit the type; it is never written as null
+        """
+        coerced = []
+        failed = []
+        for value in values:
+            try:
+                coerced.append(_coerce(value, column))
+            except ValueError:
+                failed.append(value)
+        if failed:
+            kind = column_kind(column)
+            if kind == 'list':
+                kind = f"list of {LIST_COLUMNS[column]}"
+            raise ValueError(
+                f"{len(failed)} values of {column} do not fit its {kind} type, "
+                f"e.g. {failed[0]!r}; {self.format_name} output {self.file_path} cannot hold them "
+                f"(CSV and SQLite output keep them as they are)"
+            )
+        return coerced
+    
+    def _close(self) -> None:
+        self._writer.close()
+        self._writer = None
+
+
+class ParquetChunkWriter(_ArrowWriter):
+    """Write records to a Parquet file, one row group per chunk."""
+    
+    format_name = 'Parquet'
+    extension = '.parquet'
+    default_compression = 'snappy'
+    
+    def _open(self) -> None:
+        import pyarrow.parquet as pq
+        self._writer = pq.ParquetWriter(self.file_path, self.schema, compression=self.codec)
+
+
+class FeatherChunkWriter(_ArrowWriter):
+    """Write records to a Feather (Arrow IPC file) file, one batch per chunk."""
+    
+    format_name = 'Feather'
+    extension = '.feather'
+    default_compression = 'lz4'
+    
+    def _open(self) -> None:
+        import pyarrow.ipc as ipc
+        options = ipc.IpcWriteOptions(compression=self.codec)
+        self._writer = ipc.new_file(self.file_path, self.schema, options=options)
+
+
+class SQLiteChunkWriter(OutputWriter):
+    """
+    Write records to a table of an SQLite database.
+    
+    The database runs in WAL mode, each chunk is inserted with one
+    ``executemany`` call, and rows are committed every
+    ``output.sqlite.commit_rows`` rather than one at a time. With a ``key``
+    (giataId for the hotel table) rows are upserted, so a hotel extracted
+    again, e.g. by a later micro-batch of watch mode, replaces its row. The
+    ``output.sqlite.indexes`` (and giataId in tables not keyed by it) are
+    built once the load is complete instead of being maintained row by row.
+    
+    The table is named after the file, e.g. ``extracted_hotels`` in
+    extracted_hotels.sqlite. Flags are stored as 0/1 and lists as JSON text.
+    """
+    
+    format_name = 'SQLite'
+    extension = '.sqlite'
+    serializes_records = True
+    supports_upsert = True
+    
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.table = _sqlite_table(self.file_path)
+        self.commit_rows = max(1, config.get_sqlite_commit_rows())
+        self._connection = None
+        self._insert = ''
+        self._converters: List[Tuple[str, Callable[[Any], Any]]] = []
+        self._uncommitted = 0
+    
+    def _open(self) -> None:
+        import sqlite3
+        if not self.append:
+            for suffix in ('', '-wal', '-shm'):
+                if os.path.exists(self.file_path + suffix):
+                    os.remove(self.file_path + suffix)
+        
+        self._connection = sqlite3.connect(self.file_path)
+        self._connection.execute('PRAGMA journal_mode=WAL')
+        self._connection.execute('PRAGMA synchronous=NORMAL')
+        
+        table = _quote(self.table)
+        definitions = [f"{_quote(column)} {_SQLITE_TYPES[column_kind(column)]}" for column in self.columns]
+        self._connection.execute(f"CREATE TABLE IF NOT EXISTS {table} ({', '.join(definitions)})")
+        if self.append:
+            # A table from an earlier run may lack columns of this one
+            existing = {row[1] for row in self._connection.execute(f"PRAGMA table_info({table})")}
+            for definition, column in zip(definitions, self.columns):
+                if column not in existing:
+                    self._connection.execute(f"ALTER TABLE {table} ADD COLUMN {definition}")
+        if self.key:
+            # The one index kept up during the load: upserts look rows up by it
+            name = _quote(f"{self.table}_{self.key}_key")
+            self._connection.execute(f"CREATE UNIQUE INDEX IF NOT EXISTS {name} ON {table} ({_quote(self.key)})")
+        self._connection.commit()
+        
+        columns = ', '.join(_quote(column) for column in self.columns)
+        placeholders = ', '.join('?' * len(self.columns))
+        self._insert = f"INSERT INTO {table} ({columns}) VALUES ({placeholders})"
+        if self.key:
+            updates = ', '.join(
+                f"{_quote(column)} = excluded.{_quote(column)}" for column in self.columns if column != self.key
+            )
+            action = f"UPDATE SET {updates}" if updates else 'NOTHING'
+            self._insert += f" ON CONFLICT({_quote(self.key)}) DO {action}"
+        self._converters = [(column, _sqlite_converter(column)) for column in self.columns]
+    
+    def _write_records(self, records: List[Dict[str, Any]]) -> None:
+        converters = self._converters
+        self._execute([
+            tuple(convert(record.get(column)) for column, convert in converters)
+            for record in records
+        ])
+    
+    def _write_frame(self, df: 'pd.DataFrame') -> None:
+        converters = [convert for _, convert in self._converters]
+        self._execute([
+            tuple(convert(value) for convert, value in zip(converters, row))
+            for row in df.itertuples(index=False, name=None)
+        ])
+    
+    def _execute(self, rows: List[Tuple[Any, ...]]) -> None:
+        """Insert rows in the open transaction, committing once it holds commit_rows."""
+        if not rows:
+            return
+        self._connection.executemany(self._insert, rows)
+        self._uncommitted += len(rows)
+        if self._uncommitted >= self.commit_rows:
+            self._connection.commit()
+            self._uncommitted = 0
+    
+    def _close(self) -> None:
+        try:
+            self._connection.commit()
+            table = _quote(self.table)
+            indexes = list(config.get_sqlite_indexes())
+            if self.key != 'giataId':
+                indexes.insert(0, 'giataId')
+            for column in dict.fromkeys(indexes):
+                if column in self.columns and column != self.key:
+                    name = _quote(f"{self.table}_{column}_idx")
+                    self._connection.execute(f"CREATE INDEX IF NOT EXISTS {name} ON {table} ({_quote(column)})")
+            self._connection.commit()
+            # Fold the WAL into the database file, so it is complete on its own
+            self._connection.execute('PRAGMA wal_checkpoint(TRUNCATE)')
+        finally:
+            self._connection.close()
+            self._connection = None
+            self._uncommitted = 0
+
+
+# Writers by output.format
+WRITERS: Dict[str, Type[OutputWriter]] = {
+    'csv': CSVChunkWriter,
+    'parquet': ParquetChunkWriter,
+    'feather': FeatherChunkWriter,
+    'arrow': FeatherChunkWriter,
+    'sqlite': SQLiteChunkWriter
+}
+
+
+def get_writer_class(output_format: Optional[str] = None) -> Type[OutputWriter]:
+    """
+    Get the writer class for an output format.
+    
+    Args:
+        output_format: Output format name (defaults to config)
+        
+    Returns:
+        Writer class
+        
+    Raises:
+        ValueError: If the format is not supported
+    """
+    output_format = (output_format or config.get_output_format()).lower()
+    if output_format not in WRITERS:
+        raise ValueError(
+            f"Unsupported output format: {output_format} "
+            f"(expected one of {', '.join(sorted(WRITERS))})"
+        )
+    return WRITERS[output_format]
+
+
+def open_writer(
+    file_path: str,
+    columns: List[str],
+    output_format: Optional[str] = None,
+    **kwargs
+) -> OutputWriter:
+    """
+    Create a writer for the configured output format.
+    
+    Args:
+        file_path: Path to the output file
+        columns: Output columns, in order
+        output_format: Output format name (defaults to config)
+        **kwargs: Additional arguments for the writer
+        
+    Returns:
+        Unopened writer instance (use as a context manager)
+    """
+    return get_writer_class(output_format)(file_path, columns, **kwargs)
+
+
+def output_filename(stem: str, output_format: Optional[str] = None) -> str:
+    """
+    Build an output file name with the extension of the output format.
+    
+    Args:
+        stem: File name without extension
+        output_format: Output format name (defaults to config)
+        
+    Returns:
+        File name, e.g. 'extracted_hotels.parquet'
+    """
+    writer_class = get_writer_class(output_format)
+    extension = writer_class.extension
+    compression = config.get_compression()
+    if writer_class is CSVChunkWriter and compression in _CSV_OPENERS:
+        extension += _CSV_EXTENSIONS[compression]
+    return f"{stem}{extension}"
+
+
+def child_table_path(output_path: str, table: str) -> str:
+    """
+    Build the path of a child table written next to an output file.
+    
+    Args:
+        output_path: Path of the main output file
+        table: Child table name
+        
+    Returns:
+        Path with the table name before the extension,
+        e.g. 'extracted_hotels_rooms.csv.gz'
+    """
+    stem, extension = _split_extension(output_path)
+    return f"{stem}_{table}{extension}"
+
+
+def read_output_columns(file_path: str) -> List[str]:
+    """
+    Read the column names of an output file written by one of the writers.
+    
+    Args:
+        file_path: Path to a CSV (optionally compressed), Parquet or Feather file
+        
+    Returns:
+        Column names, in file order
+    """
+    if _output_format_of(file_path) == 'csv':
+        with _open_csv(file_path) as file:
+            return next(csv.reader(file), [])
+    if _output_format_of(file_path) == 'sqlite':
+        with closing(_connect_sqlite(file_path)) as connection:
+            table = _quote(_stored_sqlite_table(connection, file_path))
+            return [row[1] for row in connection.execute(f"PRAGMA table_info({table})")]
+    return list(_arrow_schema_of(file_path).names)
+
+
+def iter_output_records(file_path: str, batch_size: Optional[int] = None) -> Iterator[Dict[str, Any]]:
+    """
+    Read back the records of an output file, one at a time.
+    
+    CSV cells come back as the strings that were written (empty for missing
+    values), which the CSV writer writes out unchanged; Parquet, Feather and
+    SQLite cells come back as Python values (SQLite lists as their JSON text).
+    
+    Args:
+        file_path: Path to a CSV (optionally compressed), Parquet, Feather or SQLite file
+        batch_size: Rows decoded at a time from columnar files (defaults to
+            performance.chunk_size)
+            
+    Yields:
+        Records keyed by column name
+    """
+    if _output_format_of(file_path) == 'csv':
+        with _open_csv(file_path) as file:
+            yield from csv.DictReader(file)
+        return
+    
+    batch_size = max(1, batch_size or config.get_chunk_size())
+    if _output_format_of(file_path) == 'sqlite':
+        with closing(_connect_sqlite(file_path)) as connection:
+            table = _quote(_stored_sqlite_table(connection, file_path))
+            cursor = connection.execute(f"SELECT * FROM {table} ORDER BY rowid")
+            columns = [description[0] for description in cursor.description]
+            while True:
+                rows = cursor.fetchmany(batch_size)
+                if not rows:
+                    return
+                for row in rows:
+                    yield dict(zip(columns, row))
+    
+    if _output_format_of(file_path) == 'parquet':
+        import pyarrow.parquet as pq
+        for batch in pq.ParquetFile(file_path).iter_batches(batch_size=batch_size):
+            yield from batch.to_pylist()
+        return
+    
+    import pyarrow.ipc as ipc
+    with ipc.open_file(file_path) as reader:
+        for index in range(reader.num_record_batches):
+            yield from reader.get_batch(index).to_pylist()
+
+
+def _split_extension(file_path: str) -> Tuple[str, str]:
+    """Split a path into stem and extension, keeping compound CSV extensions like '.csv.gz'."""
+    stem, extension = os.path.splitext(file_path)
+    if extension in _CSV_EXTENSIONS.values():
+        stem, inner = os.path.splitext(stem)
+        extension = inner + extension
+    return stem, extension
+
+
+def _output_format_of(file_path: str) -> str:
+    """Get the output format of a file from its extension."""
+    extension = _split_extension(file_path)[1].lower()
+    for output_format, writer_class in WRITERS.items():
+        if extension.startswith(writer_class.extension):
+            return output_format
+    raise ValueError(f"Unsupported output file: {file_path}")
+
+
+def _open_csv(file_path: str):
+    """Open a CSV output file for reading, decompressing by extension."""
+    encoding = config.get_output_encoding()
+    for compression, extension in _CSV_EXTENSIONS.items():
+        if file_path.lower().endswith(extension):
+            return _CSV_OPENERS[compression](file_path, 'rt', encoding=encoding, newline='')
+    return open(file_path, 'r', encoding=encoding, newline='')
+
+
+def _arrow_schema_of(file_path: str):
+    """Read the Arrow schema of a Parquet or Feather file."""
+    if _output_format_of(file_path) == 'parquet':
+        import pyarrow.parquet as pq
+        return pq.read_schema(file_path)
+    import pyarrow.ipc as ipc
+    with ipc.open_file(file_path) as reader:
+        return reader.schema
+
+
+def _sqlite_table(file_path: str) -> str:
+    """Name of the table an SQLite output file holds: its file name without extension."""
+    return _split_extension(os.path.basename(file_path))[0]
+
+
+def _stored_sqlite_table(connection, file_path: str) -> str:
+    """Name of the table held by an SQLite output file, even if the file was renamed since."""
+    tables = [row[0] for row in connection.execute("SELECT name FROM sqlite_master WHERE type = 'table'")]
+    if _sqlite_table(file_path) in tables or not tables:
+        return _sqlite_table(file_path)
+    return tables[0]
+
+
+def _connect_sqlite(file_path: str):
+    """Open an SQLite output file for reading."""
+    import sqlite3
+    if not os.path.exists(file_path):
+        raise FileNotFoundError(f"SQLite output not found: {file_path}")
+    return sqlite3.connect(file_path)
+
+
+def _quote(identifier: str) -> str:
+    """Quote an SQL identifier, e.g. a column name."""
+    return '"' + identifier.replace('"', '""') + '"'
+
+
+# SQLite column types by logical column type
+_SQLITE_TYPES = {
+    'int': 'INTEGER',
+    'float': 'REAL',
+    'float32': 'REAL',
+    'bool': 'INTEGER',
+    'category': 'TEXT',
+    'string': 'TEXT',
+    'list': 'TEXT'
+}
+
+
+def _sqlite_converter(column: str) -> Callable[[Any], Any]:
+    """Get the function turning a cell of a column into an SQLite value."""
+    # SQLite columns take any value, so one that does not fit the column's type is kept as is
+    if column_kind(column) != 'list':
+        def convert_scalar(value: Any) -> Any:
+            try:
+                return _coerce(value, column)
+            except ValueError:
+                return value if isinstance(value, (str, int, float)) else str(value)
+        return convert_scalar
+    
+    def convert(value: Any) -> Any:
+        if _is_missing(value):
+            return None
+        if isinstance(value, str):
+            # Read back from an SQLite output, already JSON text
+            return value
+        try:
+            return json.dumps(_coerce(value, column), ensure_ascii=False)
+        except ValueError:
+            return json.dumps(value, ensure_ascii=False, default=str)
+    return convert
+
+
+def arrow_schema(columns: List[str]):
+    """
+    Build the Arrow schema for a set of output columns.
+    
+    Args:
+        columns: Output columns, in order
+        
+    Returns:
+        pyarrow.Schema
+    """
+    pa = _import_pyarrow('Arrow')
+    scalar_types = {
+        'int': pa.int64(),
+        'float': pa.float64(),
+        'float32': pa.float32(),
+        'bool': pa.bool_(),
+        'category': pa.string(),
+        'string': pa.string()
+    }
+    fields = []
+    for column in columns:
+        kind = column_kind(column)
+        if kind == 'list':
+            fields.append(pa.field(column, pa.list_(scalar_types[LIST_COLUMNS[column]])))
+        else:
+            fields.append(pa.field(column, scalar_types[kind]))
+    return pa.schema(fields)
+
+
+def _import_pyarrow(format_name: str):
+    """Import pyarrow, explaining which output needs it if it is missing."""
+    try:
+        import pyarrow
+    except ImportError as e:
+        raise ImportError(
+            f"{format_name} output requires pyarrow (pip install pyarrow)"
+        ) from e
+    return pyarrow
+
+
+class _LineBuffer(list):
+    """File-like list a csv.writer writes to, one formatted line per row."""
+    
+    write = list.append
+
+
+def _is_missing(value: Any) -> bool:
+    """Check for None, NaN and pandas' NA."""
+    if value is None or (isinstance(value, float) and math.isnan(value)):
+        return True
+    # pandas' NA can only turn up once pandas has been imported
+    pd = sys.modules.get('pandas')
+    return pd is not None and value is pd.NA
+
+
+_FLOAT32 = struct.Struct('f')
+
+
+def _csv_text(value: Any) -> str:
+    """Format a string, category, flag or list cell for CSV output."""
+    if isinstance(value, str):
+        return value
+    if value is None or (isinstance(value, float) and math.isnan(value)):
+        return ''
+    return str(value)
+
+
+def _csv_int(value: Any) -> str:
+    """Format an integer cell for CSV output, as a nullable Int64 column would."""
+    if value is None or (isinstance(value, float) and math.isnan(value)):
+        return ''
+    if isinstance(value, int) or (isinstance(value, float) and value.is_integer()):
+        return str(int(value))
+    return str(value)
+
+
+def _csv_float(value: Any) -> str:
+    """Format a double precision cell for CSV output."""
+    if value is None:
+        return ''
+    try:
+        value = float(value)
+    except (TypeError, ValueError):
+        return str(value)
+    return '' if math.isnan(value) else repr(value)
+
+
+@lru_cache(maxsize=4096)
+def _float32_repr(value: float) -> str:
+    """Shortest repr that round-trips through single precision, as numpy prints float32."""
+    try:
+        single = _FLOAT32.unpack(_FLOAT32.pack(value))[0]
+    except OverflowError:
+        return repr(math.copysign(math.inf, value))
+    for digits in range(1, 10):
+        text = '%.*g' % (digits, single)
+        if _FLOAT32.unpack(_FLOAT32.pack(float(text)))[0] == single:
+            break
+    return repr(float(text))
+
+
+def _csv_float32(value: Any) -> str:
+    """Format a single precision cell for CSV output."""
+    if value is None:
+        return ''
+    try:
+        value = float(value)
+    except (TypeError, ValueError):
+        return str(value)
+    return '' if math.isnan(value) else _float32_repr(value)
+
+
+# CSV cell formatters by logical column type
+_CSV_FORMATTERS: Dict[str, Callable[[Any], str]] = {
+    'int': _csv_int,
+    'float': _csv_float,
+    'float32': _csv_float32,
+    'bool': _csv_text,
+    'category': _csv_text,
+    'list': _csv_text,
+    'string': _csv_text
+}
+
+
+def _coerce_scalar(value: Any, kind: str) -> Any:
+    """
+    Coerce a single value to a logical schema type.
+    
+    Raises:
+        ValueError: If the value does not fit the type, e.g. 'abc' or 12.7 for an int
+    """
+    if _is_missing(value):
+        return None
+    if kind == 'int':
+        if isinstance(value, (numbers.Integral, str)):
+            try:
+                return int(value)
+            except ValueError:
+                pass
+        # Floats and strings such as '12.0' only if they hold a whole number
+        try:
+            number = float(value)
+        except (TypeError, ValueError):
+            number = math.nan
+        if number.is_integer():
+            return int(number)
+        raise ValueError(f"{value!r} is not an integer")
+    if kind in ('float', 'float32'):
+        try:
+            return float(value)
+        except (TypeError, ValueError):
+            raise ValueError(f"{value!r} is not a number") from None
+    if kind == 'bool':
+        return value if isinstance(value, bool) else None
+    if isinstance(value, str):
+        return value
+    if isinstance(value, (dict, list)):
+        return json.dumps(value, ensure_ascii=False)
+    return str(value)
+
+
+def _coerce(value: Any, column: str) -> Any:
+    """
+    Coerce a cell value to the schema type of its column.
+    
+    Raises:
+        ValueError: If the value, or an element of a list, does not fit the type
+    """
+    kind = column_kind(column)
+    if kind != 'list':
+        return _coerce_scalar(value, kind)
+    if _is_missing(value):
+        return None
+    if not isinstance(value, (list, tuple)):
+        value = [value]
+    element_kind = LIST_COLUMNS[column]
+    return [_coerce_scalar(element, element_kind) for element in value]
@@ -25,7 +25,7 @@ def sample_json():
         "geoCodes": [{"latitude": 12.34, "longitude": 56.78, "accuracy": "high"}],
         "chains": [{"giataId": 111, "names": [{"value": "Test Chain", "locale": "en", "isDefault": True}]}],
         "roomTypes": [{"category": "Deluxe", "code": "DLX", "name": "Deluxe Room", "type": "Room", "variantId": "V1"}],
-        "images": [{"baseName": "img1", "herf": "url", "heroImage": True, "id": 1, "lastUpdate": "2023-01-01", "motifType": "exterior", "sizes": ["large"]}],
+        "images": [{"baseName": "img1", "herf": "url", "heroImage": True, "id": 1, "lastUpdate": "2023-01-01", "motifType": "exterior", "sizes": [800, 320, 150]}],
         "facts": [{"factDefId": 1, "attributes": [{"attributeDefId": 2, "unitDefId": 3, "value": "Yes"}]}],
         "texts": {"en": {"Facilities": "Pool", "Location": "Beach"}},
         "variantGroups": ["Group1"]
@@ -43,3 +43,787 @@ def test_extract_hotel_data(sample_json):
     assert result["urls"] == ["http://testhotel.com"]
     assert result["texts_en_Facilities"] == "Pool"
     assert result["variantGroups"] == ["Group1"]
+
+def test_process_batch_parallel_matches_serial(sample_json, tmp_path):
+    import json
+    file_paths = []
+    for i in range(5):
+        data = dict(sample_json, giataId=1000 + i)
+        path = tmp_path / f"hotel_{i}.json"
+        path.write_text(json.dumps(data), encoding="utf-8")
+        file_paths.append(str(path))
+
+    extractor = HotelDataExtractor()
+    serial_df = extractor.process_batch(file_paths, parallel=False, use_cache=False)
+    parallel_df = extractor.process_batch(file_paths, parallel=True, max_workers=2, use_cache=False)
+    pd.testing.assert_frame_equal(serial_df, parallel_df)
+    assert list(parallel_df["giataId"]) == [1000, 1001, 1002, 1003, 1004]
+
+
+def test_parallel_workers_keep_extractor_settings(sample_json, tmp_path):
+    import json
+    file_paths = []
+    for i in range(4):
+        names = sample_json["names"] + [{"value": f"Hotel {i}", "locale": "de"}]
+        path = tmp_path / f"hotel_{i}.json"
+        path.write_text(json.dumps(dict(sample_json, giataId=2000 + i, names=names)), encoding="utf-8")
+        file_paths.append(str(path))
+
+    extractor = HotelDataExtractor(fields=["giataId", "names"], relational=True)
+    outputs = {}
+    for parallel in (False, True):
+        output_path = tmp_path / f"out_{parallel}" / "hotels.csv"
+        extractor.process_batch_to_file(file_paths, str(output_path), parallel=parallel, max_workers=2, use_cache=False)
+        outputs[parallel] = (pd.read_csv(output_path), pd.read_csv(output_path.parent / "hotels_names.csv"))
+    hotels, names = outputs[True]
+    assert sorted(hotels.columns) == ["fileId", "giataId", "names_locale", "names_value"]
+    assert len(names) == 8
+    pd.testing.assert_frame_equal(outputs[False][0], hotels)
+    pd.testing.assert_frame_equal(outputs[False][1], names)
+
+
+def test_process_batch_to_file_streams_chunks(sample_json, tmp_path):
+    import json
+    file_paths = []
+    for i in range(5):
+        path = tmp_path / f"hotel_{i}.json"
+        path.write_text(json.dumps(dict(sample_json, giataId=2000 + i)), encoding="utf-8")
+        file_paths.append(str(path))
+
+    extractor = HotelDataExtractor()
+    output_path = tmp_path / "out" / "hotels.csv"
+    rows = extractor.process_batch_to_file(
+        file_paths, str(output_path), parallel=False, chunk_size=2, use_cache=False
+    )
+
+    assert rows == 5
+    df = pd.read_csv(output_path)
+    assert list(df.columns) == extractor.df_keys
+    assert list(df["giataId"]) == [2000, 2001, 2002, 2003, 2004]
+
+
+def test_process_batch_reuses_cached_rows(sample_json, tmp_path, monkeypatch):
+    import json
+    import sqlite3
+    from config.settings import config
+    monkeypatch.setitem(config.config['performance'], 'cache_dir', str(tmp_path / "cache"))
+
+    file_paths = []
+    for i in range(3):
+        path = tmp_path / f"hotel_{i}.json"
+        path.write_text(json.dumps(dict(sample_json, giataId=3000 + i)), encoding="utf-8")
+        file_paths.append(str(path))
+
+    extractor = HotelDataExtractor()
+    first = extractor.process_batch(file_paths, parallel=False, use_cache=True)
+
+    calls = []
+    original = extractor.process_single_file
+    monkeypatch.setattr(extractor, "process_single_file", lambda p: calls.append(p) or original(p))
+    (tmp_path / "hotel_1.json").write_text(json.dumps(dict(sample_json, giataId=39999)), encoding="utf-8")
+
+    second = extractor.process_batch(file_paths, parallel=False, use_cache=True)
+    assert calls == [file_paths[1]]
+    assert list(second["giataId"]) == [3000, 39999, 3002]
+    assert list(first["names_value"]) == list(second["names_value"])
+
+    # A partial run keeps the entries of files it did not cover; deleted files are pruned
+    calls.clear()
+    extractor.process_batch(file_paths[:1], parallel=False, use_cache=True)
+    os.remove(file_paths[2])
+    extractor.process_batch(file_paths[:2], parallel=False, use_cache=True)
+    assert calls == []
+    with sqlite3.connect(tmp_path / "cache" / "manifest.sqlite") as connection:
+        paths = [path for (path,) in connection.execute("SELECT path FROM files ORDER BY path")]
+    assert paths == file_paths[:2]
+
+
+def test_result_cache_stamps_the_bytes_it_extracted(sample_json, tmp_path, monkeypatch):
+    import json
+    from config.settings import config
+    from utils import cache
+    monkeypatch.setitem(config.config['performance'], 'cache_dir', str(tmp_path / "cache"))
+    hashed = []
+    hash_file = cache.hash_file
+    monkeypatch.setattr(cache, "hash_file", lambda path: hashed.append(path) or hash_file(path))
+
+    file_paths = []
+    for i in range(4):
+        path = tmp_path / f"hotel_{i}.json"
+        path.write_text(json.dumps(dict(sample_json, giataId=3000 + i)), encoding="utf-8")
+        file_paths.append(str(path))
+
+    # Workers hash the bytes they read; the parent does not read the inputs again
+    extractor = HotelDataExtractor()
+    extractor.process_batch(file_paths, parallel=True, max_workers=2, use_cache=True)
+    assert hashed == []
+
+    # A file changed after it was read keeps the stamp of what was extracted
+    os.remove(tmp_path / "cache" / "manifest.sqlite")
+    original = extractor.process_single_file
+
+    def change_after_read(file_path, **kwargs):
+        result = original(file_path, **kwargs)
+        if file_path == file_paths[1] and not hashed:
+            with open(file_path, "w", encoding="utf-8") as file:
+                file.write(json.dumps(dict(sample_json, giataId=3901)))
+            stat = os.stat(file_path)
+            os.utime(file_path, ns=(stat.st_atime_ns, stat.st_mtime_ns + 10**9))
+            hashed.append("changed")
+        return result
+    monkeypatch.setattr(extractor, "process_single_file", change_after_read)
+    first = extractor.process_batch(file_paths, parallel=False, use_cache=True)
+    assert list(first["giataId"]) == [3000, 3001, 3002, 3003]
+    second = extractor.process_batch(file_paths, parallel=False, use_cache=True)
+    assert list(second["giataId"]) == [3000, 3901, 3002, 3003]
+
+
+@pytest.mark.parametrize("backend", ["json", "auto"])
+def test_load_json_file_backends(sample_json, tmp_path, backend):
+    import json
+    from utils.json_backend import decode_json
+    from utils.file_utils import load_json_file
+
+    path = tmp_path / "hotel.json"
+    path.write_text(json.dumps(sample_json), encoding="utf-8")
+    assert load_json_file(str(path)) == sample_json
+
+    with pytest.raises(json.JSONDecodeError):
+        decode_json(b'{"giataId": ', backend=backend)
+
+    # Decoded as the standard library does, whichever backend is fastest
+    document = b'{"giataId": 123456789012345678901234567890, "ratings": [NaN, -Infinity], "id": "%s"}'
+    for data in (document % b"1", document % (b"7" * 25)):
+        decoded = decode_json(data, backend=backend)
+        assert decoded["giataId"] == 123456789012345678901234567890
+        assert decoded["ratings"][0] != decoded["ratings"][0] and decoded["ratings"][1] == float("-inf")
+    if backend == "auto":
+        # Memory-mapped documents are decoded from buffers
+        assert decode_json(memoryview(b'[' + b'1' * 30 + b']'), backend=backend) == [int('1' * 30)]
+    assert decode_json(b'{"id": "' + b'9' * 30 + b'", "n": 18446744073709551615}', backend=backend)["n"] == 2 ** 64 - 1
+
+
+def test_unknown_json_backend_fails_before_any_file(sample_json, tmp_path, monkeypatch):
+    import json
+    from config.settings import config
+    from utils.json_backend import decode_json
+    path = tmp_path / "hotel.json"
+    path.write_text(json.dumps(sample_json), encoding="utf-8")
+    monkeypatch.setitem(config.config["performance"], "json_backend", "orsjon")
+    with pytest.raises(ValueError, match="Unknown JSON backend"):
+        HotelDataExtractor()
+    with pytest.raises(ValueError, match="Unknown JSON backend") as raised:
+        decode_json(path.read_bytes())
+    assert not isinstance(raised.value, json.JSONDecodeError)
+    assert path.exists()
+
+
+def test_load_json_file_maps_large_files(sample_json, tmp_path, monkeypatch):
+    import json
+    pytest.importorskip("orjson")
+    from config.settings import config
+    from utils import file_utils
+    path = tmp_path / "hotel.json"
+    path.write_text(json.dumps(sample_json), encoding="utf-8")
+    size = path.stat().st_size
+    bad = tmp_path / "bad.json"
+    bad.write_bytes(b'{"giataId": ' + b" " * size)
+    reads = []
+    read_file_bytes = file_utils.read_file_bytes
+    monkeypatch.setattr(file_utils, "read_file_bytes", lambda p: reads.append(p) or read_file_bytes(p))
+    monkeypatch.setitem(config.config["performance"], "mmap_min_mb", size / (1024 * 1024))
+    for backend, mapped in (("orjson", True), ("json", False)):
+        monkeypatch.setitem(config.config["performance"], "json_backend", backend)
+        reads.clear()
+        assert file_utils.load_json_file(str(path)) == sample_json
+        assert (reads == []) is mapped
+        with pytest.raises(json.JSONDecodeError):
+            file_utils.load_json_file(str(bad))
+    # Files below the threshold are read as before
+    monkeypatch.setitem(config.config["performance"], "json_backend", "orjson")
+    monkeypatch.setitem(config.config["performance"], "mmap_min_mb", (size + 1) / (1024 * 1024))
+    reads.clear()
+    assert file_utils.load_json_file(str(path)) == sample_json
+    assert reads == [str(path)]
+
+
+def test_extraction_fields_limit_columns(sample_json):
+    extractor = HotelDataExtractor(fields=["giataId", "names", "geoCodes"])
+    result = extractor.extract_hotel_data(sample_json, file_id="test.json")
+    assert extractor.df_keys == [
+        "fileId", "giataId", "names_locale", "names_value",
+        "geoCodes_accuracy", "geoCodes_latitude", "geoCodes_longitude"
+    ]
+    assert set(result) == set(extractor.df_keys)
+    assert result["geoCodes_latitude"] == 12.34
+
+
+def test_generated_corpus_is_deterministic_and_extractable(tmp_path):
+    from benchmarks.corpus import write_corpus
+
+    first = write_corpus(str(tmp_path / "a"), 3, seed=7, profile={"images": 2, "room_types": 1})
+    second = write_corpus(str(tmp_path / "b"), 3, seed=7, profile={"images": 2, "room_types": 1})
+    for a, b in zip(first, second):
+        assert open(a, "rb").read() == open(b, "rb").read()
+
+    df = HotelDataExtractor().process_batch(first, parallel=False, use_cache=False)
+    assert list(df["giataId"]) == [100000, 100001, 100002]
+
+
+def test_run_metrics_collects_stages(sample_json, tmp_path):
+    import json
+    from utils.metrics import enable_run_metrics, disable_run_metrics
+
+    good = tmp_path / "good.json"
+    good.write_text(json.dumps(sample_json), encoding="utf-8")
+    missing = tmp_path / "missing.json"
+
+    metrics = enable_run_metrics()
+    try:
+        HotelDataExtractor().process_batch([str(good), str(missing)], parallel=False, use_cache=False)
+    finally:
+        disable_run_metrics()
+
+    summary = metrics.summary()
+    assert summary["counters"]["records"] == 1
+    assert summary["counters"]["failures"] == 1
+    assert summary["counters"]["bytes_read"] == good.stat().st_size
+    assert {"read", "parse", "extract", "dataframe"} <= set(summary["stages"])
+    assert summary["file_latency_ms"]["count"] == 2
+
+
+def test_async_pipeline_matches_serial(sample_json, tmp_path, monkeypatch):
+    import json
+    from config.settings import config
+
+    file_paths = []
+    for i in range(20):
+        path = tmp_path / f"hotel_{i:02d}.json"
+        path.write_text(json.dumps(dict(sample_json, giataId=4000 + i)), encoding="utf-8")
+        file_paths.append(str(path))
+    file_paths.insert(5, str(tmp_path / "missing.json"))
+
+    extractor = HotelDataExtractor()
+    serial = list(extractor.iter_batch(file_paths, parallel=False, use_cache=False))
+
+    monkeypatch.setitem(config.config['processing'], 'async_io', True)
+    monkeypatch.setitem(config.config['processing'], 'read_concurrency', 4)
+    monkeypatch.setitem(config.config['processing'], 'queue_size', 4)
+    pipelined = list(extractor.iter_batch(file_paths, parallel=False, use_cache=False))
+
+    assert pipelined == serial
+    assert pipelined[5] == (file_paths[5], None)
+
+def test_process_batch_reads_archives(sample_json, tmp_path, monkeypatch):
+    import gzip
+    import io
+    import json
+    import tarfile
+    import zipfile
+    from config.settings import config
+
+    monkeypatch.setitem(config.config['error_handling'], 'failed_files_dir', str(tmp_path / "failed"))
+    documents = {f"hotels/{i:02d}.json": json.dumps(dict(sample_json, giataId=5000 + i)).encode() for i in range(6)}
+    documents["hotels/06.json.gz"] = gzip.compress(json.dumps(dict(sample_json, giataId=5006)).encode())
+    documents["hotels/broken.json"] = b"{not json"
+
+    zip_path = tmp_path / "drop.zip"
+    with zipfile.ZipFile(zip_path, "w") as archive:
+        for name, data in documents.items():
+            archive.writestr(name, data)
+    tar_path = tmp_path / "drop.tar.gz"
+    with tarfile.open(tar_path, "w:gz") as archive:
+        for name, data in documents.items():
+            info = tarfile.TarInfo(name)
+            info.size = len(data)
+            archive.addfile(info, io.BytesIO(data))
+
+    extractor = HotelDataExtractor()
+    for archive_path in (str(zip_path), str(tar_path)):
+        serial = list(extractor.iter_batch([archive_path], parallel=False, use_cache=False))
+        parallel = list(extractor.iter_batch([archive_path], parallel=True, max_workers=2, use_cache=False))
+        assert parallel == serial
+        assert [path for path, _ in serial] == [archive_path] * len(documents)
+        assert [result["fileId"] for _, result in serial[:7]] == [f"hotels/{i:02d}.json" for i in range(7)]
+        assert [result["giataId"] for _, result in serial[:7]] == list(range(5000, 5007))
+        assert serial[7][1] is None
+        failed = tmp_path / "failed" / os.path.basename(archive_path) / "hotels" / "broken.json"
+        assert failed.read_bytes() == b"{not json"
+    assert zip_path.exists() and tar_path.exists()
+
+def test_process_batch_reads_ndjson(sample_json, tmp_path, monkeypatch):
+    import json
+    import shutil
+    from config.settings import config
+    from utils.sources import iter_line_ranges
+
+    monkeypatch.setitem(config.config['error_handling'], 'failed_files_dir', str(tmp_path / "failed"))
+    lines = [json.dumps(dict(sample_json, giataId=6000 + i)) for i in range(30)]
+    lines[4] = '{"giataId": 6004, broken'
+    lines[9] = ''
+    ndjson_path = tmp_path / "export.jsonl"
+    ndjson_path.write_text("\n".join(lines) + "\n", encoding="utf-8")
+    file_path = str(ndjson_path)
+
+    extractor = HotelDataExtractor()
+    serial = list(extractor.iter_batch([file_path], parallel=False, use_cache=False))
+    shutil.rmtree(tmp_path / "failed")
+    # Ranges of a few lines each; workers number their own lines and the parent renumbers them
+    monkeypatch.setitem(config.config['processing'], 'ndjson_range_mb', 0.001)
+    assert len(list(iter_line_ranges(file_path, config.get_ndjson_range_size()))) > 5
+    parallel = list(extractor.iter_batch([file_path], parallel=True, max_workers=2, use_cache=False))
+
+    assert parallel == serial
+    assert len(serial) == 29
+    assert serial[4] == (file_path, None)
+    records = [result for _, result in serial if result]
+    assert [record["fileId"] for record in records[:4]] == [f"export.jsonl:{line}" for line in range(1, 5)]
+    assert records[4]["fileId"] == "export.jsonl:6"
+    assert records[-1]["fileId"] == "export.jsonl:30"
+    assert (tmp_path / "failed" / "export.jsonl" / "5.json").read_text() == lines[4]
+    assert ndjson_path.exists()
+
+def test_process_batch_streams_json_arrays(sample_json, tmp_path, monkeypatch):
+    import json
+    from config.settings import config
+    from utils.sources import is_json_array, iter_json_array
+
+    monkeypatch.setitem(config.config['error_handling'], 'failed_files_dir', str(tmp_path / "failed"))
+    monkeypatch.setitem(config.config['performance'], 'stream_json_arrays', True)
+    items = [json.dumps(dict(sample_json, giataId=7000 + i, source='with "[quoted]" {brackets},')) for i in range(12)]
+    items[3] = '{"giataId": 7003, "names": [tru]}'
+    array_path = tmp_path / "all_hotels.json"
+    array_path.write_text("[\n" + ",\n".join(items) + "\n]", encoding="utf-8")
+    single_path = tmp_path / "single.json"
+    single_path.write_text(json.dumps(sample_json), encoding="utf-8")
+    file_paths = [str(single_path), str(array_path)]
+
+    assert [data.decode() for _, data in iter_json_array(str(array_path), read_size=7)] == items
+
+    extractor = HotelDataExtractor()
+    serial = list(extractor.iter_batch(file_paths, parallel=False, use_cache=False))
+    parallel = list(extractor.iter_batch(file_paths, parallel=True, max_workers=2, use_cache=False))
+
+    assert parallel == serial
+    assert serial[0][1]["fileId"] == "single.json"
+    assert [path for path, _ in serial[1:]] == [str(array_path)] * 12
+    assert serial[4] == (str(array_path), None)
+    assert serial[12][1]["fileId"] == "all_hotels.json[11]"
+    assert serial[12][1]["source"] == 'with "[quoted]" {brackets},'
+    assert (tmp_path / "failed" / "all_hotels.json" / "3.json").read_text() == items[3]
+
+    # Discovered files are peeked at once each, however often a cached run asks
+    from utils import discovery
+    monkeypatch.setitem(config.config['performance'], 'cache_dir', str(tmp_path / "cache"))
+    peeked = []
+    monkeypatch.setattr(discovery, "is_json_array", lambda path: peeked.append(path) or is_json_array(path))
+    for parallel in (False, True, False):
+        files = sorted(discovery.iter_input_files(str(tmp_path), max_depth=0), key=file_paths.index)
+        results = list(extractor.iter_batch(files, parallel=parallel, max_workers=2, use_cache=True))
+        assert [result for _, result in results] == [result for _, result in serial]
+    assert sorted(peeked) == sorted(file_paths * 3)
+
+def test_process_batch_applies_typed_schema(sample_json, tmp_path):
+    import json
+
+    no_names = dict(sample_json, giataId=8001, names=[], ratings=[], images=[])
+    file_paths = []
+    for i, document in enumerate([sample_json, no_names]):
+        path = tmp_path / f"hotel_{i}.json"
+        path.write_text(json.dumps(document), encoding="utf-8")
+        file_paths.append(str(path))
+
+    df = HotelDataExtractor().process_batch(file_paths, parallel=False, use_cache=False)
+
+    assert str(df['giataId'].dtype) == 'Int64'
+    assert str(df['city_giataId'].dtype) == 'Int64'
+    assert str(df['country_code'].dtype) == 'category'
+    assert str(df['names_locale'].dtype) == 'category'
+    assert str(df['ratings_value'].dtype) == 'float32'
+    assert str(df['geoCodes_latitude'].dtype) == 'float64'
+    assert str(df['images_heroImage'].dtype) == 'boolean'
+    assert df['phones_phone'][0] == ['+911234567890']
+    assert pd.isna(df['names_value'][1]) and pd.isna(df['names_locale'][1])
+    assert pd.isna(df['ratings_value'][1]) and pd.isna(df['images_id'][1])
+
+def test_relational_extraction_writes_child_tables(sample_json, tmp_path):
+    import json
+
+    document = dict(
+        sample_json,
+        names=sample_json["names"] + [{"value": "Testhotel", "locale": "de"}],
+        roomTypes=sample_json["roomTypes"] + [{"category": "Standard", "code": "STD", "imageRelations": [1]}],
+        facts=sample_json["facts"] + [{"factDefId": 4, "attributes": [
+            {"attributeDefId": 5, "value": "10"}, {"attributeDefId": 6, "value": "20"}
+        ]}]
+    )
+    path = tmp_path / "hotel.json"
+    path.write_text(json.dumps(document), encoding="utf-8")
+    output_path = tmp_path / "out" / "hotels.csv"
+
+    extractor = HotelDataExtractor(relational=True)
+    rows = extractor.process_batch_to_file([str(path)], str(output_path), parallel=False, use_cache=False)
+    assert rows == 1
+
+    hotels = pd.read_csv(output_path)
+    assert hotels["roomTypes_code"].tolist() == ["DLX"]
+    names = pd.read_csv(tmp_path / "out" / "hotels_names.csv")
+    assert names.to_dict("records") == [
+        {"giataId": 123, "names_locale": "en", "names_value": "Test Hotel", "names_isDefault": True},
+        {"giataId": 123, "names_locale": "de", "names_value": "Testhotel", "names_isDefault": False}
+    ]
+    rooms = pd.read_csv(tmp_path / "out" / "hotels_rooms.csv")
+    assert rooms["roomTypes_code"].tolist() == ["DLX", "STD"]
+    assert rooms["giataId"].tolist() == [123, 123]
+    images = pd.read_csv(tmp_path / "out" / "hotels_images.csv")
+    assert images["images_id"].tolist() == [1]
+    facts = pd.read_csv(tmp_path / "out" / "hotels_facts.csv")
+    assert facts["facts_factDefId"].tolist() == [1, 4]
+    attributes = pd.read_csv(tmp_path / "out" / "hotels_fact_attributes.csv")
+    assert attributes[["facts_factDefId", "facts_attributes_attributeDefId"]].values.tolist() == [[1, 2], [4, 5], [4, 6]]
+
+    df = extractor.process_batch([str(path)], parallel=False, use_cache=False)
+    assert "_tables" not in df.columns
+
+
+def test_iter_input_files_walks_tree_lazily(sample_json, tmp_path, monkeypatch):
+    import json
+    from config.settings import config
+    from utils.discovery import iter_input_files
+    monkeypatch.setitem(config.config['performance'], 'cache_dir', str(tmp_path / "cache"))
+
+    root = tmp_path / "in"
+    layout = ["b.json", "a.json", "2024-01/c.json", "2024-01/day/d.json", "_staging/e.json", "notes.txt"]
+    for i, name in enumerate(layout):
+        path = root / name
+        path.parent.mkdir(parents=True, exist_ok=True)
+        path.write_text(json.dumps(dict(sample_json, giataId=5000 + i)), encoding="utf-8")
+
+    def relative(paths):
+        return [os.path.relpath(path, root).replace(os.sep, "/") for path in paths]
+
+    found = list(iter_input_files(str(root), include=[], exclude=[], max_depth=None))
+    assert relative(found) == ["a.json", "b.json", "2024-01/c.json", "2024-01/day/d.json", "_staging/e.json"]
+    # Files are only stat'ed once their size is asked for
+    assert all(path._size is None for path in found)
+    assert [path.size for path in found] == [os.path.getsize(path) for path in found]
+    assert relative(iter_input_files(str(root), include=[], exclude=["_staging"], max_depth=0)) == ["a.json", "b.json"]
+    assert relative(iter_input_files(str(root), include=["2024-*/*.json"], exclude=[], max_depth=1)) == ["2024-01/c.json"]
+    assert relative(iter_input_files(str(root), include=[], exclude=["*/day", "_*"], max_depth=None)) == [
+        "a.json", "b.json", "2024-01/c.json"
+    ]
+
+    # Batches accept the generator itself, with or without the result cache
+    extractor = HotelDataExtractor()
+
+    def files():
+        return iter_input_files(str(root), include=[], exclude=["_staging"], max_depth=None)
+
+    expected = [5001, 5000, 5002, 5003]
+    assert list(extractor.process_batch(files(), parallel=False, use_cache=False)["giataId"]) == expected
+    assert list(extractor.process_batch(files(), parallel=False, use_cache=True)["giataId"]) == expected
+    assert list(extractor.process_batch(files(), parallel=False, use_cache=True)["giataId"]) == expected
+
+
+def test_watcher_appends_new_files_and_writes_updates(sample_json, tmp_path, monkeypatch):
+    import json
+    import time
+    from config.settings import config
+    from extractors import watcher as watcher_module
+    from extractors.watcher import DirectoryWatcher
+    monkeypatch.setitem(config.config['output'], 'format', 'csv')
+    monkeypatch.setitem(config.config['output'], 'compression', None)
+
+    def write(path, giata_id):
+        path.write_text(json.dumps(dict(sample_json, giataId=giata_id)), encoding="utf-8")
+
+    def age(*directories):
+        # Directory mtimes older than the watcher's timestamp slack
+        past = time.time() - 60
+        for directory in directories:
+            os.utime(directory, (past, past))
+
+    input_dir = tmp_path / "in"
+    input_dir.mkdir()
+    write(input_dir / "old.json", 7000)
+    output_path = tmp_path / "out" / "extracted_hotels.csv"
+    updates_path = tmp_path / "out" / "extracted_hotels_updates.csv"
+
+    listed = []
+    scan_directory = watcher_module.scan_directory
+    monkeypatch.setattr(watcher_module, "scan_directory", lambda path, *args: listed.append(path) or scan_directory(path, *args))
+    watcher = DirectoryWatcher(
+        HotelDataExtractor(), str(input_dir), str(output_path), poll_interval=0, batch_files=2,
+        batch_window=60, settle_seconds=0, notify=False, full_rescan_interval=0
+    )
+    assert watcher.baseline() == 1
+    assert watcher.poll() == 0
+
+    write(input_dir / "a.json", 7001)
+    assert watcher.poll() == 1
+    assert not watcher.is_due()
+    (input_dir / "day").mkdir()
+    write(input_dir / "day" / "b.json", 7002)
+    assert watcher.poll() == 1
+    assert watcher.is_due()
+    assert watcher.flush() == 2
+    assert list(pd.read_csv(output_path)["giataId"]) == [7001, 7002]
+
+    # Polls only list directories whose mtime moved
+    age(input_dir, input_dir / "day")
+    watcher.poll()
+    listed.clear()
+    assert watcher.poll() == 0
+    assert listed == []
+
+    # A file replaced by a rename is an update; the output keeps its rows
+    write(input_dir / "old.json.tmp", 70030)
+    os.replace(input_dir / "old.json.tmp", input_dir / "old.json")
+    assert watcher.run(max_polls=1) == 3
+    assert list(pd.read_csv(output_path)["giataId"]) == [7001, 7002]
+    assert list(pd.read_csv(updates_path)["giataId"]) == [70030]
+    assert list(pd.read_csv(updates_path).columns) == HotelDataExtractor().df_keys
+
+    # Files rewritten in place leave their directory alone; full rescans find them
+    write(input_dir / "day" / "b.json", 70020)
+    age(input_dir, input_dir / "day")
+    watcher.poll()
+    assert watcher.poll() == 0
+    watcher.full_rescan_interval = 1e-9
+    assert watcher.poll() == 1
+    watcher.flush()
+    assert list(pd.read_csv(updates_path)["giataId"]) == [70030, 70020]
+
+
+def test_watcher_uses_change_notifications(sample_json, tmp_path, monkeypatch):
+    import json
+    import time
+    pytest.importorskip("watchdog")
+    from config.settings import config
+    from extractors.watcher import DirectoryWatcher
+    monkeypatch.setitem(config.config['output'], 'format', 'csv')
+    monkeypatch.setitem(config.config['output'], 'compression', None)
+
+    input_dir = tmp_path / "in"
+    (input_dir / "day").mkdir(parents=True)
+    (input_dir / "day" / "old.json").write_text(json.dumps(dict(sample_json, giataId=7100)), encoding="utf-8")
+    output_path = tmp_path / "out" / "extracted_hotels.csv"
+    watcher = DirectoryWatcher(
+        HotelDataExtractor(), str(input_dir), str(output_path), poll_interval=0,
+        settle_seconds=0, notify=True, full_rescan_interval=0
+    )
+    try:
+        watcher.baseline()
+        (input_dir / "day" / "new.json").write_text(json.dumps(dict(sample_json, giataId=7101)), encoding="utf-8")
+        (input_dir / "day" / "old.json").write_text(json.dumps(dict(sample_json, giataId=71000)), encoding="utf-8")
+        (input_dir / "day" / "notes.txt").write_text("not a hotel", encoding="utf-8")
+        queued = 0
+        deadline = time.monotonic() + 10
+        while queued < 2 and time.monotonic() < deadline:
+            time.sleep(0.05)
+            queued += watcher.poll()
+        assert queued == 2
+        watcher.flush()
+    finally:
+        watcher.close()
+    assert list(pd.read_csv(output_path)["giataId"]) == [7101]
+    assert list(pd.read_csv(tmp_path / "out" / "extracted_hotels_updates.csv")["giataId"]) == [71000]
+
+
+def test_watcher_needs_appendable_output(tmp_path, monkeypatch):
+    from config.settings import config
+    from extractors.watcher import DirectoryWatcher
+    monkeypatch.setitem(config.config['output'], 'format', 'parquet')
+    with pytest.raises(ValueError, match="cannot be appended"):
+        DirectoryWatcher(HotelDataExtractor(), str(tmp_path), str(tmp_path / "hotels.parquet"))
+    # SQLite upserts modified hotels in place
+    monkeypatch.setitem(config.config['output'], 'format', 'sqlite')
+    output_path = str(tmp_path / "hotels.sqlite")
+    assert DirectoryWatcher(HotelDataExtractor(), str(tmp_path), output_path).updates_path == output_path
+
+
+def test_dedup_keeps_one_row_per_giata_id(sample_json, tmp_path, monkeypatch):
+    import json
+    from config.settings import config
+    monkeypatch.setitem(config.config['output'], 'format', 'csv')
+    monkeypatch.setitem(config.config['output'], 'compression', None)
+    monkeypatch.setitem(config.config['data'], 'temp_dir', str(tmp_path / "temp"))
+
+    # (file, giataId, images lastUpdate, mtime); b.json is the newest copy of 1, d.json has its latest image
+    drops = [("a.json", 1, ["2024-05-01"], 300), ("b.json", 1, ["2023-01-01"], 900),
+             ("c.json", 2, [], 100), ("d.json", 1, ["2022-01-01", "2025-02-01"], 500), ("e.json", 3, [], 100)]
+    paths = []
+    for name, giata_id, last_updates, mtime in drops:
+        path = tmp_path / name
+        images = [dict(sample_json["images"][0], lastUpdate=last_update) for last_update in last_updates]
+        path.write_text(json.dumps(dict(sample_json, giataId=giata_id, images=images, source=name)), encoding="utf-8")
+        os.utime(path, ns=(mtime * 10**9, mtime * 10**9))
+        paths.append(str(path))
+
+    expected = {
+        "mtime": ["b.json", "c.json", "e.json"],
+        "images_lastUpdate": ["c.json", "d.json", "e.json"],
+        "first": ["a.json", "c.json", "e.json"],
+        "last": ["c.json", "d.json", "e.json"],
+    }
+    for precedence, sources in expected.items():
+        extractor = HotelDataExtractor(dedup_by=precedence)
+        df = extractor.process_batch(paths, parallel=False, use_cache=False)
+        assert list(df["source"]) == sources, precedence
+        df = extractor.process_batch(paths, parallel=True, max_workers=2, use_cache=False)
+        assert list(df["source"]) == sources, precedence
+        assert "_imageDates" not in df.columns
+        output_path = tmp_path / "out" / f"{precedence}.csv"
+        assert extractor.process_batch_to_file(paths, str(output_path), parallel=False, use_cache=False) == 3
+        assert list(pd.read_csv(output_path)["source"]) == sources, precedence
+
+    assert len(HotelDataExtractor(dedup_by='').process_batch(paths, parallel=False, use_cache=False)) == 5
+    with pytest.raises(ValueError):
+        HotelDataExtractor(dedup_by="newest")
+    with pytest.raises(ValueError, match="images field"):
+        HotelDataExtractor(fields=["giataId", "names"], dedup_by="images_lastUpdate")
+
+
+def test_dedup_index_keeps_rows_without_giata_id_apart():
+    from extractors.dedup import GiataIdIndex
+    index = GiataIdIndex("last")
+    for giata_id in (None, -1, "", -1, None):
+        index.add({"giataId": giata_id})
+    assert list(index.keep_mask()) == [True, False, True, True, True]
+
+
+def test_merge_shards_deduplicates_across_shards(sample_json, tmp_path, monkeypatch):
+    import json
+    from config.settings import config
+    from utils.shards import merge_shard_outputs, shard_stem
+    from utils.writers import output_filename
+    monkeypatch.setitem(config.config['output'], 'format', 'csv')
+    monkeypatch.setitem(config.config['output'], 'compression', None)
+    monkeypatch.setitem(config.config['data'], 'temp_dir', str(tmp_path / "temp"))
+
+    # (shard, file, giataId, images lastUpdate, mtime); b.json in shard 2 is the newest copy of 1,
+    # a.json in shard 1 has its latest first image but d.json in shard 2 its latest image
+    drops = [(1, "a.json", 1, ["2024-05-01"], 300), (2, "b.json", 1, ["2023-01-01"], 900),
+             (1, "c.json", 2, [], 100), (2, "d.json", 1, ["2022-01-01", "2025-02-01"], 500), (2, "e.json", 3, [], 100)]
+    shards = {1: [], 2: []}
+    for shard, name, giata_id, last_updates, mtime in drops:
+        path = tmp_path / "in" / name
+        path.parent.mkdir(exist_ok=True)
+        images = [dict(sample_json["images"][0], lastUpdate=last_update) for last_update in last_updates]
+        path.write_text(json.dumps(dict(sample_json, giataId=giata_id, images=images, source=name)), encoding="utf-8")
+        os.utime(path, ns=(mtime * 10**9, mtime * 10**9))
+        shards[shard].append(str(path))
+
+    expected = {"mtime": ["c.json", "b.json", "e.json"], "images_lastUpdate": ["c.json", "d.json", "e.json"]}
+    for precedence, sources in expected.items():
+        out_dir = tmp_path / precedence
+        extractor = HotelDataExtractor(dedup_by=precedence, relational=True)
+        for shard, paths in shards.items():
+            output_path = out_dir / output_filename(shard_stem("extracted_hotels", shard, 2))
+            if shard == 1:
+                extractor.process_batch_to_file(paths, str(output_path), parallel=False, use_cache=False)
+            else:
+                extractor.save_records(extractor.collect_batch(paths, parallel=False, use_cache=False), str(output_path))
+        rows = merge_shard_outputs(
+            str(out_dir), "extracted_hotels", extractor.df_keys, tables=["names"], dedup_by=precedence
+        )
+        merged = pd.read_csv(out_dir / "extracted_hotels.csv")
+        assert rows == 3 and list(merged["source"]) == sources, precedence
+        # Child rows follow their hotel row
+        names = pd.read_csv(out_dir / "extracted_hotels_names.csv")
+        assert list(names["giataId"]) == list(merged["giataId"]), precedence
+
+    # Without dedup the shards are concatenated
+    assert merge_shard_outputs(str(tmp_path / "mtime"), "extracted_hotels") == 4
+    # Shards written without dedup cannot be merged by a scored precedence...
+    for shard, paths in shards.items():
+        output_path = tmp_path / "plain" / output_filename(shard_stem("extracted_hotels", shard, 2))
+        HotelDataExtractor(dedup_by="").process_batch_to_file(paths, str(output_path), parallel=False, use_cache=False)
+    for precedence in expected:
+        with pytest.raises(ValueError, match=f"no {precedence} scores"):
+            merge_shard_outputs(str(tmp_path / "plain"), "extracted_hotels", dedup_by=precedence)
+    # nor can shards deduplicated by one precedence be merged by another
+    with pytest.raises(ValueError, match="no images_lastUpdate scores"):
+        merge_shard_outputs(str(tmp_path / "mtime"), "extracted_hotels", dedup_by="images_lastUpdate")
+
+
+def test_lookup_index_finds_rows_and_sources(sample_json, tmp_path, monkeypatch):
+    import json
+    from config.settings import config
+    from utils import lookup as lookup_module
+    from utils.lookup import lookup, lookup_index_path
+    monkeypatch.setitem(config.config['output'], 'format', 'csv')
+    monkeypatch.setitem(config.config['output'], 'compression', None)
+
+    paths = []
+    for i, giata_id in enumerate([30, 10, 20, 10]):
+        path = tmp_path / "in" / f"day{i % 2}" / f"hotel_{i}.json"
+        path.parent.mkdir(parents=True, exist_ok=True)
+        # Quoted multi-line cells must not be mistaken for row ends
+        texts = {"en": {"Facilities": f'Pool "{i}"\nSpa', "Location": "Strand ß"}}
+        path.write_text(json.dumps(dict(sample_json, giataId=giata_id, texts=texts)), encoding="utf-8")
+        paths.append(str(path))
+
+    def read_back(*args, **kwargs):
+        raise AssertionError("the output was read back to locate its rows")
+    # Row positions come from the writers, not from rescanning the output
+    monkeypatch.setattr(lookup_module, "_csv_row_offsets", read_back)
+    monkeypatch.setattr(lookup_module, "iter_output_records", read_back)
+    extractor = HotelDataExtractor(lookup_index=True)
+    for streamed in (True, False):
+        output_path = tmp_path / "out" / f"hotels_{streamed}.csv"
+        if streamed:
+            extractor.process_batch_to_file(paths, str(output_path), parallel=False, use_cache=False)
+        else:
+            extractor.save_records(extractor.collect_batch(paths, parallel=False, use_cache=False), str(output_path))
+        assert "_source" not in pd.read_csv(output_path).columns
+
+        index_path = lookup_index_path(str(output_path))
+        (match,) = lookup(index_path, "20")
+        assert match["source"] == paths[2]
+        assert match["row"]["giataId"] == "20" and match["row"]["fileId"] == "hotel_2.json"
+        assert match["row"]["texts_en_Facilities"] == 'Pool "2"\nSpa'
+        assert [m["source"] for m in lookup(index_path, 10)] == [paths[1], paths[3]]
+        assert lookup(index_path, 40) == []
+
+    monkeypatch.setitem(config.config['output'], 'format', 'parquet')
+    for streamed in (True, False):
+        parquet_path = tmp_path / "out" / f"hotels_{streamed}.parquet"
+        if streamed:
+            extractor.process_batch_to_file(paths, str(parquet_path), parallel=False, use_cache=False)
+        else:
+            extractor.save_records(extractor.collect_batch(paths, parallel=False, use_cache=False), str(parquet_path))
+        (match,) = lookup(lookup_index_path(str(parquet_path)), 20)
+        assert match["source"] == paths[2] and match["row"]["fileId"] == "hotel_2.json"
+
+    with open(output_path, "a", encoding="utf-8") as file:
+        file.write("\n")
+    with pytest.raises(ValueError, match="changed"):
+        lookup(index_path, 20)
+
+
+@pytest.mark.parametrize("streaming", [False, True])
+def test_delta_run_that_extracts_nothing_deletes_every_row(sample_json, tmp_path, monkeypatch, streaming):
+    import json
+    import main
+    from config.settings import config
+    input_dir = tmp_path / "input"
+    input_dir.mkdir()
+    (input_dir / "hotel.json").write_text(json.dumps(sample_json), encoding="utf-8")
+    monkeypatch.setitem(config.config["data"], "output_dir", str(tmp_path / "output"))
+    monkeypatch.setitem(config.config["output"], "format", "csv")
+    monkeypatch.setitem(config.config["output"], "compression", None)
+    monkeypatch.setitem(config.config["output"], "delta", True)
+    monkeypatch.setitem(config.config["performance"], "streaming", streaming)
+    monkeypatch.setitem(config.config["performance"], "cache_results", False)
+    extractor = HotelDataExtractor()
+    assert main.process_batch(str(input_dir), extractor)
+
+    (input_dir / "hotel.json").unlink()
+    assert main.process_batch(str(input_dir), extractor)
+    output_dir = tmp_path / "output"
+    assert pd.read_csv(output_dir / "extracted_hotels.csv").empty
+    assert list(pd.read_csv(output_dir / "extracted_hotels_deletes.csv")["giataId"]) == [123]
+    summary = json.loads((output_dir / "extracted_hotels_delta.json").read_text())
+    assert summary["deleted"] == 1 and summary["current_rows"] == 0
+    assert not (output_dir / "extracted_hotels_previous.csv").exists()
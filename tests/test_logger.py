@@ -0,0 +1,51 @@
+import json
+import os
+import sys
+
+# Add src to path
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '../src')))
+
+from config.settings import config
+from utils.logger import get_logger, setup_logger, stop_log_listeners
+
+
+def test_queued_json_logging(tmp_path, monkeypatch):
+    log_file = tmp_path / "extraction.log"
+    monkeypatch.setitem(config.config['logging'], 'queue', True)
+    monkeypatch.setitem(config.config['logging'], 'json', True)
+    try:
+        setup_logger(level="DEBUG", log_file=str(log_file))
+        logger = get_logger("extractors.test")
+        logger.debug("Processing file %d/%d: %s", 1, 2, "a.json", extra={'fileId': 'a.json'})
+        logger.info("Processed %d files", 2)
+        stop_log_listeners()
+
+        entries = [json.loads(line) for line in log_file.read_text(encoding="utf-8").splitlines()]
+        assert [entry['message'] for entry in entries] == ["Processing file 1/2: a.json", "Processed 2 files"]
+        assert entries[0]['level'] == "DEBUG"
+        assert entries[0]['logger'] == "hotel_extractor.extractors.test"
+        assert entries[0]['fileId'] == "a.json"
+    finally:
+        monkeypatch.undo()
+        setup_logger()
+
+
+def test_worker_logging_uses_configured_level(monkeypatch):
+    import logging
+    import queue
+    from utils.logger import ROOT_LOGGER_NAME, configure_worker_logging
+    monkeypatch.setitem(config.config['logging'], 'level', 'WARNING')
+    # Spawned workers start from the DEBUG level set at import
+    logging.getLogger(ROOT_LOGGER_NAME).setLevel(logging.DEBUG)
+    log_queue = queue.SimpleQueue()
+    try:
+        configure_worker_logging(log_queue)
+        logger = get_logger("extractors.test")
+        logger.debug("Processing file %s", "a.json")
+        logger.warning("Failed to parse %s", "b.json")
+        assert logging.getLogger(ROOT_LOGGER_NAME).level == logging.WARNING
+        assert log_queue.get_nowait().getMessage() == "Failed to parse b.json"
+        assert log_queue.empty()
+    finally:
+        monkeypatch.undo()
+        setup_logger()
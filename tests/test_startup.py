@@ -0,0 +1,57 @@
+import os
+import subprocess
+import sys
+
+SRC_DIR = os.path.abspath(os.path.join(os.path.dirname(__file__), '../src'))
+REPO_ROOT = os.path.dirname(SRC_DIR)
+
+
+def test_import_main_is_lazy(tmp_path):
+    # Run from an empty directory: importing must neither read config.yaml nor open the log file
+    probe = (
+        "import sys, main; "
+        "print(' '.join(name for name in ('pandas', 'numpy', 'pyarrow', 'yaml') if name in sys.modules))"
+    )
+    env = dict(os.environ, PYTHONPATH=SRC_DIR)
+    run = subprocess.run([sys.executable, '-c', probe], cwd=tmp_path, env=env, capture_output=True, text=True)
+    assert run.returncode == 0, run.stderr
+    assert run.stdout.split() == []
+    assert os.listdir(tmp_path) == []
+
+
+def test_config_and_logging_load_on_first_use(tmp_path):
+    log_file = tmp_path / "run.log"
+    probe = (
+        "import sys\n"
+        "from utils.logger import get_logger\n"
+        "from config.settings import config\n"
+        "config.use_file(sys.argv[1])\n"
+        "config.config['logging']['file'] = sys.argv[2]\n"
+        "get_logger('test').info('first record')\n"
+    )
+    env = dict(os.environ, PYTHONPATH=SRC_DIR)
+    run = subprocess.run(
+        [sys.executable, '-c', probe, os.path.join(REPO_ROOT, 'config.yaml'), str(log_file)],
+        cwd=tmp_path, env=env, capture_output=True, text=True
+    )
+    assert run.returncode == 0, run.stderr
+    assert "first record" in run.stderr
+    assert log_file.read_text(encoding="utf-8").count("first record") == 1
+
+
+def test_csv_output_without_pandas(tmp_path):
+    probe = (
+        "import sys\n"
+        "from utils.writers import open_writer\n"
+        "with open_writer(sys.argv[1], ['fileId', 'giataId', 'emails'], output_format='csv', compression='') as writer:\n"
+        "    writer.write({'fileId': 'a.json', 'giataId': 1, 'emails': ['a@b.c']})\n"
+        "print('pandas' in sys.modules)\n"
+    )
+    env = dict(os.environ, PYTHONPATH=SRC_DIR)
+    output = tmp_path / "out.csv"
+    run = subprocess.run(
+        [sys.executable, '-c', probe, str(output)], cwd=REPO_ROOT, env=env, capture_output=True, text=True
+    )
+    assert run.returncode == 0, run.stderr
+    assert run.stdout.strip() == "False"
+    assert output.read_text(encoding="utf-8") == "fileId,giataId,emails\na.json,1,['a@b.c']\n"
@@ -0,0 +1,191 @@
+import os
+import sys
+import pytest
+import pandas as pd
+
+# Add src to path
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '../src')))
+
+from extractors.schema import apply_schema
+from utils.writers import open_writer, output_filename
+
+COLUMNS = ['fileId', 'giataId', 'names_value', 'phones_phone', 'chains_giataId', 'images_sizes', 'geoCodes_latitude']
+
+RECORDS = [
+    {'fileId': 'a.json', 'giataId': 1, 'names_value': 'A', 'phones_phone': ['+1', '+2'],
+     'chains_giataId': [11], 'images_sizes': [800, 320], 'geoCodes_latitude': 1.5},
+    {'fileId': 'b.json', 'giataId': 2, 'names_value': None, 'phones_phone': [],
+     'chains_giataId': [], 'images_sizes': None},
+    {'fileId': 'c.json', 'giataId': 3, 'names_value': 'C', 'phones_phone': ['+3'],
+     'chains_giataId': [12, 13], 'images_sizes': [150], 'geoCodes_latitude': 2.0},
+]
+
+
+def test_csv_writer_matches_header_and_order(tmp_path):
+    path = tmp_path / "out.csv"
+    with open_writer(str(path), COLUMNS, output_format='csv', chunk_size=2, compression='') as writer:
+        for record in RECORDS:
+            writer.write(record)
+    df = pd.read_csv(path)
+    assert list(df.columns) == COLUMNS
+    assert list(df['giataId']) == [1, 2, 3]
+
+
+def test_csv_rows_match_dataframe_to_csv(tmp_path):
+    records = RECORDS + [
+        {'fileId': 'd "quoted".json', 'giataId': 4, 'names_value': 'Line\nbreak, comma',
+         'ratings_value': 0.1, 'images_heroImage': True, 'names_locale': 'de', 'geoCodes_latitude': 1e-05},
+        {'fileId': 'e.json', 'giataId': None, 'names_value': '', 'ratings_value': 3,
+         'images_heroImage': False, 'names_locale': None, 'phones_phone': ['a"b', "c'd"]},
+    ]
+    columns = COLUMNS + ['ratings_value', 'images_heroImage', 'names_locale']
+    path = tmp_path / "rows.csv"
+    with open_writer(str(path), columns, output_format='csv', chunk_size=2, compression='') as writer:
+        for record in records:
+            writer.write(record)
+    expected = apply_schema(pd.DataFrame(records, columns=columns)).to_csv(index=False)
+    assert path.read_bytes() == expected.encode('utf-8')
+
+
+@pytest.mark.parametrize("output_format", ["parquet", "feather"])
+def test_columnar_writers_keep_list_columns(tmp_path, output_format):
+    pytest.importorskip("pyarrow")
+    path = tmp_path / output_filename("hotels", output_format)
+    with open_writer(str(path), COLUMNS, output_format=output_format, chunk_size=2) as writer:
+        for record in RECORDS:
+            writer.write(record)
+
+    df = pd.read_parquet(path) if output_format == "parquet" else pd.read_feather(path)
+    assert list(df.columns) == COLUMNS
+    assert list(df['phones_phone'][0]) == ['+1', '+2']
+    assert list(df['chains_giataId'][2]) == [12, 13]
+    assert list(df['images_sizes'][0]) == [800, 320]
+    assert df['images_sizes'][1] is None
+    assert pd.isna(df['names_value'][1])
+
+
+@pytest.mark.parametrize("output_format", ["parquet", "sqlite"])
+def test_writers_do_not_truncate_or_drop_values_that_fail_coercion(tmp_path, output_format):
+    if output_format == "parquet":
+        pytest.importorskip("pyarrow")
+    from utils.writers import iter_output_records
+    values = [12, 12.0, "13", "14.0", 12.7, "12.7", "abc"]
+    path = tmp_path / output_filename("hotels", output_format)
+    columns = ['giataId', 'chains_giataId', 'geoCodes_latitude']
+    records = [{'giataId': value, 'chains_giataId': [value], 'geoCodes_latitude': value} for value in values]
+    if output_format == "parquet":
+        # Arrow columns cannot hold them, so the write fails instead of truncating them to 12 or nulling them
+        with pytest.raises(ValueError, match=r"3 values of giataId do not fit its int type, e\.g\. 12\.7"):
+            with open_writer(str(path), columns, output_format=output_format, chunk_size=4) as writer:
+                for record in records:
+                    writer.write(record)
+        assert writer.rows_written == 4
+        # Values that fit are still converted
+        with open_writer(str(path), columns, output_format=output_format) as writer:
+            for record in records[:4]:
+                writer.write(record)
+        assert [record['giataId'] for record in iter_output_records(str(path))] == [12, 12, 13, 14]
+    else:
+        # SQLite columns take any value, so the original is kept
+        with open_writer(str(path), columns, output_format=output_format) as writer:
+            for record in records:
+                writer.write(record)
+        records = list(iter_output_records(str(path)))
+        assert [record['giataId'] for record in records] == [12, 12, 13, 14, 12.7, 12.7, 'abc']
+        assert [record['chains_giataId'] for record in records][4:] == ['[12.7]', '["12.7"]', '["abc"]']
+
+
+def test_shards_partition_inputs_and_merge_in_shard_order(tmp_path):
+    from utils.discovery import shard_of
+    from utils.shards import merge_shard_outputs, shard_stem
+
+    paths = [f"2024-{month:02d}/hotel_{i}.json" for month in range(1, 4) for i in range(50)]
+    assignments = [shard_of(path, 4) for path in paths]
+    assert set(assignments) == {1, 2, 3, 4}
+    assert assignments == [shard_of(path, 4) for path in paths]
+
+    # Shards may see different columns; the merge takes their union
+    for index, count in ((2, 2), (1, 2)):
+        shard_path = tmp_path / output_filename(shard_stem('extracted_hotels', index, count), 'csv')
+        columns = COLUMNS if index == 1 else COLUMNS + ['texts_en_Rooms']
+        with open_writer(str(shard_path), columns, output_format='csv', compression='') as writer:
+            for record in RECORDS:
+                writer.write(dict(record, fileId=f"{index}_{record['fileId']}", texts_en_Rooms='Suite'))
+
+    rows = merge_shard_outputs(str(tmp_path), 'extracted_hotels', leading_columns=['giataId'])
+    merged = pd.read_csv(tmp_path / "extracted_hotels.csv")
+    assert rows == 6
+    assert list(merged.columns) == ['giataId', 'fileId'] + COLUMNS[2:] + ['texts_en_Rooms']
+    assert list(merged["fileId"]) == ['1_a.json', '1_b.json', '1_c.json', '2_a.json', '2_b.json', '2_c.json']
+    assert merged["texts_en_Rooms"].isna().sum() == 3
+    assert merged["phones_phone"][0] == "['+1', '+2']"
+
+    (tmp_path / output_filename(shard_stem('extracted_hotels', 2, 2), 'csv')).unlink()
+    with pytest.raises(ValueError, match="Missing outputs of shards"):
+        merge_shard_outputs(str(tmp_path), 'extracted_hotels')
+
+
+def test_delta_writes_inserts_updates_and_deletes(tmp_path):
+    import json
+    from utils.delta import write_delta
+
+    def write(name, records, columns=COLUMNS):
+        path = tmp_path / name
+        with open_writer(str(path), columns, output_format='csv', compression='') as writer:
+            for record in records:
+                writer.write(record)
+        return str(path)
+
+    previous = write("extracted_hotels_previous.csv", RECORDS)
+    # 1 unchanged (columns reordered), 2 renamed, 3 gone, 4 new
+    current = write("extracted_hotels.csv", [
+        dict(RECORDS[1], names_value='B'), RECORDS[0], {'fileId': 'd.json', 'giataId': 4, 'names_value': 'D'},
+        {'fileId': 'x.json', 'giataId': None}
+    ], columns=COLUMNS[1:] + COLUMNS[:1])
+
+    summary = write_delta(previous, current, summary_path=str(tmp_path / "extracted_hotels_delta.json"))
+    assert summary == {'previous_rows': 3, 'current_rows': 4, 'inserted': 1, 'updated': 1,
+                       'deleted': 1, 'unchanged': 1, 'unkeyed': 1}
+    assert list(pd.read_csv(tmp_path / "extracted_hotels_inserts.csv")["giataId"]) == [4]
+    updates = pd.read_csv(tmp_path / "extracted_hotels_updates.csv")
+    assert list(updates.columns) == COLUMNS[1:] + COLUMNS[:1]
+    assert list(updates["names_value"]) == ['B']
+    deletes = pd.read_csv(tmp_path / "extracted_hotels_deletes.csv")
+    assert list(deletes["giataId"]) == [3] and list(deletes.columns) == COLUMNS
+    assert json.loads((tmp_path / "extracted_hotels_delta.json").read_text())["deleted"] == 1
+
+    # Without a previous output everything is an insert
+    assert write_delta(None, current)['inserted'] == 3
+    assert pd.read_csv(tmp_path / "extracted_hotels_deletes.csv").empty
+
+
+def test_sqlite_writer_upserts_by_giata_id_and_indexes_after_load(tmp_path):
+    import sqlite3
+    from utils.writers import iter_output_records, read_output_columns
+
+    path = tmp_path / output_filename("extracted_hotels", "sqlite")
+    columns = COLUMNS + ['country_code']
+    with open_writer(str(path), columns, output_format='sqlite', chunk_size=2, key='giataId') as writer:
+        for record in RECORDS + [dict(RECORDS[0], names_value='A2', country_code='DE')]:
+            writer.write(record)
+    assert writer.rows_written == 4
+
+    # Appending upserts too, and adds columns the table lacks
+    with open_writer(str(path), columns + ['source'], output_format='sqlite', append=True, key='giataId') as writer:
+        writer.write({'fileId': 'd.json', 'giataId': 4, 'source': 'x'})
+        writer.write(dict(RECORDS[2], names_value='C2'))
+
+    connection = sqlite3.connect(path)
+    assert connection.execute("PRAGMA journal_mode").fetchone() == ('wal',)
+    indexes = {row[0] for row in connection.execute("SELECT name FROM sqlite_master WHERE type = 'index'")}
+    assert indexes == {'extracted_hotels_giataId_key', 'extracted_hotels_country_code_idx',
+                       'extracted_hotels_chains_giataId_idx'}
+    connection.close()
+
+    assert read_output_columns(str(path)) == columns + ['source']
+    records = list(iter_output_records(str(path)))
+    assert [(record['giataId'], record['names_value']) for record in records] == [
+        (1, 'A2'), (2, None), (3, 'C2'), (4, None)
+    ]
+    assert records[0]['phones_phone'] == '["+1", "+2"]' and records[0]['country_code'] == 'DE'
+    assert records[2]['geoCodes_latitude'] == 2.0 and records[3]['source'] == 'x'